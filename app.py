@@ -1,30 +1,365 @@
-from flask import Flask, request, jsonify, render_template, redirect, url_for, send_from_directory, session
+from flask import Flask, request, jsonify, render_template, redirect, url_for, send_from_directory, session, g, stream_with_context, abort, has_request_context, copy_current_request_context, Request
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.pagination import Pagination
+from flask_sqlalchemy.session import Session as FlaskSession
 from flask_cors import CORS
-from werkzeug.utils import secure_filename
+from sqlalchemy import event, inspect, text, table, column, and_, or_, case, func, select, insert, update, delete
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from werkzeug.utils import safe_join
 from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.wsgi import get_input_stream
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import RequestEntityTooLarge
+from markupsafe import Markup
 import os
+import sys
 import logging
+import click
 import json
+import re
+import base64
+import bisect
+import hashlib
+import random
+import cProfile
+import threading
+import queue
+import io
+import csv
+import zlib
+import gzip
+import mimetypes
+import tempfile
+import time
+from array import array
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import wraps
+from urllib.parse import urlencode
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
+try:
+    import orjson
+except ImportError:  # Optional: faster JSON encoding for the list endpoints
+    orjson = None
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Optional: thumbnail and medium image derivatives
+    Image = None
+
+try:
+    import redis
+except ImportError:  # Optional: shared response cache backend
+    redis = None
+
+try:
+    import brotli
+except ImportError:  # Optional: br response compression
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Optional: zstd response compression
+    zstandard = None
+
+# Set up logging (LOG_LEVEL=INFO or higher in production skips the debug formatting)
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO' if os.environ.get('DB_PROFILE') == 'production' else 'DEBUG').upper())
 
 app = Flask(__name__)
 CORS(app)
 
 # Configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///products.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///products.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
 app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'pdf'}
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['UPLOAD_CHUNK_SIZE'] = 64 * 1024  # Bytes read per chunk while hashing uploads
+app.config['UPLOAD_MAX_CONTENT_LENGTH'] = 256 * 1024 * 1024  # Whole add/edit form; its files stream to disk
+app.config['UPLOAD_MAX_FILE_SIZES'] = {'png': 16 * 1024 * 1024, 'jpg': 16 * 1024 * 1024, 'jpeg': 16 * 1024 * 1024,
+                                       'pdf': 64 * 1024 * 1024}  # Per file, by extension
+app.config['UPLOAD_FINALIZE_WORKERS'] = 4  # Threads fsyncing and moving streamed uploads into place
+app.config['UPLOAD_GC_GRACE_SECONDS'] = 60  # Unreferenced uploads younger than this are kept
+app.config['IMAGE_DERIVATIVE_SIZES'] = {'thumb': 320, 'medium': 1024}  # Longest edge in pixels
+app.config['IMAGE_DERIVATIVE_QUALITY'] = 80
+app.config['IMAGE_DERIVATIVE_WEBP'] = True  # Also write WebP copies when Pillow supports it
+app.config['IMAGE_DERIVATIVE_WORKERS'] = 2
+app.config['UPLOAD_IMMUTABLE_MAX_AGE'] = 365 * 24 * 3600  # Content-addressed uploads never change under their URL
+app.config['UPLOAD_MAX_AGE'] = 3600  # Legacy uploads and derivatives revalidate (ETag/Last-Modified) after this
+app.config['UPLOAD_COMPRESSIBLE_EXTENSIONS'] = {'pdf', 'svg', 'txt', 'csv', 'json'}
+app.config['UPLOAD_X_ACCEL_REDIRECT'] = os.environ.get('UPLOAD_X_ACCEL_REDIRECT')  # e.g. /protected-uploads/ behind nginx
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'  # Apache/lighttpd mod_xsendfile
 app.config['SECRET_KEY'] = 'your-secret-key-here'  # Change this in production
+app.config['SEARCH_FTS_ENABLED'] = True  # Falls back to ILIKE scans if SQLite lacks FTS5
+app.config['MAX_PER_PAGE'] = 500  # Hard ceiling for per_page on the list APIs
+app.config['BATCH_GET_MAX_ITEMS'] = 1000  # Identifiers per /products/batch-get request
+app.config['CHANGES_BATCH_SIZE'] = 500  # Change log rows per /changes response (or streamed batch)
+app.config['CHANGES_MAX_BATCH_SIZE'] = 5000
+app.config['CHANGES_MAX_WAIT'] = 30  # Longest /changes long-poll, in seconds
+app.config['CHANGES_POLL_INTERVAL'] = 1.0  # Long-poll recheck interval for writes from other processes
+app.config['CHANGE_LOG_RETENTION_DAYS'] = 30  # Used by `flask prune-changes`
+app.config['CATALOG_SNAPSHOT_ENABLED'] = os.environ.get('CATALOG_SNAPSHOT_ENABLED') == '1'  # Serve hot reads from memory
+app.config['CATALOG_SNAPSHOT_MAX_LAG'] = 1.0  # Seconds before writes from other processes show up in the snapshot
+app.config['SERVER_TIMING'] = os.environ.get('SERVER_TIMING') == '1'  # Add db/serialize/app timings to every response
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))  # Fraction of requests run under cProfile
+app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', 'profiles')  # Where sampled .prof files are written
+app.config['BULK_UPDATE_CHUNK_SIZE'] = 500  # Items per transaction in /products/bulk-update
+app.config['BULK_DELETE_CHUNK_SIZE'] = 500  # Ids per DELETE ... WHERE id IN (...) statement
+app.config['IMPORT_BATCH_SIZE'] = 1000  # Rows per transaction in /products/import
+app.config['IMPORT_MAX_BATCH_SIZE'] = 10000
+app.config['IMPORT_MAX_CONTENT_LENGTH'] = 1024 * 1024 * 1024  # Imports stream, so they get their own limit
+app.config['IMPORT_MAX_REPORTED_ERRORS'] = 100
+app.config['EXPORT_BATCH_SIZE'] = 1000  # Rows fetched per cursor round trip in /products/export
+app.config['FACET_PRICE_BUCKETS'] = [100, 500, 1000, 5000, 10000]  # Upper bounds; run `flask rebuild-facets` after changing
+app.config['RESPONSE_CACHE_ENABLED'] = os.environ.get('RESPONSE_CACHE_ENABLED', '1') == '1'
+app.config['RESPONSE_CACHE_MAX_ENTRIES'] = 1024  # In-process LRU size
+app.config['RESPONSE_CACHE_REDIS_URL'] = os.environ.get('RESPONSE_CACHE_REDIS_URL')  # Optional shared backend
+app.config['RESPONSE_CACHE_TTL'] = 3600  # Seconds, shared backend only
+app.config['RESPONSE_COMPRESSION_ENABLED'] = os.environ.get('RESPONSE_COMPRESSION_ENABLED', '1') == '1'
+app.config['RESPONSE_COMPRESSION_MIN_SIZE'] = 1024  # Bytes; smaller bodies are sent as they are
+app.config['RESPONSE_COMPRESSION_LEVELS'] = {'br': 5, 'zstd': 6, 'gzip': 6}
+app.config['RESPONSE_COMPRESSIBLE_MIMETYPES'] = {'application/json', 'application/x-ndjson', 'text/html', 'text/csv', 'text/plain'}
+app.config['FRAGMENT_CACHE_ENABLED'] = os.environ.get('FRAGMENT_CACHE_ENABLED', '1') == '1'  # Cache rendered listing fragments
+app.config['FRAGMENT_CACHE_MAX_ENTRIES'] = 5000  # Product cards and filter bars held in-process
+app.config['FRAGMENT_PREFETCH_NEXT_PAGE'] = os.environ.get('FRAGMENT_PREFETCH_NEXT_PAGE') == '1'  # Warm the next page's cards in the background
+app.config['WRITE_QUEUE_ENABLED'] = os.environ.get('WRITE_QUEUE_ENABLED') == '1'  # Group-commit API writes on one thread
+app.config['WRITE_QUEUE_MAX_BATCH'] = 64  # Mutations per transaction
+app.config['WRITE_QUEUE_MAX_WAIT'] = 0.002  # Seconds the writer lingers for more mutations before committing
+
+# Database profile
+# DB_PROFILE=production turns on WAL (readers no longer block on writers), relaxed fsync,
+# a bigger page cache and mmap reads, and a fixed-size connection pool so every
+# connection keeps its warm cache. GET API endpoints can read through a separate
+# read-only engine (mode=ro, query_only) so read traffic never queues behind writes
+# for a pooled connection and can never write by accident.
+SQLITE_PROFILES = {
+    'development': {
+        'pragmas': {'busy_timeout': 5000},
+        'pool_size': None,  # SQLAlchemy defaults
+        'read_only_route': False,
+    },
+    'production': {
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',  # Durable across app crashes; WAL makes it safe against corruption
+            'busy_timeout': 5000,  # Wait for the write lock instead of raising "database is locked"
+            'cache_size': -64000,  # KiB per connection
+            'mmap_size': 256 * 1024 * 1024,
+            'temp_store': 'MEMORY',
+        },
+        'pool_size': 8,
+        'read_only_route': True,
+    },
+}
+app.config['DB_PROFILE'] = os.environ.get('DB_PROFILE', 'development')
+db_profile = SQLITE_PROFILES[app.config['DB_PROFILE']]
+app.config['SQLITE_PRAGMAS'] = db_profile['pragmas']
+app.config['DB_READ_ONLY_ROUTE'] = os.environ.get('DB_READ_ONLY_ROUTE', '1' if db_profile['read_only_route'] else '0') == '1'
+
+sqlite_file = re.match(r'^sqlite:///(?!:memory:)(.+)$', app.config['SQLALCHEMY_DATABASE_URI'])
+if sqlite_file and db_profile['pool_size']:
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'pool_size': db_profile['pool_size'], 'max_overflow': 0, 'pool_timeout': 30}
+if sqlite_file and app.config['DB_READ_ONLY_ROUTE']:
+    app.config['SQLALCHEMY_BINDS'] = {'readonly': f"sqlite:///file:{sqlite_file.group(1)}?mode=ro&uri=true"}
+else:
+    app.config['DB_READ_ONLY_ROUTE'] = False
 
 # Ensure upload folder exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-db = SQLAlchemy(app)
+# Sends the queries of read_only views to the read-only engine
+class RoutingSession(FlaskSession):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and app.config['DB_READ_ONLY_ROUTE'] and has_request_context() and g.get('read_only'):
+            return self._db.engines['readonly']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+
+def sqlite_pragma_listener(pragmas):
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+    return apply_pragmas
+
+with app.app_context():
+    for bind_key, engine in db.engines.items():
+        if engine.dialect.name == 'sqlite':
+            pragmas = dict(app.config['SQLITE_PRAGMAS'])
+            if bind_key == 'readonly':
+                pragmas.pop('journal_mode', None)  # Needs write access; set by the primary engine
+                pragmas['query_only'] = 1
+            event.listen(engine, 'connect', sqlite_pragma_listener(pragmas))
+
+def read_only(view):
+    @wraps(view)
+    def wrap(*args, **kwargs):
+        g.read_only = True
+        return view(*args, **kwargs)
+    return wrap
+
+# Request metrics
+# Per-process counters and histograms rendered in Prometheus text format at /metrics:
+# latency and response size per route, SQL statements and time per request, and time
+# spent serializing. Under gunicorn every worker reports its own series.
+LATENCY_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+SIZE_BUCKETS = [256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304]
+QUERY_COUNT_BUCKETS = [0, 1, 2, 5, 10, 20, 50, 100]
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ['+Inf'], self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum}')
+        lines.append(f'{name}_count{{{labels}}} {cumulative}')
+        return lines
+
+class RequestMetrics:
+    HISTOGRAMS = [
+        ('http_request_duration_seconds', 'Request latency', LATENCY_BUCKETS),
+        ('http_response_size_bytes', 'Response body size (streamed responses excluded)', SIZE_BUCKETS),
+        ('db_queries_per_request', 'SQL statements executed per request', QUERY_COUNT_BUCKETS),
+        ('db_query_duration_seconds', 'SQL time per request', LATENCY_BUCKETS),
+        ('serialization_duration_seconds', 'Row serialization and JSON encoding time per request', LATENCY_BUCKETS),
+    ]
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}  # (route, method, status) -> count
+        self.histograms = {name: {} for name, _, _ in self.HISTOGRAMS}
+        self.compression = {}  # (route, encoding) -> [responses, cached, input bytes, output bytes, CPU seconds]
+
+    def record(self, route, method, status, observations):
+        with self.lock:
+            key = (route, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            for (name, _, buckets), value in zip(self.HISTOGRAMS, observations):
+                if value is not None:
+                    histograms = self.histograms[name]
+                    if (route, method) not in histograms:
+                        histograms[(route, method)] = Histogram(buckets)
+                    histograms[(route, method)].observe(value)
+
+    def record_compression(self, route, encoding, cached, input_bytes, output_bytes, seconds):
+        with self.lock:
+            totals = self.compression.setdefault((route, encoding), [0, 0, 0, 0, 0.0])
+            for position, value in enumerate((1, int(cached), input_bytes, output_bytes, seconds)):
+                totals[position] += value
+
+    def render(self):
+        lines = ['# HELP http_requests_total Requests by route, method and status', '# TYPE http_requests_total counter']
+        with self.lock:
+            for (route, method, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{route="{route}",method="{method}",status="{status}"}} {count}')
+            for name, description, _ in self.HISTOGRAMS:
+                lines += [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+                for (route, method), histogram in sorted(self.histograms[name].items()):
+                    lines += histogram.render(name, f'route="{route}",method="{method}"')
+            compression = [
+                ('http_compressed_responses_total', 'counter', 'Compressed responses by route and encoding', lambda t: t[0]),
+                ('http_compressed_responses_cached_total', 'counter', 'Compressed bodies reused from the response cache', lambda t: t[1]),
+                ('http_compression_input_bytes_total', 'counter', 'Bytes before compression', lambda t: t[2]),
+                ('http_compression_output_bytes_total', 'counter', 'Bytes after compression', lambda t: t[3]),
+                ('http_compression_cpu_seconds_total', 'counter', 'Thread CPU time spent compressing', lambda t: round(t[4], 6)),
+                ('http_compression_ratio', 'gauge', 'Output bytes over input bytes so far', lambda t: round(t[3] / t[2], 4) if t[2] else 0),
+            ]
+            for name, kind, description, value in compression:
+                lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+                for (route, encoding), totals in sorted(self.compression.items()):
+                    lines.append(f'{name}{{route="{route}",encoding="{encoding}"}} {value(totals)}')
+        return lines
+
+request_metrics = RequestMetrics()
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append((context, time.perf_counter()))
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    record_query_time(conn)
+
+# A statement that raises never reaches after_cursor_execute. Its start time is only on
+# the stack if it failed in the driver, after before_cursor_execute ran for its context.
+@event.listens_for(Engine, 'handle_error')
+def stop_failed_query_timer(exception_context):
+    conn = exception_context.connection
+    started = conn.info.get('query_started') if conn is not None else None
+    if started and started[-1][0] is exception_context.execution_context:
+        record_query_time(conn)
+
+def record_query_time(conn):
+    _, started = conn.info['query_started'].pop()
+    if has_request_context() and 'request_started' in g:
+        g.sql_queries += 1
+        g.sql_seconds += time.perf_counter() - started
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.sql_queries = 0
+    g.sql_seconds = 0.0
+    g.serialize_seconds = 0.0
+    if app.config['PROFILE_SAMPLE_RATE'] and random.random() < app.config['PROFILE_SAMPLE_RATE']:
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+@app.after_request
+def record_request_metrics(response):
+    if 'request_started' not in g:
+        return response
+    elapsed = time.perf_counter() - g.request_started
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        os.makedirs(app.config['PROFILE_DIR'], exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.endpoint or 'unmatched'}-{os.getpid()}-{threading.get_ident()}.prof"
+        profiler.dump_stats(os.path.join(app.config['PROFILE_DIR'], name))
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    size = None if response.is_streamed else response.calculate_content_length()
+    request_metrics.record(route, request.method, response.status_code,
+                           (elapsed, size, g.sql_queries, g.sql_seconds, g.serialize_seconds))
+    if app.config['SERVER_TIMING']:
+        timings = [('db', g.sql_seconds, f'{g.sql_queries} queries'), ('serialize', g.serialize_seconds, None)]
+        timings += g.get('server_timings', [])
+        timings.append(('app', elapsed, None))
+        response.headers['Server-Timing'] = ', '.join(
+            f'{name};dur={seconds * 1000:.2f}' + (f';desc="{description}"' if description else '')
+            for name, seconds, description in timings
+        )
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    lines = request_metrics.render()
+    gauges = [
+        ('write_queue_depth', 'Mutations waiting for the writer thread', write_queue.stats()['depth']),
+        ('catalog_snapshot_products', 'Products in this process\'s catalog snapshot',
+         len(snapshot_store.snapshot.ids) if snapshot_store.snapshot else 0),
+        ('fragment_cache_entries', 'Rendered listing fragments in this process\'s fragment cache', len(fragment_cache.entries)),
+    ]
+    for name, description, value in gauges:
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} gauge', f'{name} {value}']
+    return app.response_class("\n".join(lines) + "\n", mimetype='text/plain; version=0.0.4')
 
 # User Model
 class User(db.Model):
@@ -35,14 +370,14 @@ class User(db.Model):
 # Product Model
 class Product(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    category = db.Column(db.String(100))
-    product_name = db.Column(db.String(200))
+    category = db.Column(db.String(100), index=True)
+    product_name = db.Column(db.String(200), index=True)
     short_description = db.Column(db.Text)
     long_description = db.Column(db.Text)
     mrp = db.Column(db.Float)
-    offer_price = db.Column(db.Float)
-    sku = db.Column(db.String(50))
-    in_stock = db.Column(db.Boolean, default=True)
+    offer_price = db.Column(db.Float, index=True)
+    sku = db.Column(db.String(50), index=True)
+    in_stock = db.Column(db.Boolean, default=True, index=True)
     stock_number = db.Column(db.Integer)
     download_pdfs = db.Column(db.Text)
     product_image_urls = db.Column(db.Text)
@@ -51,13 +386,23 @@ class Product(db.Model):
     manufacturer = db.Column(db.String(200))
     special_note = db.Column(db.Text)
     whatsapp_number = db.Column(db.String(20))
-    is_rubber = db.Column(db.Boolean, default=False)
-    rubber_density = db.Column(db.Float, nullable=True)
-    rubber_height = db.Column(db.Float, nullable=True)
-    rubber_length = db.Column(db.Float, nullable=True)
-    rubber_thickness = db.Column(db.Float, nullable=True)
+    is_rubber = db.Column(db.Boolean, default=False, index=True)
+    rubber_density = db.Column(db.Float, nullable=True, index=True)
+    rubber_height = db.Column(db.Float, nullable=True, index=True)
+    rubber_length = db.Column(db.Float, nullable=True, index=True)
+    rubber_thickness = db.Column(db.Float, nullable=True, index=True)
     rubber_description = db.Column(db.Text, nullable=True)
     variants = db.Column(db.Text)  # Store variants as JSON string
+    updated_at = db.Column(db.DateTime, index=True)  # UTC, stamped by products_changed
+
+    # Filter-then-sort combinations of the listing engine (see ListingQuery); the rowid
+    # is the implicit last column, so each also serves the id tie-breaker
+    __table_args__ = (
+        db.Index('ix_product_category_offer_price', 'category', 'offer_price'),
+        db.Index('ix_product_category_in_stock_offer_price', 'category', 'in_stock', 'offer_price'),
+        db.Index('ix_product_category_product_name', 'category', 'product_name'),
+        db.Index('ix_product_in_stock_offer_price', 'in_stock', 'offer_price'),
+    )
 
     def to_dict(self):
         return {
@@ -87,14 +432,1564 @@ class Product(db.Model):
             "variants": json.loads(self.variants) if self.variants else []
         }
 
+# Normalized, indexed copies of the variants JSON and the comma-joined media columns.
+# The product columns stay the source for the public JSON; these tables are rewritten
+# from them on every write so variant SKUs and media URLs can be looked up by index.
+class ProductVariant(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id', ondelete='CASCADE'), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False)
+    name = db.Column(db.String(200))
+    price = db.Column(db.Float)
+    sku = db.Column(db.String(50), index=True)
+
+class ProductMedia(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id', ondelete='CASCADE'), nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)  # image, pdf or youtube
+    position = db.Column(db.Integer, nullable=False)
+    url = db.Column(db.Text, nullable=False, index=True)
+
+MEDIA_COLUMNS = {'image': 'product_image_urls', 'pdf': 'download_pdfs', 'youtube': 'youtube_links'}
+CHILD_SOURCE_FIELDS = {'variants', 'product_image_urls', 'download_pdfs', 'youtube_links'}
+
+# Remember the uploads these products referenced; once the transaction commits, the
+# ones nothing references any more are garbage-collected (see collect_orphaned_uploads)
+def release_product_media(product_ids):
+    urls = db.session.scalars(
+        select(ProductMedia.url).where(ProductMedia.product_id.in_(product_ids), ProductMedia.kind != 'youtube')
+    ).all()
+    db.session.info.setdefault('released_uploads', set()).update(urls)
+
+def sync_product_children(product_ids):
+    product_ids = list(product_ids)
+    for start in range(0, len(product_ids), 500):
+        chunk = product_ids[start:start + 500]
+        rows = db.session.execute(
+            select(Product.id, Product.variants, *[getattr(Product, name) for name in MEDIA_COLUMNS.values()])
+            .where(Product.id.in_(chunk))
+        ).all()
+        release_product_media(chunk)
+        db.session.execute(delete(ProductVariant).where(ProductVariant.product_id.in_(chunk)))
+        db.session.execute(delete(ProductMedia).where(ProductMedia.product_id.in_(chunk)))
+        variants, media = [], []
+        for row in rows:
+            try:
+                row_variants = json.loads(row.variants) if row.variants else []
+            except ValueError:
+                row_variants = []
+            for position, variant in enumerate(row_variants if isinstance(row_variants, list) else []):
+                if not isinstance(variant, dict):
+                    continue
+                price = variant.get('price')
+                variants.append({
+                    "product_id": row.id,
+                    "position": position,
+                    "name": str(variant['name']) if variant.get('name') is not None else None,
+                    "price": price if isinstance(price, (int, float)) and not isinstance(price, bool) else None,
+                    "sku": str(variant['sku']) if variant.get('sku') not in (None, '') else None
+                })
+            for kind, name in MEDIA_COLUMNS.items():
+                value = row._mapping[name]
+                for position, url in enumerate(value.split(",") if value else []):
+                    if url:
+                        media.append({"product_id": row.id, "kind": kind, "position": position, "url": url})
+        if variants:
+            db.session.execute(insert(ProductVariant), variants)
+        if media:
+            db.session.execute(insert(ProductMedia), media)
+
+# Catalog version, bumped in the same transaction as every write to products.
+# Cached read responses are keyed on it, so a bump invalidates all of them at once.
+class CatalogVersion(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+def bump_catalog_version():
+    db.session.execute(update(CatalogVersion).where(CatalogVersion.id == 1).values(version=CatalogVersion.version + 1))
+
+# Change log: one row per product write, appended by products_changed in the writing
+# transaction. SQLite serializes writers, so change ids grow in commit order and a
+# client holding the last id it saw can ask for everything after it (GET /changes).
+class ProductChange(db.Model):
+    __table_args__ = {'sqlite_autoincrement': True}  # Ids are never reused, even after pruning
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, nullable=False, index=True)
+    op = db.Column(db.String(10), nullable=False)  # 'upsert' or 'delete'
+    changed_at = db.Column(db.DateTime, nullable=False, index=True)
+
+change_condition = threading.Condition()  # Wakes in-process /changes long-polls on commit
+
+def record_changes(product_ids, deleted):
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    op = 'delete' if deleted else 'upsert'
+    for start in range(0, len(product_ids), 500):
+        chunk = product_ids[start:start + 500]
+        if not deleted:
+            db.session.execute(update(Product).where(Product.id.in_(chunk)).values(updated_at=now))
+        db.session.execute(insert(ProductChange), [{"product_id": product_id, "op": op, "changed_at": now} for product_id in chunk])
+    db.session.info['changes_recorded'] = True
+
+# after_commit and after_rollback also fire when a SAVEPOINT (the write queue's
+# per-mutation begin_nested) is released or rolled back; only the outermost transaction counts
+@event.listens_for(Session, 'after_commit')
+def notify_change_waiters(session):
+    if session.in_nested_transaction():
+        return
+    if session.info.pop('changes_recorded', None):
+        snapshot_store.invalidate()  # Read-your-writes for this process's snapshot
+        with change_condition:
+            change_condition.notify_all()
+
+@event.listens_for(Session, 'after_rollback')
+def forget_recorded_changes(session):
+    if not session.in_nested_transaction():
+        session.info.pop('changes_recorded', None)
+
+# Called before commit by every write path with the ids it inserted, updated or deleted
+def products_changed(product_ids, deleted=False, sync_children=True):
+    product_ids = list(product_ids)
+    if deleted:
+        for start in range(0, len(product_ids), 500):
+            chunk = product_ids[start:start + 500]
+            release_product_media(chunk)
+            db.session.execute(delete(ProductVariant).where(ProductVariant.product_id.in_(chunk)))
+            db.session.execute(delete(ProductMedia).where(ProductMedia.product_id.in_(chunk)))
+    elif sync_children:
+        sync_product_children(product_ids)
+    if product_ids:
+        record_changes(product_ids, deleted)
+    bump_catalog_version()
+
+def current_catalog_version():
+    return db.session.execute(select(CatalogVersion.version).where(CatalogVersion.id == 1)).scalar() or 0
+
+# Fast serialization for list endpoints
+# Rows are selected as plain column tuples (no ORM instances) and turned into the
+# same dicts Product.to_dict() builds. PRODUCT_FIELDS follows to_dict's key order.
+PRODUCT_FIELDS = [
+    'id', 'category', 'product_name', 'short_description', 'long_description', 'mrp', 'offer_price',
+    'sku', 'in_stock', 'stock_number', 'download_pdfs', 'product_image_urls', 'youtube_links',
+    'technical_information', 'manufacturer', 'special_note', 'whatsapp_number', 'is_rubber',
+    'rubber_density', 'rubber_height', 'rubber_length', 'rubber_thickness', 'rubber_description', 'variants'
+]
+LIST_FIELDS = ['download_pdfs', 'product_image_urls', 'youtube_links']  # Stored comma-joined
+JSON_FIELDS = ['variants']  # Stored as JSON text
+FLOAT_FIELDS = ['mrp', 'offer_price', 'rubber_density', 'rubber_height', 'rubber_length', 'rubber_thickness']
+
+# Sparse fieldsets: ?fields= picks the columns to SELECT, ?include= opts into the
+# expensive ones. Without either, responses keep the full to_dict() shape.
+EXPENSIVE_FIELDS = ['long_description', 'technical_information', 'variants']
+VIRTUAL_COLUMNS = {
+    # ISO 8601 UTC, formatted in SQL so orjson and the stdlib encoder agree
+    'updated_at': func.strftime('%Y-%m-%dT%H:%M:%fZ', Product.updated_at).label('updated_at'),
+    # First image only, cut out of the comma-joined list in SQL
+    'primary_image_url': func.nullif(case(
+        (func.instr(Product.product_image_urls, ',') > 0,
+         func.substr(Product.product_image_urls, 1, func.instr(Product.product_image_urls, ',') - 1)),
+        else_=Product.product_image_urls
+    ), '').label('primary_image_url'),
+    # Thumbnail/medium URLs per image, expanded by serialize_product_rows
+    'image_derivatives': Product.product_image_urls.label('image_derivatives'),
+}
+
+def product_columns(fields=PRODUCT_FIELDS):
+    return [VIRTUAL_COLUMNS[field] if field in VIRTUAL_COLUMNS else getattr(Product, field) for field in fields]
+
+def requested_fields():
+    fields_arg = request.args.get('fields', '')
+    include_arg = request.args.get('include', '')
+    if not fields_arg and not include_arg:
+        return PRODUCT_FIELDS
+    if fields_arg:
+        fields = [field.strip() for field in fields_arg.split(',') if field.strip()]
+    else:
+        fields = [field for field in PRODUCT_FIELDS if field not in EXPENSIVE_FIELDS]
+    fields += [field.strip() for field in include_arg.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in PRODUCT_FIELDS and field not in VIRTUAL_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    # id is always selected: cursors and clients both key on it
+    return list(dict.fromkeys(['id'] + fields))
+
+# orjson writes floats below 1e-4 or from 1e16 up differently from the stdlib encoder
+# jsonify uses (0.00001 vs 1e-05), so rows holding such values force the stdlib path
+def _orjson_float_exact(value):
+    return not value or 1e-4 <= abs(value) < 1e16
+
+# Checks the decoded floats of a JSON column, so string contents never disqualify a row
+def _orjson_json_exact(value):
+    if isinstance(value, float):
+        return _orjson_float_exact(value)
+    if isinstance(value, dict):
+        value = value.values()
+    elif not isinstance(value, list):
+        return True
+    return all(_orjson_json_exact(item) for item in value)
+
+def serialize_product_rows(rows, fields=PRODUCT_FIELDS):
+    started = time.perf_counter()
+    list_fields = [field for field in LIST_FIELDS if field in fields]
+    json_fields = [field for field in JSON_FIELDS if field in fields]
+    float_fields = [field for field in FLOAT_FIELDS if field in fields]
+    derivatives = 'image_derivatives' in fields
+    loads = json.loads
+    exact = True
+    products = []
+    for row in rows:
+        product = dict(zip(fields, row))
+        for field in list_fields:
+            value = product[field]
+            product[field] = value.split(",") if value else []
+        for field in json_fields:
+            value = product[field]
+            if value:
+                product[field] = loads(value)
+                exact = exact and _orjson_json_exact(product[field])
+            else:
+                product[field] = []
+        if derivatives:
+            value = product['image_derivatives']
+            product['image_derivatives'] = [image_derivatives(url) for url in value.split(",")] if value else []
+        if exact:
+            exact = all(_orjson_float_exact(product[field]) for field in float_fields)
+        products.append(product)
+    if not exact:
+        g.stdlib_json = True
+    g.serialize_seconds = g.get('serialize_seconds', 0.0) + time.perf_counter() - started
+    return products
+
+# Encode with orjson when installed. Its output matches jsonify byte for byte (sorted keys,
+# compact separators, trailing newline) except for non-ASCII text and DEL, which the stdlib
+# escapes, the floats flagged above and values orjson cannot encode at all (integers
+# beyond 64 bits); those responses take the stdlib encoder instead.
+def json_response(payload, status=200):
+    started = time.perf_counter()
+    response = None
+    if orjson is not None and not app.debug and not g.get('stdlib_json'):
+        try:
+            body = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+        except TypeError:  # orjson.JSONEncodeError
+            body = None
+        if body is not None and body.isascii() and b'\x7f' not in body:
+            response = app.response_class(body + b"\n", status=status, mimetype=app.json.mimetype)
+    if response is None:
+        response = app.json.response(payload)
+        response.status_code = status
+    g.serialize_seconds = g.get('serialize_seconds', 0.0) + time.perf_counter() - started
+    return response
+
+# Full-text search index
+# product_fts is an external-content FTS5 table over product. Triggers keep it in
+# sync for every write to product (ORM, bulk statements or raw SQL alike).
+SEARCH_COLUMNS = ['product_name', 'category', 'short_description', 'long_description', 'rubber_description']
+SEARCH_RANK = 'bm25(10.0, 4.0, 2.0, 1.0, 1.0)'  # Weights follow SEARCH_COLUMNS
+product_fts = table('product_fts', column('rowid'), column('rank'))
+
+def init_search_index():
+    if db.engine.dialect.name != 'sqlite':
+        app.config['SEARCH_FTS_ENABLED'] = False
+        return
+    columns = ', '.join(SEARCH_COLUMNS)
+    new_values = ', '.join(f'new.{c}' for c in SEARCH_COLUMNS)
+    old_values = ', '.join(f'old.{c}' for c in SEARCH_COLUMNS)
+    try:
+        with db.engine.begin() as conn:
+            created = not conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'product_fts'")).first()
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS product_fts USING fts5({columns}, "
+                f"content='product', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            ))
+            conn.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS product_fts_ai AFTER INSERT ON product BEGIN
+                    INSERT INTO product_fts(rowid, {columns}) VALUES (new.id, {new_values});
+                END"""))
+            conn.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS product_fts_ad AFTER DELETE ON product BEGIN
+                    INSERT INTO product_fts(product_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+                END"""))
+            conn.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS product_fts_au AFTER UPDATE OF {columns} ON product BEGIN
+                    INSERT INTO product_fts(product_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+                    INSERT INTO product_fts(rowid, {columns}) VALUES (new.id, {new_values});
+                END"""))
+            # Rewriting the config bumps its cookie, which fails the next ranked query on every
+            # other process's open connection ("SQL logic error"), so only write it on change
+            rank = conn.execute(text("SELECT v FROM product_fts_config WHERE k = 'rank'")).scalar()
+            if rank != SEARCH_RANK:
+                conn.execute(text("INSERT INTO product_fts(product_fts, rank) VALUES ('rank', :rank)"), {"rank": SEARCH_RANK})
+            if created:
+                conn.execute(text("INSERT INTO product_fts(product_fts) VALUES ('rebuild')"))
+    except OperationalError as e:
+        app.logger.warning("FTS5 unavailable, search falls back to ILIKE scans: %s", e)
+        app.config['SEARCH_FTS_ENABLED'] = False
+
+def rebuild_search_index():
+    with db.engine.begin() as conn:
+        conn.execute(text("INSERT INTO product_fts(product_fts) VALUES ('rebuild')"))
+        conn.execute(text("INSERT INTO product_fts(product_fts) VALUES ('optimize')"))
+
+# Turn free text into an FTS5 query: every term must match, each as a prefix
+def fts_match_expression(query):
+    terms = re.findall(r'\w+', query)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def search_is_ranked(query):
+    return bool(app.config['SEARCH_FTS_ENABLED'] and fts_match_expression(query))
+
+# Filter (and rank) a Product query by a free-text search string
+def apply_search(product_query, query):
+    if not search_is_ranked(query):
+        pattern = f'%{query}%'
+        return product_query.filter(
+            Product.product_name.ilike(pattern) |
+            Product.category.ilike(pattern) |
+            Product.short_description.ilike(pattern) |
+            Product.long_description.ilike(pattern) |
+            Product.rubber_description.ilike(pattern)
+        )
+    return (product_query
+            .join(product_fts, product_fts.c.rowid == Product.id)
+            .filter(text('product_fts MATCH :match').bindparams(match=fts_match_expression(query)))
+            .order_by(product_fts.c.rank, Product.id))
+
+# Response cache for the product read APIs
+class CachedResponse:
+    encoded = None  # Encoding -> compressed body, filled in by compress_response
+
+    def __init__(self, body, mimetype):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+
+class LRUResponseCache:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+# Shared between workers; the local LRU still sits in front of it. Entries are stored as
+# Redis hashes of plain bytes (mimetype, body and one field per encoded body), never as
+# pickles, so whoever can write to Redis cannot run code in the workers.
+class RedisResponseCache:
+    def __init__(self, url, ttl, local):
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.local = local
+
+    def get(self, key):
+        entry = self.local.get(key)
+        if entry is None:
+            fields = self.client.hgetall(f"response-cache:{key}")
+            if b'body' in fields and b'mimetype' in fields:
+                entry = CachedResponse(fields[b'body'], fields[b'mimetype'].decode())
+                entry.encoded = {name[len(b'encoded:'):].decode(): body
+                                 for name, body in fields.items() if name.startswith(b'encoded:')} or None
+                self.local.set(key, entry)
+        return entry
+
+    def set(self, key, entry):
+        self.local.set(key, entry)
+        fields = {'mimetype': entry.mimetype, 'body': entry.body}
+        fields.update((f'encoded:{encoding}', body) for encoding, body in (entry.encoded or {}).items())
+        self.client.hset(f"response-cache:{key}", mapping=fields)
+        self.client.expire(f"response-cache:{key}", self.ttl)
+
+def create_response_cache():
+    local = LRUResponseCache(app.config['RESPONSE_CACHE_MAX_ENTRIES'])
+    if app.config['RESPONSE_CACHE_REDIS_URL']:
+        if redis is None:
+            app.logger.warning("RESPONSE_CACHE_REDIS_URL is set but redis is not installed, using the in-process cache only")
+        else:
+            return RedisResponseCache(app.config['RESPONSE_CACHE_REDIS_URL'], app.config['RESPONSE_CACHE_TTL'], local)
+    return local
+
+response_cache = create_response_cache()
+
+# Key on catalog version, route and normalized query args (sorted, so ?a=1&b=2 == ?b=2&a=1)
+def response_cache_key(version):
+    args = urlencode(sorted(request.args.items(multi=True)))
+    return f"{version}:{request.path}?{args}"
+
+# Serve GETs from the response cache with strong ETags, answering If-None-Match with 304.
+# Only 200 responses are stored; errors always go through the view.
+def cached_response(view):
+    @wraps(view)
+    def wrap(*args, **kwargs):
+        if not app.config['RESPONSE_CACHE_ENABLED']:
+            return view(*args, **kwargs)
+        key = response_cache_key(current_catalog_version())
+        entry = response_cache.get(key)
+        if entry is None:
+            if app.config['CATALOG_SNAPSHOT_ENABLED']:
+                # The new version may come from another worker's write that the snapshot has not
+                # picked up yet; a body built from the lagging snapshot would be cached under it
+                snapshot_store.catch_up()
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            entry = CachedResponse(response.get_data(), response.mimetype)
+            response_cache.set(key, entry)
+        # Each encoding is its own representation, so it gets its own strong ETag
+        encoding = negotiate_encoding(entry.mimetype, len(entry.body))
+        response = app.response_class(entry.body, mimetype=entry.mimetype)
+        response.set_etag(f"{entry.etag}-{encoding}" if encoding else entry.etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        g.response_cache_entry = (key, entry)
+        return response.make_conditional(request)
+    return wrap
+
+# Response compression
+# Compressible responses are encoded with the best of br, zstd and gzip that the client
+# accepts (br and zstd need the optional brotli and zstandard packages). Bodies served
+# from the response cache keep every encoding they were compressed to, so repeat
+# requests skip the compressor. Streamed responses (exports, /changes) are compressed
+# chunk by chunk with a flush after each, so clients still get rows as they are produced.
+COMPRESSION_ENCODINGS = ['br', 'zstd', 'gzip']  # Server preference when the client has none
+
+def available_encodings():
+    return [encoding for encoding, module in zip(COMPRESSION_ENCODINGS, (brotli, zstandard, zlib)) if module is not None]
+
+# Encoding to use for a response of this mimetype and size (None when streamed), or None
+def negotiate_encoding(mimetype, size):
+    if not app.config['RESPONSE_COMPRESSION_ENABLED'] or mimetype not in app.config['RESPONSE_COMPRESSIBLE_MIMETYPES']:
+        return None
+    if size is not None and size < app.config['RESPONSE_COMPRESSION_MIN_SIZE']:
+        return None
+    return request.accept_encodings.best_match(available_encodings())
+
+def compress_body(body, encoding):
+    level = app.config['RESPONSE_COMPRESSION_LEVELS'][encoding]
+    if encoding == 'br':
+        return brotli.compress(body, quality=level)
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(body)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+# Returns (compress_chunk, finish) for an incremental, flushing compressor
+def stream_compressor(encoding):
+    level = app.config['RESPONSE_COMPRESSION_LEVELS'][encoding]
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=level)
+        return lambda chunk: compressor.process(chunk) + compressor.flush(), compressor.finish
+    if encoding == 'zstd':
+        compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        return lambda chunk: compressor.compress(chunk) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK), compressor.flush
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    return lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+def compress_stream(chunks, encoding, route):
+    compress_chunk, finish = stream_compressor(encoding)
+    input_bytes = output_bytes = 0
+    cpu_seconds = 0.0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if not chunk:
+                continue
+            started = time.thread_time()
+            compressed = compress_chunk(chunk)
+            cpu_seconds += time.thread_time() - started
+            input_bytes += len(chunk)
+            output_bytes += len(compressed)
+            yield compressed
+        tail = finish()
+        output_bytes += len(tail)
+        yield tail
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+        request_metrics.record_compression(route, encoding, False, input_bytes, output_bytes, cpu_seconds)
+
+# Registered after record_request_metrics, so it runs first: sizes and timings are post-compression
+@app.after_request
+def compress_response(response):
+    if response.mimetype not in app.config['RESPONSE_COMPRESSIBLE_MIMETYPES'] or response.direct_passthrough \
+            or response.status_code < 200 or response.status_code == 204 or 'Content-Encoding' in response.headers:
+        return response
+    response.vary.add('Accept-Encoding')
+    if response.status_code == 304:  # No body to encode, but caches must still key on the encoding
+        return response
+    encoding = negotiate_encoding(response.mimetype, None if response.is_streamed else response.calculate_content_length())
+    if not encoding:
+        return response
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not etag.endswith(f"-{encoding}"):
+        response.set_etag(f"{etag}-{encoding}", weak)
+    if response.is_streamed:
+        response.headers.pop('Content-Length', None)
+        response.response = compress_stream(response.response, encoding, route)
+        return response
+
+    key, entry = g.get('response_cache_entry', (None, None))
+    cached = entry is not None and entry.encoded is not None and encoding in entry.encoded
+    started = time.thread_time()
+    if cached:
+        body = entry.encoded[encoding]
+    else:
+        body = compress_body(response.get_data(), encoding)
+        if entry is not None:
+            entry.encoded = dict(entry.encoded or {}, **{encoding: body})
+            response_cache.set(key, entry)  # Shares the compressed body with the other workers
+    cpu_seconds = time.thread_time() - started
+    input_bytes = response.calculate_content_length()
+    response.set_data(body)
+    request_metrics.record_compression(route, encoding, cached, input_bytes, len(body), cpu_seconds)
+    if app.config['SERVER_TIMING']:
+        g.setdefault('server_timings', []).append(
+            ('compress', cpu_seconds, f"{encoding} {input_bytes}->{len(body)}{' cached' if cached else ''}"))
+    return response
+
+# Category facets
+# product_facet holds product and in-stock counts per (category, price bucket). Triggers
+# apply +1/-1 deltas on every insert, delete and relevant update of product, so listing
+# pages and /facets read a few hundred rows instead of the product table.
+class ProductFacet(db.Model):
+    category = db.Column(db.String(100), primary_key=True)  # '' for uncategorized products
+    price_bucket = db.Column(db.Integer, primary_key=True)  # -1 for products without a price
+    product_count = db.Column(db.Integer, nullable=False, default=0)
+    in_stock_count = db.Column(db.Integer, nullable=False, default=0)
+
+def price_bucket_sql(price):
+    bounds = app.config['FACET_PRICE_BUCKETS']
+    whens = ' '.join(f'WHEN {price} < {float(bound)} THEN {n}' for n, bound in enumerate(bounds))
+    return f'CASE WHEN {price} IS NULL THEN -1 {whens} ELSE {len(bounds)} END'
+
+def facet_delta_sql(row, sign):
+    return (
+        f"INSERT INTO product_facet (category, price_bucket, product_count, in_stock_count) "
+        f"VALUES (coalesce({row}.category, ''), {price_bucket_sql(row + '.offer_price')}, {sign}1, {sign}coalesce({row}.in_stock, 0)) "
+        f"ON CONFLICT (category, price_bucket) DO UPDATE SET "
+        f"product_count = product_count + excluded.product_count, in_stock_count = in_stock_count + excluded.in_stock_count;"
+    )
+
+def init_facets(rebuild=False):
+    with db.engine.begin() as conn:
+        if rebuild:
+            for trigger in ('product_facet_ai', 'product_facet_ad', 'product_facet_au'):
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+        created = not conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'product_facet_ai'")).first()
+        conn.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS product_facet_ai AFTER INSERT ON product BEGIN
+                {facet_delta_sql('new', '+')}
+            END"""))
+        conn.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS product_facet_ad AFTER DELETE ON product BEGIN
+                {facet_delta_sql('old', '-')}
+            END"""))
+        conn.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS product_facet_au AFTER UPDATE OF category, offer_price, in_stock ON product BEGIN
+                {facet_delta_sql('old', '-')}
+                {facet_delta_sql('new', '+')}
+            END"""))
+        if created:
+            conn.execute(text("DELETE FROM product_facet"))
+            conn.execute(text(f"""
+                INSERT INTO product_facet (category, price_bucket, product_count, in_stock_count)
+                SELECT coalesce(category, ''), {price_bucket_sql('offer_price')}, count(*), coalesce(sum(in_stock), 0)
+                FROM product GROUP BY 1, 2"""))
+
+def facet_categories():
+    return db.session.scalars(
+        select(ProductFacet.category)
+        .where(ProductFacet.category != '')
+        .group_by(ProductFacet.category)
+        .having(func.sum(ProductFacet.product_count) > 0)
+        .order_by(ProductFacet.category)
+    ).all()
+
+# Schema migration for databases created before the child tables and indexes existed.
+# create_all() only adds missing tables, so indexes on existing tables are added here,
+# then the child tables are backfilled from the product columns. Products that predate
+# updated_at (or were written outside products_changed) are stamped with the current time.
+def migrate_schema(rebuild=False):
+    if 'updated_at' not in {column_info['name'] for column_info in inspect(db.engine).get_columns('product')}:
+        with db.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE product ADD COLUMN updated_at DATETIME"))
+    for model in (Product, ProductVariant, ProductMedia):
+        for index in model.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
+    with db.engine.begin() as conn:
+        # Bound as a datetime, so backfilled values share the format record_changes writes
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        conn.execute(update(Product).where(Product.updated_at.is_(None)).values(updated_at=now))
+    if not rebuild and (db.session.query(ProductVariant.id).first() or db.session.query(ProductMedia.id).first()):
+        return 0
+    has_children = or_(*[func.coalesce(getattr(Product, name), '') != '' for name in CHILD_SOURCE_FIELDS])
+    product_ids = db.session.scalars(select(Product.id).where(has_children)).all()
+    if product_ids:
+        sync_product_children(product_ids)
+        db.session.commit()
+    return len(product_ids)
+
+# PRAGMA user_version records the schema the database file was last migrated to, so only the
+# first worker started against an older file pays for the ALTERs, index builds and backfills.
+# Bump SCHEMA_VERSION whenever migrate_schema learns a new step; deployments running several
+# workers should run `flask migrate-schema` before starting them.
+SCHEMA_VERSION = 1
+
+def schema_version():
+    with db.engine.connect() as conn:
+        return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+def stamp_schema_version():
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
 # Create DB
 with app.app_context():
     db.create_all()
+    if schema_version() < SCHEMA_VERSION:
+        migrate_schema()
+        stamp_schema_version()
+    init_search_index()
+    init_facets()
+    if not db.session.get(CatalogVersion, 1):
+        db.session.add(CatalogVersion(id=1, version=0))
+        db.session.commit()
+
+@app.cli.command('migrate-schema')
+def migrate_schema_command():
+    """Add missing indexes and rebuild the variant and media tables from the product columns."""
+    count = migrate_schema(rebuild=True)
+    stamp_schema_version()
+    click.echo(f"Schema migrated, child rows rebuilt for {count} products")
+
+@app.cli.command('gc-uploads')
+def gc_uploads_command():
+    """Remove content-addressed uploads that no product references, plus stale temp files."""
+    cutoff = time.time() - app.config['UPLOAD_GC_GRACE_SECONDS']
+    names = os.listdir(app.config['UPLOAD_FOLDER'])
+    for name in names:
+        path = os.path.join(app.config['UPLOAD_FOLDER'], name)
+        if name.startswith('.upload-') and os.path.getmtime(path) < cutoff:
+            os.remove(path)
+    urls = [f"{app.config['UPLOAD_FOLDER']}/{name}" for name in names if CONTENT_ADDRESSED_NAME.match(name)]
+    removed = []
+    for start in range(0, len(urls), 500):
+        removed += collect_orphaned_uploads(urls[start:start + 500])
+    click.echo(f"Removed {len(removed)} orphaned uploads")
+
+@app.cli.command('generate-derivatives')
+@click.option('--force', is_flag=True, help='Re-render derivatives that already exist.')
+def generate_derivatives_command(force):
+    """Render thumbnail and medium derivatives for every product image upload."""
+    if Image is None:
+        raise click.ClickException("Pillow is not installed")
+    urls = db.session.scalars(select(ProductMedia.url).where(ProductMedia.kind == 'image').distinct()).all()
+    rendered = sum(future.result() for future in schedule_derivatives(urls, force=force))
+    click.echo(f"Rendered {rendered} derivatives for {len(urls)} images")
+
+@app.cli.command('precompress-uploads')
+def precompress_uploads_command():
+    """Write .gz sidecars for compressible uploads that shrink by at least 10%."""
+    folder = app.config['UPLOAD_FOLDER']
+    written = 0
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        if name.rsplit('.', 1)[-1].lower() not in app.config['UPLOAD_COMPRESSIBLE_EXTENSIONS'] \
+                or not os.path.isfile(path) or os.path.exists(path + '.gz'):
+            continue
+        with open(path, 'rb') as source:
+            compressed = gzip.compress(source.read(), compresslevel=9, mtime=0)
+        if len(compressed) <= os.path.getsize(path) * 0.9:
+            with open(path + '.gz', 'wb') as sidecar:
+                sidecar.write(compressed)
+            written += 1
+    click.echo(f"Wrote {written} compressed sidecars")
+
+@app.cli.command('prune-changes')
+@click.option('--days', type=int, default=None, help='Keep this many days of changes (default CHANGE_LOG_RETENTION_DAYS).')
+def prune_changes_command(days):
+    """Delete change log rows older than the retention window (the newest row is always kept)."""
+    days = app.config['CHANGE_LOG_RETENTION_DAYS'] if days is None else days
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days)
+    newest = db.session.scalar(select(func.max(ProductChange.id)))
+    result = db.session.execute(delete(ProductChange).where(ProductChange.changed_at < cutoff, ProductChange.id != newest))
+    db.session.commit()
+    click.echo(f"Pruned {result.rowcount} changes")
+
+@app.cli.command('rebuild-facets')
+def rebuild_facets_command():
+    """Recreate the facet triggers (e.g. after changing FACET_PRICE_BUCKETS) and recount all facets."""
+    init_facets(rebuild=True)
+    click.echo("Facets rebuilt")
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Rebuild the product full-text search index from the product table."""
+    rebuild_search_index()
+    click.echo("Search index rebuilt")
+
+@app.cli.command('check-query-plans')
+@click.option('--verbose', is_flag=True, help='Print every plan, not only the failing ones.')
+def check_query_plans_command(verbose):
+    """Fail when a listing filter or sort in LISTING_PLAN_CASES is not served by an index."""
+    failures = 0
+    for args in LISTING_PLAN_CASES:
+        plan, problems = listing_plan_problems(args)
+        label = urlencode(args)
+        if problems:
+            failures += 1
+            click.echo(f"FAIL {label}: {', '.join(problems)}")
+        elif verbose:
+            click.echo(f"ok   {label}")
+        if problems or verbose:
+            for detail in plan:
+                click.echo(f"       {detail}")
+    if failures:
+        raise click.ClickException(f"{failures} of {len(LISTING_PLAN_CASES)} listing queries are not index-backed")
+    click.echo(f"All {len(LISTING_PLAN_CASES)} listing query plans use indexes")
 
 # Helper function to check allowed file extensions
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
+# Content-addressed upload store
+# Uploads are streamed to a temp file in chunks while being hashed and stored as
+# <sha256>.<ext>: identical files are kept once and a stored file never changes under
+# its URL. References are counted through the indexed product_media.url column.
+CONTENT_ADDRESSED_NAME = re.compile(r'^[0-9a-f]{64}\.[a-z0-9]+$')
+UPLOAD_EXTENSION_ALIASES = {'jpeg': 'jpg'}
+
+def upload_extension(filename):
+    extension = filename.rsplit('.', 1)[1].lower()
+    return UPLOAD_EXTENSION_ALIASES.get(extension, extension)
+
+# Move a fully written temp file to its content-addressed name, or drop it when that
+# content is already stored; returns the upload's URL
+def place_upload(temp_path, digest, extension):
+    filename = f"{digest}.{extension}"
+    path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    if os.path.exists(path):
+        os.remove(temp_path)
+        os.utime(path)  # Fresh mtime keeps a concurrent GC pass off a file about to be referenced
+    else:
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    return f"{app.config['UPLOAD_FOLDER']}/{filename}"
+
+def store_upload(file_storage):
+    extension = upload_extension(file_storage.filename)
+    digest = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=app.config['UPLOAD_FOLDER'], prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            while True:
+                chunk = file_storage.stream.read(app.config['UPLOAD_CHUNK_SIZE'])
+                if not chunk:
+                    break
+                digest.update(chunk)
+                temp_file.write(chunk)
+        return place_upload(temp_path, digest.hexdigest(), extension)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+# Streaming uploads for the product forms
+# Werkzeug hands each file part of a multipart body to the request's stream factory as it
+# arrives. On the add/edit forms that is an UploadSpool: a temp file in UPLOAD_FOLDER that
+# is hashed and size-checked (UPLOAD_MAX_FILE_SIZES) as it is written, so the form is never
+# buffered in memory and an oversized file fails with 413 as soon as it crosses its limit.
+# Once a part is complete its spool is fsynced and moved to its content-addressed name on
+# the upload-finalize pool, overlapping with the parts still being received.
+UPLOAD_FORM_ENDPOINTS = {'add_product_ui', 'edit_product_ui'}
+upload_finalize_executor = None
+upload_finalize_lock = threading.Lock()
+
+class UploadSpool:
+    def __init__(self, extension, limit):
+        self.extension = extension
+        self.limit = limit
+        self.size = 0
+        self.digest = hashlib.sha256()
+        fd, self.temp_path = tempfile.mkstemp(dir=app.config['UPLOAD_FOLDER'], prefix='.upload-')
+        self.file = os.fdopen(fd, 'wb+')
+        self.future = None  # Set once the spool is handed to the finalize pool
+
+    def write(self, data):
+        self.size += len(data)
+        if self.limit is not None and self.size > self.limit:
+            raise RequestEntityTooLarge(f"{self.extension} files are limited to {self.limit} bytes")
+        self.digest.update(data)
+        return self.file.write(data)
+
+    def __getattr__(self, name):  # read, seek, tell, ... on the temp file
+        return getattr(self.file, name)
+
+    def store(self):
+        try:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+            return place_upload(self.temp_path, self.digest.hexdigest(), self.extension)
+        except Exception:
+            self.discard()
+            raise
+
+    # Future resolving to the stored upload's URL
+    def finalize(self):
+        global upload_finalize_executor
+        if self.future is None:
+            with upload_finalize_lock:
+                if upload_finalize_executor is None:
+                    upload_finalize_executor = ThreadPoolExecutor(max_workers=app.config['UPLOAD_FINALIZE_WORKERS'],
+                                                                  thread_name_prefix='upload-finalize')
+                self.future = upload_finalize_executor.submit(self.store)
+        return self.future
+
+    def discard(self):
+        self.file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+    def close(self):
+        if self.future is None:  # Never finalized: rejected or abandoned form
+            self.discard()
+        else:
+            wait([self.future])  # A rejected form still ends with no temp file left behind
+
+class UploadRequest(Request):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_spools = []
+
+    @property
+    def max_content_length(self):
+        if self.endpoint in UPLOAD_FORM_ENDPOINTS:
+            return app.config['UPLOAD_MAX_CONTENT_LENGTH']
+        return super().max_content_length
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint not in UPLOAD_FORM_ENDPOINTS:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        if self.upload_spools:
+            self.upload_spools[-1].finalize()  # Parts arrive one after another, so the previous one is complete
+        if not (filename and allowed_file(filename)):
+            return open(os.devnull, 'wb+')  # The forms ignore these parts; don't spool them
+        spool = UploadSpool(upload_extension(filename), app.config['UPLOAD_MAX_FILE_SIZES'].get(filename.rsplit('.', 1)[1].lower()))
+        self.upload_spools.append(spool)
+        return spool
+
+    def _load_form_data(self):
+        super()._load_form_data()
+        if self.upload_spools:
+            self.upload_spools[-1].finalize()  # The form is complete, so is its last part
+
+    def close(self):
+        super().close()
+        for spool in self.upload_spools:
+            spool.close()
+
+app.request_class = UploadRequest
+
+# Store the allowed files among file_storages, concurrently for streamed ones; returns
+# (original filename, URL) pairs in upload order, skipping (and logging) failures
+def store_uploads(file_storages):
+    pending = []
+    for file_storage in file_storages:
+        if file_storage and allowed_file(file_storage.filename):
+            if isinstance(file_storage.stream, UploadSpool):
+                future = file_storage.stream.finalize()
+            else:
+                future = Future()
+                try:
+                    future.set_result(store_upload(file_storage))
+                except Exception as e:
+                    future.set_exception(e)
+            pending.append((file_storage.filename, future))
+    stored = []
+    for filename, future in pending:
+        try:
+            stored.append((filename, future.result()))
+            app.logger.debug("Saved upload %s as %s", filename, stored[-1][1])
+        except Exception as e:
+            app.logger.error("Error saving upload %s: %s", filename, e)
+    return stored
+
+# Put urls in the order the form lists them. Entries are a URL (external images), a
+# stored file's basename, or a new upload's URL (original filenames mapped through
+# uploaded); listed urls come first, the rest keep their order. Each entry is looked up
+# by key rather than matched against every URL.
+def order_image_urls(image_urls, image_order, uploaded):
+    positions = {}
+    for position, url in enumerate(image_urls):
+        positions.setdefault(url, deque()).append(position)
+        positions.setdefault(url.rsplit('/', 1)[-1], deque()).append(position)
+    taken = set()
+    ordered = []
+    for name in image_order:
+        candidates = positions.get(uploaded.get(name, name))
+        while candidates and candidates[0] in taken:
+            candidates.popleft()
+        if candidates:
+            taken.add(candidates[0])
+            ordered.append(image_urls[candidates.popleft()])
+    return ordered + [url for position, url in enumerate(image_urls) if position not in taken]
+
+def upload_path(url):
+    prefix = f"{app.config['UPLOAD_FOLDER']}/"
+    url = url.lstrip('/')
+    if url.startswith(prefix) and CONTENT_ADDRESSED_NAME.match(url[len(prefix):]):
+        return os.path.join(app.config['UPLOAD_FOLDER'], url[len(prefix):])
+    return None
+
+# Remove content-addressed uploads among urls that no product references any more.
+# Files touched within UPLOAD_GC_GRACE_SECONDS are kept: they may belong to an upload
+# whose product has not been committed yet. Products may reference an upload with or
+# without a leading slash, so references are matched by file, not by URL string.
+def collect_orphaned_uploads(urls):
+    candidates = {}
+    for url in urls:
+        path = upload_path(url)
+        if path:
+            candidates.setdefault(path, url)
+    if not candidates:
+        return []
+    prefix = f"{app.config['UPLOAD_FOLDER']}/"
+    spellings = [f"{lead}{prefix}{os.path.basename(path)}" for path in candidates for lead in ('', '/')]
+    with db.engine.connect() as conn:
+        referenced = {upload_path(url) for url in conn.scalars(select(ProductMedia.url).where(ProductMedia.url.in_(spellings)).distinct())}
+    cutoff = time.time() - app.config['UPLOAD_GC_GRACE_SECONDS']
+    removed = []
+    for path, url in candidates.items():
+        try:
+            if path not in referenced and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                for _, suffix in UPLOAD_SIDECARS:
+                    if os.path.exists(path + suffix):
+                        os.remove(path + suffix)
+                remove_derivatives(os.path.basename(path))
+                removed.append(url)
+        except FileNotFoundError:
+            pass
+    if removed:
+        app.logger.debug("Removed orphaned uploads: %s", removed)
+    return removed
+
+# Released uploads are collected on one background thread after the commit, so a write
+# that drops hundreds of products' media does not wait on the file removals
+upload_gc_executor = None
+upload_gc_lock = threading.Lock()
+
+def _collect_orphaned_uploads_job(urls):
+    removed = []
+    with app.app_context():
+        for start in range(0, len(urls), 500):
+            try:
+                removed += collect_orphaned_uploads(urls[start:start + 500])
+            except Exception as e:
+                app.logger.error("Error collecting orphaned uploads: %s", e)
+    return removed
+
+def schedule_upload_gc(urls):
+    global upload_gc_executor
+    with upload_gc_lock:
+        if upload_gc_executor is None:
+            upload_gc_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='upload-gc')
+        return upload_gc_executor.submit(_collect_orphaned_uploads_job, sorted(urls))
+
+@event.listens_for(Session, 'after_commit')
+def collect_released_uploads(session):
+    if session.in_nested_transaction():
+        return
+    released = session.info.pop('released_uploads', None)
+    if released:
+        schedule_upload_gc(released)
+
+@event.listens_for(Session, 'after_rollback')
+def forget_released_uploads(session):
+    if not session.in_nested_transaction():
+        session.info.pop('released_uploads', None)
+
+# Image derivatives
+# Resized, recompressed copies of uploaded images (plus WebP when Pillow supports it)
+# are rendered on a background pool after upload, under UPLOAD_FOLDER/derived as
+# <original name>.<size>.<ext>. Their URLs are derived from the original's, and
+# serve_uploaded_file falls back to the original until the derivative exists.
+IMAGE_DERIVATIVE_EXTENSIONS = {'jpg', 'jpeg', 'png'}
+derivative_executor = None
+derivative_lock = threading.Lock()
+derivatives_pending = set()
+
+def local_image_name(url):
+    prefix = f"{app.config['UPLOAD_FOLDER']}/"
+    url = url.strip().lstrip('/')
+    name = url[len(prefix):]
+    if url.startswith(prefix) and '/' not in name and '.' in name and name.rsplit('.', 1)[1].lower() in IMAGE_DERIVATIVE_EXTENSIONS:
+        return name
+    return None
+
+def webp_derivatives_enabled():
+    return app.config['IMAGE_DERIVATIVE_WEBP'] and Image is not None and features.check('webp')
+
+def derivative_name(name, size, webp=False):
+    extension = 'webp' if webp else ('png' if name.lower().endswith('.png') else 'jpg')
+    return f"derived/{name}.{size}.{extension}"
+
+def image_derivatives(url):
+    name = local_image_name(url)
+    derivatives = {'original': url}
+    if name:
+        for size in app.config['IMAGE_DERIVATIVE_SIZES']:
+            derivatives[size] = f"{app.config['UPLOAD_FOLDER']}/{derivative_name(name, size)}"
+            if webp_derivatives_enabled():
+                derivatives[f"{size}_webp"] = f"{app.config['UPLOAD_FOLDER']}/{derivative_name(name, size, webp=True)}"
+    return derivatives
+
+@app.template_filter('derivative')
+def derivative_filter(url, size):
+    name = local_image_name(url)
+    return f"{app.config['UPLOAD_FOLDER']}/{derivative_name(name, size)}" if name else url
+
+def derivative_outputs(name):
+    outputs = []
+    for size, edge in app.config['IMAGE_DERIVATIVE_SIZES'].items():
+        outputs.append((derivative_name(name, size), edge, 'PNG' if name.lower().endswith('.png') else 'JPEG'))
+        if webp_derivatives_enabled():
+            outputs.append((derivative_name(name, size, webp=True), edge, 'WEBP'))
+    return outputs
+
+def render_derivatives(name, force=False):
+    folder = app.config['UPLOAD_FOLDER']
+    outputs = [output for output in derivative_outputs(name)
+               if force or not os.path.exists(os.path.join(folder, output[0]))]
+    if not outputs:
+        return 0
+    os.makedirs(os.path.join(folder, 'derived'), exist_ok=True)
+    with Image.open(os.path.join(folder, name)) as source:
+        source = ImageOps.exif_transpose(source)
+        for output, edge, image_format in outputs:
+            image = source.copy()
+            image.thumbnail((edge, edge), Image.LANCZOS)  # Never upscales
+            if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            fd, temp_path = tempfile.mkstemp(dir=os.path.join(folder, 'derived'), prefix='.upload-')
+            try:
+                with os.fdopen(fd, 'wb') as temp_file:
+                    if image_format == 'PNG':
+                        image.save(temp_file, 'PNG', optimize=True)
+                    else:
+                        image.save(temp_file, image_format, quality=app.config['IMAGE_DERIVATIVE_QUALITY'], optimize=True)
+                os.chmod(temp_path, 0o644)
+                os.replace(temp_path, os.path.join(folder, output))
+            except Exception:
+                os.remove(temp_path)
+                raise
+    return len(outputs)
+
+def _render_derivatives_job(name, force):
+    try:
+        return render_derivatives(name, force)
+    except FileNotFoundError:
+        return 0  # Original was garbage-collected meanwhile
+    except Exception as e:
+        app.logger.error("Error rendering derivatives for %s: %s", name, e)
+        return 0
+    finally:
+        with derivative_lock:
+            derivatives_pending.discard(name)
+
+# Queue derivative rendering for the local images among urls; returns the futures
+def schedule_derivatives(urls, force=False):
+    global derivative_executor
+    if Image is None:
+        return []
+    futures = []
+    with derivative_lock:
+        if derivative_executor is None:
+            derivative_executor = ThreadPoolExecutor(max_workers=app.config['IMAGE_DERIVATIVE_WORKERS'],
+                                                     thread_name_prefix='derivatives')
+        for name in dict.fromkeys(filter(None, map(local_image_name, urls))):
+            if name not in derivatives_pending:
+                derivatives_pending.add(name)
+                futures.append(derivative_executor.submit(_render_derivatives_job, name, force))
+    return futures
+
+def remove_derivatives(name):
+    for output, _, _ in derivative_outputs(name):
+        try:
+            os.remove(os.path.join(app.config['UPLOAD_FOLDER'], output))
+        except FileNotFoundError:
+            pass
+
+# Clamp the requested page size to the configured ceiling
+# Clamped to 1..MAX_PER_PAGE: zero or negative sizes would reach LIMIT and the cursor slicing
+def get_per_page():
+    return max(1, min(request.args.get('per_page', 10, type=int), app.config['MAX_PER_PAGE']))
+
+# Keyset pagination: a cursor is an opaque token holding the sort key of the last row served,
+# so the next page is an indexed range scan instead of OFFSET plus COUNT(*)
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(',', ':')).encode()).decode()
+
+def decode_cursor(token):
+    if not token:
+        return None
+    try:
+        return json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid cursor: {token}")
+
+# Fetch one row past the page to learn whether another page exists, without a COUNT(*)
+def keyset_page(product_query, per_page):
+    rows = product_query.limit(per_page + 1).all()
+    return rows[:per_page], len(rows) > per_page
+
+# Listing query engine
+# Sorting and filtering shared by the UI listing, /products, /search and /products/export,
+# applied to SQL statements or to the catalog snapshot:
+#   sort=offer_price,-id  SORT_FIELDS, comma-separated, '-' for descending. id is always the
+#                         final key (in the direction of the one before it), so pages and
+#                         cursors are stable and an index on the sort column covers it.
+#   category=, in_stock=true|false, is_rubber=true|false
+#   min_/max_price, and min_/max_density, _height, _length and _thickness for rubber
+# Product's indexes cover LISTING_PLAN_CASES; `flask check-query-plans` fails when one of
+# them needs a full table scan or a sort pass.
+SORT_FIELDS = ['id', 'product_name', 'category', 'offer_price', 'mrp', 'stock_number', 'updated_at',
+               'rubber_density', 'rubber_height', 'rubber_length', 'rubber_thickness']
+TEXT_SORT_FIELDS = {'product_name', 'category', 'updated_at'}
+BOOLEAN_FILTERS = ['in_stock', 'is_rubber']
+RANGE_FILTERS = {'price': 'offer_price', 'density': 'rubber_density', 'height': 'rubber_height',
+                 'length': 'rubber_length', 'thickness': 'rubber_thickness'}
+
+def parse_sort(value):
+    sort = []
+    for term in filter(None, (term.strip() for term in value.split(','))):
+        field, descending = term.lstrip('-'), term.startswith('-')
+        if field not in SORT_FIELDS:
+            raise ValueError(f"Unknown sort field: {field}")
+        if field not in dict(sort):
+            sort.append((field, descending))
+        if field == 'id':
+            break
+    if not sort or sort[-1][0] != 'id':
+        sort.append(('id', sort[-1][1] if sort else False))
+    return sort
+
+class ListingQuery:
+    def __init__(self, category='', booleans=None, ranges=None, sort=None):
+        self.category = category
+        self.booleans = booleans or {}  # Field -> required value
+        self.ranges = ranges or {}  # Field -> (low, high), inclusive, either may be None
+        self.sort = sort or [('id', False)]  # (field, descending) pairs ending with id
+
+    # Raises ValueError for an unknown sort field; unparsable numbers are ignored like before
+    @classmethod
+    def from_args(cls, args):
+        booleans = {field: args[field] == 'true' for field in BOOLEAN_FILTERS if args.get(field)}
+        ranges = {}
+        for name, field in RANGE_FILTERS.items():
+            low, high = args.get(f'min_{name}', type=float), args.get(f'max_{name}', type=float)
+            if low is not None or high is not None:
+                ranges[field] = (low, high)
+        return cls(args.get('category', ''), booleans, ranges, parse_sort(args.get('sort', '')))
+
+    @property
+    def filtered(self):
+        return bool(self.category or self.booleans or self.ranges)
+
+    @property
+    def default_order(self):
+        return self.sort == [('id', False)]
+
+    def filter(self, statement):
+        if self.category:
+            statement = statement.filter(Product.category == self.category)
+        for field, value in self.booleans.items():
+            statement = statement.filter(getattr(Product, field) == value)
+        for field, (low, high) in self.ranges.items():
+            if low is not None:
+                statement = statement.filter(getattr(Product, field) >= low)
+            if high is not None:
+                statement = statement.filter(getattr(Product, field) <= high)
+        return statement
+
+    def order(self, statement):
+        columns = []
+        for field, descending in self.sort:
+            column = getattr(Product, field)
+            if field == 'id' and not columns and self.ranges:
+                # Without stats SQLite walks the whole table in rowid order rather than sort the
+                # rows a one-sided range matches; `id + 0` takes that plan off the table
+                column = column + 0
+            columns.append(column.desc() if descending else column)
+        return statement.order_by(*columns)
+
+    # Extra columns carrying the sort key, for building the next cursor
+    def key_columns(self):
+        return [getattr(Product, field).label(f'sort_{position}') for position, (field, _) in enumerate(self.sort)]
+
+    # Cursor payload for a row selected with key_columns() at the end: the bare id for the
+    # default order (the format cursors have always had), else the list of sort values
+    def encode_key(self, row):
+        if self.default_order:
+            return row[-1]
+        values = list(row[-len(self.sort):])
+        return [value.isoformat() if isinstance(value, datetime) else value for value in values]
+
+    def decode_key(self, key):
+        if self.default_order:
+            if not isinstance(key, int) or isinstance(key, bool):
+                raise ValueError(f"Invalid cursor: {key}")
+            return [key]
+        if not isinstance(key, list) or len(key) != len(self.sort):
+            raise ValueError(f"Invalid cursor: {key}")
+        values = []
+        for (field, _), value in zip(self.sort, key):
+            expected = str if field in TEXT_SORT_FIELDS else (int, float)
+            if isinstance(value, bool) or not (value is None or isinstance(value, expected)) or (field == 'id' and not isinstance(value, int)):
+                raise ValueError(f"Invalid cursor: {key}")
+            if field == 'updated_at' and value is not None:
+                value = datetime.fromisoformat(value)
+            values.append(value)
+        return values
+
+    # Rows strictly after the row with these sort values, in this order. SQLite sorts NULLs
+    # first, so they lead ascending columns and trail descending ones.
+    def after(self, values):
+        clauses = []
+        for position, (field, descending) in enumerate(self.sort):
+            column, value = getattr(Product, field), values[position]
+            if value is None:
+                beyond = None if descending else column.isnot(None)
+            else:
+                beyond = or_(column < value, column.is_(None)) if descending else column > value
+            if beyond is not None:
+                equal = [getattr(Product, earlier) == earlier_value if earlier_value is not None else getattr(Product, earlier).is_(None)
+                         for (earlier, _), earlier_value in zip(self.sort[:position], values[:position])]
+                clauses.append(and_(*equal, beyond))
+        return or_(*clauses)
+
+# Representative listings whose plans `flask check-query-plans` verifies
+LISTING_PLAN_CASES = [
+    {'category': 'Gaskets'},
+    {'in_stock': 'true'},
+    {'is_rubber': 'true'},
+    {'min_price': '100', 'max_price': '500'},
+    {'category': 'Gaskets', 'in_stock': 'true', 'min_price': '100', 'max_price': '500'},
+    {'is_rubber': 'true', 'min_thickness': '2', 'max_thickness': '5'},
+    {'min_density': '1.2'},
+    {'min_height': '500', 'max_height': '1000'},
+    {'max_length': '2000'},
+    {'sort': 'offer_price'},
+    {'sort': '-offer_price'},
+    {'sort': 'product_name'},
+    {'sort': '-updated_at'},
+    {'category': 'Gaskets', 'sort': 'offer_price'},
+    {'category': 'Gaskets', 'sort': '-offer_price'},
+    {'category': 'Gaskets', 'sort': 'product_name'},
+    {'category': 'Gaskets', 'in_stock': 'true', 'sort': 'offer_price'},
+    {'in_stock': 'true', 'sort': '-offer_price'},
+    {'min_price': '100', 'max_price': '500', 'sort': 'offer_price'},
+]
+
+# Problems in the query plan of a listing: filters must search an index, requested
+# sorts must read one in order. Plans come from the app database unless a connection is given.
+def listing_plan_problems(args, connection=None):
+    connection = connection if connection is not None else db.session
+    listing = ListingQuery.from_args(MultiDict(args))
+    statement = listing.order(listing.filter(select(*product_columns()))).limit(50)
+    sql = str(statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    plan = [row[-1] for row in connection.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+    problems = []
+    if listing.filtered and any(re.fullmatch(r'SCAN product( USING .*)?', detail) for detail in plan):
+        problems.append('full scan')
+    if args.get('sort') and any('TEMP B-TREE' in detail for detail in plan):
+        problems.append('sorts in a temp b-tree')
+    return plan, problems
+
+# In-memory catalog snapshot
+# With CATALOG_SNAPSHOT_ENABLED, each process keeps an immutable snapshot of the catalog:
+# one tuple per product (SNAPSHOT_FIELDS order, repeated strings interned) plus
+# array-backed indexes by id and offer_price and tuple indexes by SKU and category.
+# Reads project and filter it without touching SQLite. Writes never mutate a snapshot:
+# the next read after a commit in this process, or after CATALOG_SNAPSHOT_MAX_LAG for
+# other processes, replays the change log into a patched copy and swaps it in. Records
+# and the SKU and category indexes are split into shards, and a patched copy shares
+# every shard it does not touch, so a refresh costs little more than the changes it applies.
+SNAPSHOT_FIELDS = PRODUCT_FIELDS + ['updated_at', 'primary_image_url']
+SNAPSHOT_INDEX = {field: position for position, field in enumerate(SNAPSHOT_FIELDS)}
+SNAPSHOT_INDEX['image_derivatives'] = SNAPSHOT_INDEX['product_image_urls']  # Expanded by the serializer
+SNAPSHOT_INTERNED = [SNAPSHOT_INDEX['category'], SNAPSHOT_INDEX['manufacturer']]
+ID, SKU, CATEGORY, OFFER_PRICE, IN_STOCK = (SNAPSHOT_INDEX[field] for field in ('id', 'sku', 'category', 'offer_price', 'in_stock'))
+SNAPSHOT_SHARD_BITS = 10  # Records are sharded by id, 1024 consecutive ids per shard
+SNAPSHOT_KEY_SHARDS = 256  # SKU and category indexes are sharded by key hash
+
+def snapshot_record(row):
+    record = list(row)
+    for position in SNAPSHOT_INTERNED:
+        if record[position] is not None:
+            record[position] = sys.intern(record[position])
+    return tuple(record)
+
+def load_snapshot_records(product_ids=None):
+    statement = select(*product_columns(SNAPSHOT_FIELDS))
+    if product_ids is None:
+        return {row[ID]: snapshot_record(row) for row in db.session.execute(statement)}
+    records = {}
+    for start in range(0, len(product_ids), 500):
+        for row in db.session.execute(statement.where(Product.id.in_(product_ids[start:start + 500]))):
+            records[row[ID]] = snapshot_record(row)
+    return records
+
+def _key_shards(index):
+    shards = {}
+    for key, ids in index.items():
+        shards.setdefault(hash(key) % SNAPSHOT_KEY_SHARDS, {})[key] = tuple(ids)
+    return shards
+
+# Copy-on-write: a patch replaces a shared shard with its own copy on first write
+def _owned_shard(shards, shard_key, owned):
+    if shard_key not in owned:
+        shards[shard_key] = dict(shards.get(shard_key, ()))
+        owned.add(shard_key)
+    return shards[shard_key]
+
+# Apply {key: (removed ids, added ids)} to a key-sharded index, one rebuild per key
+def _patch_key_index(shards, changes):
+    owned = set()
+    for key, (removed, added) in changes.items():
+        shard = _owned_shard(shards, hash(key) % SNAPSHOT_KEY_SHARDS, owned)
+        ids = tuple(sorted(set(shard.get(key, ())).difference(removed).union(added)))
+        if ids:
+            shard[key] = ids
+        else:
+            shard.pop(key, None)
+
+class CatalogSnapshot:
+    __slots__ = ('records', 'ids', 'by_sku', 'by_category', 'prices', 'price_ids', 'change_id')
+
+    def __init__(self, records, change_id):
+        self.change_id = change_id
+        self.ids = array('q', sorted(records))
+        self.records = {}
+        by_sku, by_category = {}, {}
+        for product_id in self.ids:  # Ascending, so every id list comes out sorted
+            record = records[product_id]
+            self.records.setdefault(product_id >> SNAPSHOT_SHARD_BITS, {})[product_id] = record
+            by_sku.setdefault(record[SKU], []).append(product_id)
+            by_category.setdefault(record[CATEGORY], []).append(product_id)
+        self.by_sku, self.by_category = _key_shards(by_sku), _key_shards(by_category)
+        priced = sorted((record[OFFER_PRICE], product_id) for product_id, record in records.items() if record[OFFER_PRICE] is not None)
+        self.prices = array('d', [price for price, _ in priced])
+        self.price_ids = array('q', [product_id for _, product_id in priced])
+
+    # A copy with upserts (id -> record) and deletes applied; self stays untouched.
+    # Only the shards holding changed records or index keys are copied.
+    def patched(self, upserts, deleted, change_id):
+        patch = object.__new__(CatalogSnapshot)
+        patch.records = dict(self.records)
+        patch.change_id = change_id
+        patch.ids = array('q', self.ids)
+        patch.by_sku, patch.by_category = dict(self.by_sku), dict(self.by_category)
+        patch.prices, patch.price_ids = array('d', self.prices), array('q', self.price_ids)
+        owned, sku_changes, category_changes = set(), {}, {}
+        for product_id in list(upserts) + list(deleted):
+            old = self.record(product_id)
+            if old is None:
+                continue
+            del _owned_shard(patch.records, product_id >> SNAPSHOT_SHARD_BITS, owned)[product_id]
+            patch.ids.pop(bisect.bisect_left(patch.ids, product_id))
+            sku_changes.setdefault(old[SKU], (set(), set()))[0].add(product_id)
+            category_changes.setdefault(old[CATEGORY], (set(), set()))[0].add(product_id)
+            if old[OFFER_PRICE] is not None:
+                position = bisect.bisect_left(patch.prices, old[OFFER_PRICE])
+                while patch.price_ids[position] != product_id:
+                    position += 1
+                patch.prices.pop(position)
+                patch.price_ids.pop(position)
+        for product_id, record in upserts.items():
+            _owned_shard(patch.records, product_id >> SNAPSHOT_SHARD_BITS, owned)[product_id] = record
+            patch.ids.insert(bisect.bisect_left(patch.ids, product_id), product_id)
+            sku_changes.setdefault(record[SKU], (set(), set()))[1].add(product_id)
+            category_changes.setdefault(record[CATEGORY], (set(), set()))[1].add(product_id)
+            if record[OFFER_PRICE] is not None:
+                position = bisect.bisect_right(patch.prices, record[OFFER_PRICE])
+                patch.prices.insert(position, record[OFFER_PRICE])
+                patch.price_ids.insert(position, product_id)
+        _patch_key_index(patch.by_sku, sku_changes)
+        _patch_key_index(patch.by_category, category_changes)
+        return patch
+
+    def record(self, product_id):
+        shard = self.records.get(product_id >> SNAPSHOT_SHARD_BITS)
+        return shard.get(product_id) if shard is not None else None
+
+    def category_ids(self, category):
+        return self.by_category.get(hash(category) % SNAPSHOT_KEY_SHARDS, {}).get(category, ())
+
+    # Rows for serialize_product_rows, in the order of product_ids (missing ids skipped)
+    def rows(self, product_ids, fields):
+        positions = [SNAPSHOT_INDEX[field] for field in fields]
+        return [tuple([record[position] for position in positions])
+                for record in map(self.record, product_ids) if record is not None]
+
+    # Transient Product instances for the templates
+    def products(self, product_ids):
+        count = len(PRODUCT_FIELDS)
+        return [Product(**dict(zip(PRODUCT_FIELDS, record[:count])))
+                for record in map(self.record, product_ids) if record is not None]
+
+    # Ids matching a ListingQuery's filters, in its sort order
+    def filter_ids(self, listing):
+        category, ranges = listing.category, dict(listing.ranges)
+        if 'offer_price' in ranges:
+            min_price, max_price = ranges.pop('offer_price')
+            start = 0 if min_price is None else bisect.bisect_left(self.prices, min_price)
+            end = len(self.prices) if max_price is None else bisect.bisect_right(self.prices, max_price)
+            candidates = sorted(self.price_ids[start:end])
+        elif category:
+            candidates = self.category_ids(category)
+            category = None
+        else:
+            candidates = self.ids
+        equal = [(SNAPSHOT_INDEX[field], value) for field, value in listing.booleans.items()]
+        if category:
+            equal.append((CATEGORY, category))
+        bounds = [(SNAPSHOT_INDEX[field], low, high) for field, (low, high) in ranges.items()]
+        if equal or bounds:
+            shards = self.records
+            candidates = [product_id for product_id, record in
+                          ((product_id, shards[product_id >> SNAPSHOT_SHARD_BITS][product_id]) for product_id in candidates)
+                          if all(record[position] == value for position, value in equal)
+                          and all(record[position] is not None
+                                  and (low is None or record[position] >= low)
+                                  and (high is None or record[position] <= high)
+                                  for position, low, high in bounds)]
+        return self.sorted_ids(candidates, listing)
+
+    # Stable sorts from the last key to the first, with NULLs placed as SQLite places them
+    def sorted_ids(self, product_ids, listing):
+        if listing.default_order:
+            return product_ids
+        shards = self.records
+        records = {product_id: shards[product_id >> SNAPSHOT_SHARD_BITS][product_id] for product_id in product_ids}
+        product_ids = list(product_ids)
+        for field, descending in reversed(listing.sort):
+            position = SNAPSHOT_INDEX[field]
+            product_ids.sort(key=lambda product_id: (records[product_id][position] is not None, records[product_id][position]),
+                             reverse=descending)
+        return product_ids
+
+    def page_ids(self, after_id, limit):
+        start = bisect.bisect_right(self.ids, after_id) if after_id is not None else 0
+        return self.ids[start:start + limit]
+
+    def memory_bytes(self):
+        seen = set()
+        total = sum(map(sys.getsizeof, (self.records, self.ids, self.by_sku, self.by_category, self.prices, self.price_ids)))
+        for shards in (self.by_sku, self.by_category):
+            for shard in shards.values():
+                total += sys.getsizeof(shard) + sum(map(sys.getsizeof, shard.values()))
+        for shard in self.records.values():
+            total += sys.getsizeof(shard)
+            for record in shard.values():
+                total += sys.getsizeof(record)
+                for value in record:
+                    if id(value) not in seen:
+                        seen.add(id(value))
+                        total += sys.getsizeof(value)
+        return total
+
+class SnapshotStore:
+    def __init__(self):
+        self.snapshot = None
+        self.lock = threading.Lock()
+        self.checked_at = 0.0
+        self.full_builds = 0
+        self.incremental_updates = 0
+        self.last_update_seconds = 0.0
+
+    def invalidate(self):
+        self.checked_at = 0.0
+
+    def current(self):
+        if time.monotonic() - self.checked_at > app.config['CATALOG_SNAPSHOT_MAX_LAG']:
+            with self.lock:
+                if time.monotonic() - self.checked_at > app.config['CATALOG_SNAPSHOT_MAX_LAG']:
+                    self.refresh()
+        return self.snapshot
+
+    # Ignores CATALOG_SNAPSHOT_MAX_LAG: for callers that must not see an older catalog
+    # than the version they just read (see cached_response)
+    def catch_up(self):
+        if self.snapshot is not None:
+            with self.lock:
+                self.refresh()
+
+    def refresh(self):
+        started = time.perf_counter()
+        checked_at = time.monotonic()
+        head = db.session.scalar(select(func.max(ProductChange.id))) or 0
+        snapshot = self.snapshot
+        if snapshot is None or db.session.scalar(select(func.min(ProductChange.id)).where(ProductChange.id > snapshot.change_id)) not in (None, snapshot.change_id + 1):
+            # First build, or the change log was pruned past this snapshot
+            self.snapshot = CatalogSnapshot(load_snapshot_records(), head)
+            self.full_builds += 1
+        elif head > snapshot.change_id:
+            changed = list(dict.fromkeys(db.session.scalars(
+                select(ProductChange.product_id).where(ProductChange.id > snapshot.change_id, ProductChange.id <= head)
+            )))
+            upserts = load_snapshot_records(changed)
+            self.snapshot = snapshot.patched(upserts, [product_id for product_id in changed if product_id not in upserts], head)
+            self.incremental_updates += 1
+        else:
+            self.checked_at = checked_at
+            return
+        self.checked_at = checked_at
+        self.last_update_seconds = time.perf_counter() - started
+
+    def stats(self):
+        snapshot = self.snapshot
+        products = len(snapshot.ids) if snapshot else 0
+        memory = snapshot.memory_bytes() if snapshot else 0
+        return {
+            "products": products,
+            "change_id": snapshot.change_id if snapshot else None,
+            "memory_bytes": memory,
+            "memory_bytes_per_10k_products": round(memory / products * 10000) if products else 0,
+            "full_builds": self.full_builds,
+            "incremental_updates": self.incremental_updates,
+            "last_update_seconds": round(self.last_update_seconds, 6),
+        }
+
+snapshot_store = SnapshotStore()
+
+# The current snapshot, or None when disabled
+def catalog_snapshot():
+    return snapshot_store.current() if app.config['CATALOG_SNAPSHOT_ENABLED'] else None
+
+class SnapshotPagination(Pagination):
+    def _query_items(self):
+        ids = self._query_args['ids']
+        return self._query_args['load'](ids[(self.page - 1) * self.per_page:self.page * self.per_page])
+
+    def _query_count(self):
+        return len(self._query_args['ids'])
+
+@app.route('/snapshot', methods=['GET'])
+def snapshot_stats():
+    return jsonify({"enabled": app.config['CATALOG_SNAPSHOT_ENABLED'], **snapshot_store.stats()})
+
 # Login required decorator
 def login_required(f):
     def wrap(*args, **kwargs):
@@ -138,7 +2033,138 @@ def logout():
 # Serve static files explicitly (for debugging)
 @app.route('/static/uploads/<path:filename>')
 def serve_uploaded_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    folder = app.config['UPLOAD_FOLDER']
+    max_age = app.config['UPLOAD_MAX_AGE']
+    if CONTENT_ADDRESSED_NAME.match(filename):
+        max_age = app.config['UPLOAD_IMMUTABLE_MAX_AGE']
+    elif filename.startswith('derived/') and not os.path.exists(os.path.join(folder, filename)):
+        # Not rendered yet (or Pillow missing): serve the original, uncached, instead
+        filename = filename[len('derived/'):].rsplit('.', 2)[0]
+        max_age = 0
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    served, encoding = upload_sidecar(filename)
+    if app.config['UPLOAD_X_ACCEL_REDIRECT']:
+        # The front proxy delivers the file (Range and conditional GET included)
+        if not safe_join(folder, served) or not os.path.isfile(os.path.join(folder, served)):
+            abort(404)
+        response = app.response_class(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = app.config['UPLOAD_X_ACCEL_REDIRECT'].rstrip('/') + '/' + served
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+    else:
+        # send_from_directory answers If-None-Match/If-Modified-Since and Range requests
+        # itself, and hands off to the server when USE_X_SENDFILE is set. A sidecar keeps
+        # the original's name: clients decode it transparently and save it as that file.
+        response = send_from_directory(folder, served, mimetype=mimetype, max_age=max_age,
+                                       download_name=os.path.basename(filename))
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if filename.rsplit('.', 1)[-1].lower() in app.config['UPLOAD_COMPRESSIBLE_EXTENSIONS']:
+        response.vary.add('Accept-Encoding')
+    if max_age == app.config['UPLOAD_IMMUTABLE_MAX_AGE']:
+        response.cache_control.immutable = True
+    elif not max_age:
+        response.cache_control.no_cache = True
+    return response
+
+# Pre-compressed sidecars (<name>.br / <name>.gz, see `flask precompress-uploads`) are
+# served in place of compressible uploads when the client accepts that encoding
+UPLOAD_SIDECARS = [('br', '.br'), ('gzip', '.gz')]
+
+def upload_sidecar(filename):
+    if filename.rsplit('.', 1)[-1].lower() in app.config['UPLOAD_COMPRESSIBLE_EXTENSIONS']:
+        for encoding, suffix in UPLOAD_SIDECARS:
+            if encoding in request.accept_encodings and safe_join(app.config['UPLOAD_FOLDER'], filename + suffix) \
+                    and os.path.isfile(os.path.join(app.config['UPLOAD_FOLDER'], filename + suffix)):
+                return filename + suffix, encoding
+    return filename, None
+
+# Fragment cache for the admin listing
+# Product cards are cached rendered, keyed on the product's id and updated_at (stamped by
+# products_changed on every write), and the filter bar on the catalog version plus the
+# filter arguments. A warm page costs the id/version query and a join of cached strings;
+# only products written since they were last rendered go through Jinja again.
+FILTER_BAR_ARGS = ['q', 'category', 'in_stock', 'min_price', 'max_price', 'sort']
+fragment_cache = LRUResponseCache(app.config['FRAGMENT_CACHE_MAX_ENTRIES'])
+fragment_prefetch_executor = None
+fragment_prefetch_lock = threading.Lock()
+fragment_prefetch_pending = set()
+
+# One page of (id, version) rows; from the snapshot when one is given
+def listing_page(listing, query, page, per_page, snapshot):
+    if snapshot is not None:
+        return SnapshotPagination(page=page, per_page=per_page, error_out=False, ids=snapshot.filter_ids(listing),
+                                  load=lambda ids: snapshot.rows(ids, ['id', 'updated_at']))
+    # Searches keep their relevance order unless a sort is asked for
+    product_query = listing.filter(Product.query.with_entities(Product.id, Product.updated_at))
+    if query:
+        product_query = apply_search(product_query, query)
+    if not (query and search_is_ranked(query) and listing.default_order):
+        product_query = listing.order(product_query.order_by(None))
+    return product_query.paginate(page=page, per_page=per_page, error_out=False)
+
+# Cards for (id, version) rows in page order, and how many came from the cache. Misses
+# are loaded from the source the versions came from, and stored under the version the
+# loaded row carries, so a card is never cached under a version newer than its content.
+# Rows without updated_at (written around products_changed) are versioned by the catalog
+# version instead, read before anything is loaded for the same reason.
+def render_product_cards(rows, snapshot):
+    enabled = app.config['FRAGMENT_CACHE_ENABLED']
+    fallback = ('catalog', current_catalog_version()) if enabled and any(version is None for _, version in rows) else None
+    rows = [(product_id, fallback if version is None else version) for product_id, version in rows]
+    cards, missing = {}, []
+    for product_id, version in rows:
+        card = fragment_cache.get(('card', product_id, version)) if enabled and version is not None else None
+        if card is None:
+            missing.append(product_id)
+        else:
+            cards[product_id] = card
+    if missing:
+        if snapshot is not None:
+            versions = dict(snapshot.rows(missing, ['id', 'updated_at']))
+            products = [(product, versions[product.id]) for product in snapshot.products(missing)]
+        else:
+            products = [(product, product.updated_at) for product in Product.query.filter(Product.id.in_(missing))]
+        for product, version in products:
+            cards[product.id] = Markup(render_template('product_card.html', product=product))
+            version = fallback if version is None else version
+            if enabled and version is not None:
+                fragment_cache.set(('card', product.id, version), cards[product.id])
+    return [cards[product_id] for product_id, _ in rows if product_id in cards], len(rows) - len(missing)
+
+def render_filter_bar():
+    key = ('filters', current_catalog_version(), tuple(request.args.get(name, '') for name in FILTER_BAR_ARGS))
+    filters = fragment_cache.get(key) if app.config['FRAGMENT_CACHE_ENABLED'] else None
+    if filters is None:
+        filters = Markup(render_template('filter_bar.html', categories=facet_categories()))
+        if app.config['FRAGMENT_CACHE_ENABLED']:
+            fragment_cache.set(key, filters)
+    return filters
+
+# Render the missing cards of the listing's next page on a background thread, so paging
+# forward finds them cached. At most one prefetch per page is in flight.
+def schedule_listing_prefetch(listing, query, page, per_page):
+    global fragment_prefetch_executor
+    key = (request.path, tuple(sorted((name, value) for name, value in request.args.items(multi=True) if name != 'page')), page)
+
+    @copy_current_request_context
+    def prefetch():
+        try:
+            snapshot = catalog_snapshot() if not query else None
+            render_product_cards(listing_page(listing, query, page, per_page, snapshot).items, snapshot)
+        except Exception as e:
+            app.logger.error("Error prefetching listing page %s: %s", page, e)
+        finally:
+            with fragment_prefetch_lock:
+                fragment_prefetch_pending.discard(key)
+
+    with fragment_prefetch_lock:
+        if key in fragment_prefetch_pending:
+            return None
+        fragment_prefetch_pending.add(key)
+        if fragment_prefetch_executor is None:
+            fragment_prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='fragment-prefetch')
+        return fragment_prefetch_executor.submit(prefetch)
 
 # UI Routes
 @app.route('/')
@@ -147,33 +2173,30 @@ def index():
     page = request.args.get('page', 1, type=int)
     per_page = 10
     query = request.args.get('q', '').lower()
-    category = request.args.get('category', '')
-    in_stock = request.args.get('in_stock', '')
-    min_price = request.args.get('min_price', type=float)
-    max_price = request.args.get('max_price', type=float)
+    try:
+        listing = ListingQuery.from_args(request.args)
+    except ValueError:  # Stale or hand-edited sort link: fall back to the default order
+        args = request.args.copy()
+        args['sort'] = ''
+        listing = ListingQuery.from_args(args)
 
-    # Build query with filters
-    product_query = Product.query
-    if query:
-        product_query = product_query.filter(
-            Product.product_name.ilike(f'%{query}%') |
-            Product.category.ilike(f'%{query}%') |
-            Product.short_description.ilike(f'%{query}%') |
-            Product.long_description.ilike(f'%{query}%') |
-            Product.rubber_description.ilike(f'%{query}%')
-        )
-    if category:
-        product_query = product_query.filter(Product.category == category)
-    if in_stock:
-        product_query = product_query.filter(Product.in_stock == (in_stock == 'true'))
-    if min_price is not None:
-        product_query = product_query.filter(Product.offer_price >= min_price)
-    if max_price is not None:
-        product_query = product_query.filter(Product.offer_price <= max_price)
-
-    products_pagination = product_query.paginate(page=page, per_page=per_page, error_out=False)
-    categories = [p.category for p in Product.query.distinct(Product.category)]
-    return render_template('index.html', products=products_pagination.items, pagination=products_pagination, categories=categories)
+    snapshot = catalog_snapshot() if not query else None
+    products_pagination = listing_page(listing, query, page, per_page, snapshot)
+    started = time.perf_counter()
+    cards, cached = render_product_cards(products_pagination.items, snapshot)
+    filters = render_filter_bar()
+    fragments_seconds = time.perf_counter() - started
+    if app.config['FRAGMENT_PREFETCH_NEXT_PAGE'] and products_pagination.has_next:
+        schedule_listing_prefetch(listing, query, page + 1, per_page)
+
+    started = time.perf_counter()
+    html = render_template('index.html', cards=cards, filters=filters, pagination=products_pagination)
+    if app.config['SERVER_TIMING']:
+        g.setdefault('server_timings', []).extend([
+            ('fragments', fragments_seconds, f"{cached}/{len(cards)} cards cached"),
+            ('render', time.perf_counter() - started, None),
+        ])
+    return html
 
 @app.route('/add', methods=['GET', 'POST'])
 @login_required
@@ -184,44 +2207,21 @@ def add_product_ui():
         pdfs = request.files.getlist('pdfs')
         image_order = data.get('image_order', '').split(',') if data.get('image_order') else []
 
-        app.logger.debug(f"Received form data: {data}")
-        app.logger.debug(f"Received images: {[f.filename for f in images]}")
-        app.logger.debug(f"Received image order: {image_order}")
+        if app.logger.isEnabledFor(logging.DEBUG):
+            app.logger.debug("Received form data: %s", data)
+            app.logger.debug("Received images: %s", [f.filename for f in images])
+            app.logger.debug("Received image order: %s", image_order)
 
-        image_urls = []
-        for image in images:
-            if image and allowed_file(image.filename):
-                filename = secure_filename(image.filename)
-                image_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                try:
-                    image.save(image_path)
-                    image_urls.append(f"{app.config['UPLOAD_FOLDER']}/{filename}")
-                    app.logger.debug(f"Saved image: {image_path}")
-                except Exception as e:
-                    app.logger.error(f"Error saving image {filename}: {str(e)}")
-
-        # Reorder images based on image_order
-        ordered_urls = []
-        for filename in image_order:
-            for url in image_urls[:]:
-                if filename in url:
-                    ordered_urls.append(url)
-                    image_urls.remove(url)
-                    break
-        image_urls = ordered_urls + image_urls
-        app.logger.debug(f"Final image URLs: {image_urls}")
-
-        pdf_urls = []
-        for pdf in pdfs:
-            if pdf and allowed_file(pdf.filename):
-                filename = secure_filename(pdf.filename)
-                pdf_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                try:
-                    pdf.save(pdf_path)
-                    pdf_urls.append(f"{app.config['UPLOAD_FOLDER']}/{filename}")
-                    app.logger.debug(f"Saved PDF: {pdf_path}")
-                except Exception as e:
-                    app.logger.error(f"Error saving PDF {filename}: {str(e)}")
+        stored = store_uploads(images)
+        uploaded = dict(stored)  # Original filename -> stored URL
+        image_urls = list(dict.fromkeys(url for _, url in stored))
+
+        # Reorder images based on image_order (new uploads are listed by original filename)
+        image_urls = order_image_urls(image_urls, image_order, uploaded)
+        app.logger.debug("Final image URLs: %s", image_urls)
+        schedule_derivatives(uploaded.values())
+
+        pdf_urls = list(dict.fromkeys(url for _, url in store_uploads(pdfs)))
 
         # Handle multiple variants
         variants = []
@@ -233,8 +2233,8 @@ def add_product_ui():
                 try:
                     variants.append({"name": name, "price": float(price), "sku": sku})
                 except ValueError:
-                    app.logger.error(f"Invalid variant price: {price}")
-        app.logger.debug(f"Variants: {variants}")
+                    app.logger.error("Invalid variant price: %s", price)
+        app.logger.debug("Variants: %s", variants)
 
         product = Product(
             category=data.get('category'),
@@ -262,8 +2262,10 @@ def add_product_ui():
             variants=json.dumps(variants) if variants else None
         )
         db.session.add(product)
+        db.session.flush()
+        products_changed([product.id])
         db.session.commit()
-        app.logger.debug(f"Added product: {product.product_name}, Image URLs: {product.product_image_urls}")
+        app.logger.debug("Added product: %s, Image URLs: %s", product.product_name, product.product_image_urls)
         return redirect(url_for('index'))
     
     return render_template('add_product.html')
@@ -278,44 +2280,25 @@ def edit_product_ui(product_id):
         pdfs = request.files.getlist('pdfs')
         image_order = data.get('image_order', '').split(',') if data.get('image_order') else []
 
-        app.logger.debug(f"Received form data: {data}")
-        app.logger.debug(f"Received images: {[f.filename for f in images]}")
-        app.logger.debug(f"Received image order: {image_order}")
+        if app.logger.isEnabledFor(logging.DEBUG):
+            app.logger.debug("Received form data: %s", data)
+            app.logger.debug("Received images: %s", [f.filename for f in images])
+            app.logger.debug("Received image order: %s", image_order)
 
         image_urls = product.product_image_urls.split(",") if product.product_image_urls else []
-        for image in images:
-            if image and allowed_file(image.filename):
-                filename = secure_filename(image.filename)
-                image_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                try:
-                    image.save(image_path)
-                    image_urls.append(f"{app.config['UPLOAD_FOLDER']}/{filename}")
-                    app.logger.debug(f"Saved image: {image_path}")
-                except Exception as e:
-                    app.logger.error(f"Error saving image {filename}: {str(e)}")
-
-        # Reorder images based on image_order
-        ordered_urls = []
-        for filename in image_order:
-            for url in image_urls[:]:
-                if filename in url:
-                    ordered_urls.append(url)
-                    image_urls.remove(url)
-                    break
-        image_urls = ordered_urls + image_urls
-        app.logger.debug(f"Final image URLs: {image_urls}")
+        stored = store_uploads(images)
+        uploaded = dict(stored)  # Original filename -> stored URL
+        existing = set(image_urls)
+        image_urls += [url for url in dict.fromkeys(url for _, url in stored) if url not in existing]
+
+        # Reorder images based on image_order (new uploads are listed by original filename)
+        image_urls = order_image_urls(image_urls, image_order, uploaded)
+        app.logger.debug("Final image URLs: %s", image_urls)
+        schedule_derivatives(uploaded.values())
 
         pdf_urls = product.download_pdfs.split(",") if product.download_pdfs else []
-        for pdf in pdfs:
-            if pdf and allowed_file(pdf.filename):
-                filename = secure_filename(pdf.filename)
-                pdf_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                try:
-                    pdf.save(pdf_path)
-                    pdf_urls.append(f"{app.config['UPLOAD_FOLDER']}/{filename}")
-                    app.logger.debug(f"Saved PDF: {pdf_path}")
-                except Exception as e:
-                    app.logger.error(f"Error saving PDF {filename}: {str(e)}")
+        existing = set(pdf_urls)
+        pdf_urls += [url for url in dict.fromkeys(url for _, url in store_uploads(pdfs)) if url not in existing]
 
         # Handle multiple variants
         variants = []
@@ -327,8 +2310,8 @@ def edit_product_ui(product_id):
                 try:
                     variants.append({"name": name, "price": float(price), "sku": sku})
                 except ValueError:
-                    app.logger.error(f"Invalid variant price: {price}")
-        app.logger.debug(f"Variants: {variants}")
+                    app.logger.error("Invalid variant price: %s", price)
+        app.logger.debug("Variants: %s", variants)
 
         product.category = data.get('category', product.category)
         product.product_name = data.get('product_name', product.product_name)
@@ -353,39 +2336,181 @@ def edit_product_ui(product_id):
         product.rubber_thickness = float(data.get('rubber_thickness')) if data.get('rubber_thickness') else None
         product.rubber_description = data.get('rubber_description', product.rubber_description)
         product.variants = json.dumps(variants) if variants else product.variants
+        products_changed([product.id])
         db.session.commit()
-        app.logger.debug(f"Updated product: {product.product_name}, Image URLs: {product.product_image_urls}")
+        app.logger.debug("Updated product: %s, Image URLs: %s", product.product_name, product.product_image_urls)
         return redirect(url_for('index'))
     
     return render_template('edit_product.html', product=product)
 
+# Set-based delete: one DELETE ... WHERE id IN (...) per chunk instead of loading and
+# deleting each ORM object. The media the products referenced is released and
+# garbage-collected in the background once the transaction commits.
+# Returns the ids that existed and were deleted.
+def delete_products(product_ids):
+    product_ids = list(dict.fromkeys(product_ids))
+    chunk_size = app.config['BULK_DELETE_CHUNK_SIZE']
+    deleted_ids = []
+    for start in range(0, len(product_ids), chunk_size):
+        deleted_ids += db.session.scalars(
+            delete(Product).where(Product.id.in_(product_ids[start:start + chunk_size])).returning(Product.id),
+            execution_options={'synchronize_session': False}
+        ).all()
+    if deleted_ids:
+        products_changed(deleted_ids, deleted=True)
+    return deleted_ids
+
 @app.route('/delete/<int:product_id>', methods=['POST'])
 @login_required
 def delete_product_ui(product_id):
-    product = Product.query.get_or_404(product_id)
-    db.session.delete(product)
-    db.session.commit()
-    app.logger.debug(f"Deleted product ID: {product_id}")
+    def mutation():
+        if not delete_products([product_id]):
+            abort(404)
+
+    run_write(mutation)
+    app.logger.debug("Deleted product ID: %s", product_id)
     return redirect(url_for('index'))
 
 @app.route('/delete-selected', methods=['POST'])
 @login_required
 def delete_selected():
-    product_ids = request.form.getlist('product_ids[]')
-    for product_id in product_ids:
-        product = Product.query.get(product_id)
-        if product:
-            db.session.delete(product)
-    db.session.commit()
-    app.logger.debug(f"Deleted products: {product_ids}")
+    product_ids = [product_id for product_id in map(as_product_id, request.form.getlist('product_ids[]')) if product_id is not None]
+    deleted_ids = run_write(lambda: delete_products(product_ids))
+    app.logger.debug("Deleted products: %s", deleted_ids)
     return redirect(url_for('index'))
 
-# Existing API Routes
-@app.route('/add-product', methods=['POST'])
-def add_product():
-    data = request.get_json()
+# Partial update of a product from an API payload: absent keys keep their stored values
+def apply_product_payload(product, data):
+    product.category = data.get('category', product.category)
+    product.product_name = data.get('product_name', product.product_name)
+    product.short_description = data.get('short_description', product.short_description)
+    product.long_description = data.get('long_description', product.long_description)
+    product.mrp = data.get('mrp', product.mrp)
+    product.offer_price = data.get('offer_price', product.offer_price)
+    product.sku = data.get('sku', product.sku)
+    product.in_stock = data.get('in_stock', product.in_stock)
+    product.stock_number = data.get('stock_number', product.stock_number)
+    product.download_pdfs = ",".join(data.get('download_pdfs', product.download_pdfs.split(",") if product.download_pdfs else []))
+    product.product_image_urls = ",".join(data.get('product_image_urls', product.product_image_urls.split(",") if product.product_image_urls else []))
+    product.youtube_links = data.get('youtube_links', product.youtube_links)
+    product.technical_information = data.get('technical_information', product.technical_information)
+    product.manufacturer = data.get('manufacturer', product.manufacturer)
+    product.special_note = data.get('special_note', product.special_note)
+    product.whatsapp_number = data.get('whatsapp_number', product.whatsapp_number)
+    product.is_rubber = data.get('is_rubber', product.is_rubber)
+    product.rubber_density = data.get('rubber_density', product.rubber_density)
+    product.rubber_height = data.get('rubber_height', product.rubber_height)
+    product.rubber_length = data.get('rubber_length', product.rubber_length)
+    product.rubber_thickness = data.get('rubber_thickness', product.rubber_thickness)
+    product.rubber_description = data.get('rubber_description', product.rubber_description)
+    product.variants = json.dumps(data.get('variants', json.loads(product.variants) if product.variants else []))
+
+# Write-behind queue
+# With WRITE_QUEUE_ENABLED, the API mutations are handed to a single writer thread as
+# closures. It drains up to WRITE_QUEUE_MAX_BATCH of them into one transaction (each
+# in its own SAVEPOINT, so a failing mutation only rolls back itself) and commits once.
+# Callers block until that commit, so every acknowledged write is durable.
+class WriteQueue:
+    def __init__(self, max_batch, max_wait):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.batches = 0
+        self.mutations = 0
+        self.failed = 0
+        self.max_batch_size = 0
+        self.last_batch_size = 0
+        self.batch_seconds = 0.0
+
+    def submit(self, mutation):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='write-queue', daemon=True)
+                self.thread.start()
+        future = Future()
+        self.queue.put((mutation, future))
+        return future.result()
+
+    def next_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self.queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        with app.app_context():
+            while True:
+                batch = self.next_batch()
+                start = time.perf_counter()
+                outcomes = []
+                try:
+                    bump_catalog_version()  # Begins the transaction and takes the write lock up front
+                    for mutation, future in batch:
+                        try:
+                            with db.session.begin_nested():
+                                outcomes.append((future, mutation(), None))
+                        except Exception as e:
+                            outcomes.append((future, None, e))
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    outcomes = [(future, None, e) for _, future in batch]
+                finally:
+                    db.session.close()
+                self.record(len(batch), sum(1 for _, _, error in outcomes if error), time.perf_counter() - start)
+                for future, result, error in outcomes:
+                    if error is None:
+                        future.set_result(result)
+                    else:
+                        future.set_exception(error)
+
+    def record(self, size, failed, seconds):
+        with self.lock:
+            self.batches += 1
+            self.mutations += size
+            self.failed += failed
+            self.last_batch_size = size
+            self.max_batch_size = max(self.max_batch_size, size)
+            self.batch_seconds += seconds
+
+    def stats(self):
+        with self.lock:
+            return {
+                "depth": self.queue.qsize(),
+                "batches": self.batches,
+                "mutations": self.mutations,
+                "failed": self.failed,
+                "average_batch_size": round(self.mutations / self.batches, 2) if self.batches else 0,
+                "last_batch_size": self.last_batch_size,
+                "max_batch_size": self.max_batch_size,
+                "seconds_in_batches": round(self.batch_seconds, 3),
+            }
+
+write_queue = WriteQueue(app.config['WRITE_QUEUE_MAX_BATCH'], app.config['WRITE_QUEUE_MAX_WAIT'])
+
+# Run a mutation (a closure writing through db.session without committing) and commit
+# it, on the write queue when enabled. Returns the mutation's result; raises its errors.
+def run_write(mutation):
+    if app.config['WRITE_QUEUE_ENABLED']:
+        return write_queue.submit(mutation)
+    result = mutation()
+    db.session.commit()
+    return result
+
+@app.route('/write-queue', methods=['GET'])
+def write_queue_stats():
+    return jsonify({"enabled": app.config['WRITE_QUEUE_ENABLED'], **write_queue.stats()})
+
+# Column values for a new product from an API payload (add_product and /products/import)
+def product_values(data):
     variants = data.get('variants', [])
-    product = Product(
+    return dict(
         category=data.get('category'),
         product_name=data.get('product_name'),
         short_description=data.get('short_description'),
@@ -410,158 +2535,374 @@ def add_product():
         rubber_description=data.get('rubber_description'),
         variants=json.dumps(variants) if variants else None
     )
-    db.session.add(product)
-    db.session.commit()
-    app.logger.debug(f"API: Added product: {product.product_name}")
-    return jsonify({"message": "Product added", "product_id": product.id}), 201
+
+# Existing API Routes
+@app.route('/add-product', methods=['POST'])
+def add_product():
+    data = request.get_json()
+    values = product_values(data)
+
+    def mutation():
+        product = Product(**values)
+        db.session.add(product)
+        db.session.flush()
+        products_changed([product.id])
+        return product.id
+
+    product_id = run_write(mutation)
+    app.logger.debug("API: Added product: %s", values['product_name'])
+    return jsonify({"message": "Product added", "product_id": product_id}), 201
 
 @app.route('/products', methods=['GET'])
+@read_only
+@cached_response
 def get_products():
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
-    products_pagination = Product.query.paginate(page=page, per_page=per_page, error_out=False)
-    return jsonify({
-        "products": [p.to_dict() for p in products_pagination.items],
+    per_page = get_per_page()
+    try:
+        fields = requested_fields()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        listing = ListingQuery.from_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if 'cursor' in request.args:
+        try:
+            key = decode_cursor(request.args['cursor'])
+            key = listing.decode_key(key) if key is not None else None
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+        snapshot = catalog_snapshot()
+        if snapshot is not None and listing.default_order and not listing.filtered:
+            page_ids = snapshot.page_ids(key[0] if key else None, per_page + 1)
+            rows, has_more = snapshot.rows(page_ids[:per_page], fields), len(page_ids) > per_page
+            return json_response({
+                "products": serialize_product_rows(rows, fields),
+                "next_cursor": encode_cursor(page_ids[per_page - 1]) if has_more else None,
+                "per_page": per_page
+            })
+        product_query = listing.order(listing.filter(Product.query.with_entities(*product_columns(fields), *listing.key_columns())))
+        if key is not None:
+            product_query = product_query.filter(listing.after(key))
+        rows, has_more = keyset_page(product_query, per_page)
+        return json_response({
+            "products": serialize_product_rows([row[:-len(listing.sort)] for row in rows], fields),
+            "next_cursor": encode_cursor(listing.encode_key(rows[-1])) if has_more else None,
+            "per_page": per_page
+        })
+
+    snapshot = catalog_snapshot()
+    if snapshot is not None:
+        products_pagination = SnapshotPagination(page=page, per_page=per_page, max_per_page=None, error_out=False,
+                                                 ids=snapshot.filter_ids(listing), load=lambda ids: snapshot.rows(ids, fields))
+    else:
+        product_query = listing.order(listing.filter(Product.query.with_entities(*product_columns(fields))))
+        products_pagination = product_query.paginate(page=page, per_page=per_page, error_out=False)
+    return json_response({
+        "products": serialize_product_rows(products_pagination.items, fields),
         "total_items": products_pagination.total,
         "total_pages": products_pagination.pages,
         "current_page": page,
         "per_page": per_page
-    }), 200
+    })
 
 @app.route('/product/<int:product_id>', methods=['GET'])
+@read_only
+@cached_response
 def get_product(product_id):
-    product = Product.query.get_or_404(product_id)
-    return jsonify(product.to_dict()), 200
+    try:
+        fields = requested_fields()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    snapshot = catalog_snapshot()
+    if snapshot is not None:
+        rows = snapshot.rows([product_id], fields)
+        if not rows:
+            abort(404)
+        return json_response(serialize_product_rows(rows, fields)[0])
+    row = Product.query.with_entities(*product_columns(fields)).filter(Product.id == product_id).first_or_404()
+    return json_response(serialize_product_rows([row], fields)[0])
 
 @app.route('/product/<int:product_id>', methods=['PUT'])
 def update_product(product_id):
     data = request.get_json()
-    product = Product.query.get_or_404(product_id)
-    product.category = data.get('category', product.category)
-    product.product_name = data.get('product_name', product.product_name)
-    product.short_description = data.get('short_description', product.short_description)
-    product.long_description = data.get('long_description', product.long_description)
-    product.mrp = data.get('mrp', product.mrp)
-    product.offer_price = data.get('offer_price', product.offer_price)
-    product.sku = data.get('sku', product.sku)
-    product.in_stock = data.get('in_stock', product.in_stock)
-    product.stock_number = data.get('stock_number', product.stock_number)
-    product.download_pdfs = ",".join(data.get('download_pdfs', product.download_pdfs.split(",") if product.download_pdfs else []))
-    product.product_image_urls = ",".join(data.get('product_image_urls', product.product_image_urls.split(",") if product.product_image_urls else []))
-    product.youtube_links = data.get('youtube_links', product.youtube_links)
-    product.technical_information = data.get('technical_information', product.technical_information)
-    product.manufacturer = data.get('manufacturer', product.manufacturer)
-    product.special_note = data.get('special_note', product.special_note)
-    product.whatsapp_number = data.get('whatsapp_number', product.whatsapp_number)
-    product.is_rubber = data.get('is_rubber', product.is_rubber)
-    product.rubber_density = data.get('rubber_density', product.rubber_density)
-    product.rubber_height = data.get('rubber_height', product.rubber_height)
-    product.rubber_length = data.get('rubber_length', product.rubber_length)
-    product.rubber_thickness = data.get('rubber_thickness', product.rubber_thickness)
-    product.rubber_description = data.get('rubber_description', product.rubber_description)
-    product.variants = json.dumps(data.get('variants', json.loads(product.variants) if product.variants else []))
-    db.session.commit()
-    app.logger.debug(f"API: Updated product ID: {product_id}")
+
+    def mutation():
+        product = Product.query.get_or_404(product_id)
+        apply_product_payload(product, data)
+        products_changed([product.id])
+
+    run_write(mutation)
+    app.logger.debug("API: Updated product ID: %s", product_id)
     return jsonify({"message": "Product updated"}), 200
 
 @app.route('/product/<int:product_id>', methods=['DELETE'])
 def delete_product(product_id):
-    product = Product.query.get_or_404(product_id)
-    db.session.delete(product)
-    db.session.commit()
-    app.logger.debug(f"API: Deleted product ID: {product_id}")
+    def mutation():
+        if not delete_products([product_id]):
+            abort(404)
+
+    run_write(mutation)
+    app.logger.debug("API: Deleted product ID: %s", product_id)
     return jsonify({"message": "Product deleted"}), 200
 
+# Bulk delete by id in one transaction: a list of ids or {"ids": [...]}
+@app.route('/products/bulk-delete', methods=['POST'])
+def bulk_delete_products():
+    data = request.get_json(silent=True)
+    items = data.get('ids') if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return jsonify({"error": "Request body must be a list of product ids or {\"ids\": [...]}"}), 400
+    product_ids = [as_product_id(item) for item in items]
+    if None in product_ids:
+        return jsonify({"error": f"Invalid product id: {items[product_ids.index(None)]}"}), 400
+
+    deleted_ids = set(run_write(lambda: delete_products(product_ids)))
+    not_found = [product_id for product_id in dict.fromkeys(product_ids) if product_id not in deleted_ids]
+    app.logger.debug("API: Bulk deleted products: %s deleted, %s not found", len(deleted_ids), len(not_found))
+    return jsonify({
+        "message": "Bulk delete processed",
+        "deleted": [product_id for product_id in dict.fromkeys(product_ids) if product_id in deleted_ids],
+        "not_found": not_found
+    }), 200 if not not_found else 207
+
 @app.route('/search', methods=['GET'])
+@read_only
+@cached_response
 def search_products():
     query = request.args.get('q', '').lower()
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
-    search_results_pagination = Product.query.filter(
-        Product.product_name.ilike(f'%{query}%') |
-        Product.category.ilike(f'%{query}%') |
-        Product.short_description.ilike(f'%{query}%') |
-        Product.long_description.ilike(f'%{query}%') |
-        Product.rubber_description.ilike(f'%{query}%')
-    ).paginate(page=page, per_page=per_page, error_out=False)
-    return jsonify({
-        "products": [p.to_dict() for p in search_results_pagination.items],
+    per_page = get_per_page()
+    try:
+        fields = requested_fields()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        listing = ListingQuery.from_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    # Relevance order unless a sort is asked for
+    ranked = bool(query) and search_is_ranked(query) and listing.default_order
+    # With a snapshot, SQLite only ranks and pages ids; the rows come from memory
+    snapshot = catalog_snapshot()
+    product_query = listing.filter(Product.query.with_entities(*product_columns(['id'] if snapshot is not None else fields)))
+    if query:
+        product_query = apply_search(product_query, query)
+    if not ranked:
+        product_query = listing.order(product_query.order_by(None))
+
+    if 'cursor' in request.args:
+        # Ranked searches are keyed on (rank, id), everything else on the listing's sort key
+        try:
+            key = decode_cursor(request.args['cursor'])
+            if key is not None and ranked and not (
+                isinstance(key, list) and len(key) == 2 and isinstance(key[0], (int, float)) and isinstance(key[1], int)
+            ):
+                raise ValueError(f"Invalid cursor: {key}")
+            if key is not None and not ranked:
+                key = listing.decode_key(key)
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+
+        if ranked:
+            product_query = product_query.add_columns(product_fts.c.rank)
+            if key is not None:
+                product_query = product_query.filter(or_(
+                    product_fts.c.rank > key[0],
+                    and_(product_fts.c.rank == key[0], Product.id > key[1])
+                ))
+            rows, has_more = keyset_page(product_query, per_page)
+            next_key = [rows[-1].rank, rows[-1].id] if has_more else None
+            rows = [row[:-1] for row in rows]
+        else:
+            product_query = product_query.add_columns(*listing.key_columns())
+            if key is not None:
+                product_query = product_query.filter(listing.after(key))
+            rows, has_more = keyset_page(product_query, per_page)
+            next_key = listing.encode_key(rows[-1]) if has_more else None
+            rows = [row[:-len(listing.sort)] for row in rows]
+        if snapshot is not None:
+            rows = snapshot.rows([row[0] for row in rows], fields)
+        return json_response({
+            "products": serialize_product_rows(rows, fields),
+            "next_cursor": encode_cursor(next_key) if next_key is not None else None,
+            "per_page": per_page
+        })
+
+    search_results_pagination = product_query.paginate(page=page, per_page=per_page, error_out=False)
+    rows = search_results_pagination.items
+    if snapshot is not None:
+        rows = snapshot.rows([row[0] for row in rows], fields)
+    return json_response({
+        "products": serialize_product_rows(rows, fields),
         "total_items": search_results_pagination.total,
         "total_pages": search_results_pagination.pages,
         "current_page": page,
         "per_page": per_page
-    }), 200
+    })
+
+# Product or variant SKU, both resolved through an index
+@app.route('/product/sku/<string:sku>', methods=['GET'])
+@read_only
+@cached_response
+def get_product_by_sku(sku):
+    try:
+        fields = requested_fields()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    product_id = db.session.scalar(select(Product.id).where(Product.sku == sku).order_by(Product.id).limit(1))
+    if product_id is None:
+        product_id = db.session.scalar(select(ProductVariant.product_id).where(ProductVariant.sku == sku).order_by(ProductVariant.product_id).limit(1))
+    if product_id is None:
+        return jsonify({"error": "Product with given SKU not found"}), 404
+    row = db.session.execute(select(*product_columns(fields)).where(Product.id == product_id)).first()
+    return json_response(serialize_product_rows([row], fields)[0])
 
 # New API to update product by SKU
 @app.route('/product/sku/<string:sku>', methods=['PUT'])
 def update_product_by_sku(sku):
     data = request.get_json()
-    product = Product.query.filter_by(sku=sku).first()
-    if not product:
+
+    def mutation():
+        product = Product.query.filter_by(sku=sku).first()
+        if not product:
+            return False
+        apply_product_payload(product, data)
+        products_changed([product.id])
+        return True
+
+    if not run_write(mutation):
         return jsonify({"error": "Product with given SKU not found"}), 404
-    
-    product.category = data.get('category', product.category)
-    product.product_name = data.get('product_name', product.product_name)
-    product.short_description = data.get('short_description', product.short_description)
-    product.long_description = data.get('long_description', product.long_description)
-    product.mrp = data.get('mrp', product.mrp)
-    product.offer_price = data.get('offer_price', product.offer_price)
-    product.sku = data.get('sku', product.sku)
-    product.in_stock = data.get('in_stock', product.in_stock)
-    product.stock_number = data.get('stock_number', product.stock_number)
-    product.download_pdfs = ",".join(data.get('download_pdfs', product.download_pdfs.split(",") if product.download_pdfs else []))
-    product.product_image_urls = ",".join(data.get('product_image_urls', product.product_image_urls.split(",") if product.product_image_urls else []))
-    product.youtube_links = data.get('youtube_links', product.youtube_links)
-    product.technical_information = data.get('technical_information', product.technical_information)
-    product.manufacturer = data.get('manufacturer', product.manufacturer)
-    product.special_note = data.get('special_note', product.special_note)
-    product.whatsapp_number = data.get('whatsapp_number', product.whatsapp_number)
-    product.is_rubber = data.get('is_rubber', product.is_rubber)
-    product.rubber_density = data.get('rubber_density', product.rubber_density)
-    product.rubber_height = data.get('rubber_height', product.rubber_height)
-    product.rubber_length = data.get('rubber_length', product.rubber_length)
-    product.rubber_thickness = data.get('rubber_thickness', product.rubber_thickness)
-    product.rubber_description = data.get('rubber_description', product.rubber_description)
-    product.variants = json.dumps(data.get('variants', json.loads(product.variants) if product.variants else []))
-    db.session.commit()
-    app.logger.debug(f"API: Updated product with SKU: {sku}")
+    app.logger.debug("API: Updated product with SKU: %s", sku)
     return jsonify({"message": "Product updated", "sku": sku}), 200
 
 # New API to update product by name
 @app.route('/product/name/<string:name>', methods=['PUT'])
 def update_product_by_name(name):
     data = request.get_json()
-    product = Product.query.filter_by(product_name=name).first()
-    if not product:
+
+    def mutation():
+        product = Product.query.filter_by(product_name=name).first()
+        if not product:
+            return False
+        apply_product_payload(product, data)
+        products_changed([product.id])
+        return True
+
+    if not run_write(mutation):
         return jsonify({"error": "Product with given name not found"}), 404
-    
-    product.category = data.get('category', product.category)
-    product.product_name = data.get('product_name', product.product_name)
-    product.short_description = data.get('short_description', product.short_description)
-    product.long_description = data.get('long_description', product.long_description)
-    product.mrp = data.get('mrp', product.mrp)
-    product.offer_price = data.get('offer_price', product.offer_price)
-    product.sku = data.get('sku', product.sku)
-    product.in_stock = data.get('in_stock', product.in_stock)
-    product.stock_number = data.get('stock_number', product.stock_number)
-    product.download_pdfs = ",".join(data.get('download_pdfs', product.download_pdfs.split(",") if product.download_pdfs else []))
-    product.product_image_urls = ",".join(data.get('product_image_urls', product.product_image_urls.split(",") if product.product_image_urls else []))
-    product.youtube_links = data.get('youtube_links', product.youtube_links)
-    product.technical_information = data.get('technical_information', product.technical_information)
-    product.manufacturer = data.get('manufacturer', product.manufacturer)
-    product.special_note = data.get('special_note', product.special_note)
-    product.whatsapp_number = data.get('whatsapp_number', product.whatsapp_number)
-    product.is_rubber = data.get('is_rubber', product.is_rubber)
-    product.rubber_density = data.get('rubber_density', product.rubber_density)
-    product.rubber_height = data.get('rubber_height', product.rubber_height)
-    product.rubber_length = data.get('rubber_length', product.rubber_length)
-    product.rubber_thickness = data.get('rubber_thickness', product.rubber_thickness)
-    product.rubber_description = data.get('rubber_description', product.rubber_description)
-    product.variants = json.dumps(data.get('variants', json.loads(product.variants) if product.variants else []))
-    db.session.commit()
-    app.logger.debug(f"API: Updated product with name: {name}")
+    app.logger.debug("API: Updated product with name: %s", name)
     return jsonify({"message": "Product updated", "product_name": name}), 200
 
+# Set-based bulk update engine
+# Each chunk resolves its identifiers with one IN query per identifier kind, diffs the
+# requested values against the stored ones and writes only the changed columns as
+# executemany UPDATEs (SQLAlchemy groups the rows by changed-column set).
+UPDATABLE_FIELDS = [field for field in PRODUCT_FIELDS if field != 'id']
+SCALAR_TYPES = (str, int, float, bool, type(None))
+
+def as_product_id(value):
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+def product_update_values(item):
+    values = {}
+    for field in UPDATABLE_FIELDS:
+        if field not in item:
+            continue
+        value = item[field]
+        if field in ('download_pdfs', 'product_image_urls'):
+            value = ",".join(value)
+        elif field == 'variants':
+            value = json.dumps(value)
+        elif not isinstance(value, SCALAR_TYPES):
+            raise ValueError(f"invalid value for {field}")
+        values[field] = value
+    return values
+
+def load_product_states(fields, ids=(), skus=(), names=()):
+    states = {}
+    for column_attr, values in ((Product.id, ids), (Product.sku, skus), (Product.product_name, names)):
+        values = list({value for value in values if isinstance(value, (int, str))})
+        if values:
+            rows = db.session.execute(select(*product_columns(fields)).where(column_attr.in_(values)).order_by(Product.id))
+            for row in rows:
+                states.setdefault(row.id, dict(row._mapping))
+    return states
+
+# Returns (updated, errors), each in item order
+def bulk_update_chunk(items):
+    updated, errors, pending = [], [], []
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append((position, {"error": "Product update must be an object"}))
+            continue
+        identifier = item.get('id') or item.get('sku') or item.get('product_name')
+        if not identifier:
+            errors.append((position, {"error": "Missing identifier (id, sku, or product_name) for a product update"}))
+            continue
+        pending.append((position, item, identifier))
+
+    fields = ['id', 'sku', 'product_name'] + [
+        field for field in UPDATABLE_FIELDS
+        if field not in ('sku', 'product_name') and any(field in item for _, item, _ in pending)
+    ]
+    states = load_product_states(
+        fields,
+        ids=[as_product_id(item['id']) for _, item, _ in pending if 'id' in item],
+        skus=[item['sku'] for _, item, _ in pending if 'id' not in item and 'sku' in item],
+        names=[item['product_name'] for _, item, _ in pending if 'id' not in item and 'sku' not in item]
+    )
+    # First product (lowest id) per SKU and name, matching the old .first() lookups
+    by_sku, by_name = {}, {}
+    for product_id in sorted(states):
+        by_sku.setdefault(states[product_id]['sku'], states[product_id])
+        by_name.setdefault(states[product_id]['product_name'], states[product_id])
+
+    changes = {}
+    for position, item, identifier in pending:
+        if 'id' in item:
+            state = states.get(as_product_id(item['id']))
+        elif 'sku' in item:
+            state = by_sku.get(item['sku']) if isinstance(item['sku'], str) else None
+        else:
+            state = by_name.get(item['product_name']) if isinstance(item['product_name'], str) else None
+        if not state:
+            errors.append((position, {"error": f"Product not found for identifier: {identifier}"}))
+            continue
+        try:
+            values = product_update_values(item)
+        except Exception as e:
+            errors.append((position, {"error": f"Failed to update product {identifier}: {str(e)}"}))
+            continue
+        for field, value in values.items():
+            if value != state[field]:
+                changes.setdefault(state['id'], {})[field] = value
+                state[field] = value
+        # Later items in the chunk see renamed products under their new SKU/name
+        by_sku.setdefault(state['sku'], state)
+        by_name.setdefault(state['product_name'], state)
+        updated.append((position, {"identifier": identifier, "status": "updated"}))
+
+    if changes:
+        try:
+            db.session.execute(update(Product), [{"id": product_id, **columns} for product_id, columns in changes.items()])
+            sync_product_children([product_id for product_id, columns in changes.items() if not CHILD_SOURCE_FIELDS.isdisjoint(columns)])
+            products_changed(changes, sync_children=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            errors += [(position, {"error": f"Failed to update product {entry['identifier']}: {str(e)}"}) for position, entry in updated]
+            updated = []
+    return [entry for _, entry in sorted(updated, key=lambda pair: pair[0])], [entry for _, entry in sorted(errors, key=lambda pair: pair[0])]
+
 # New API for bulk update of products
 @app.route('/products/bulk-update', methods=['PUT'])
 def bulk_update_products():
@@ -571,59 +2912,431 @@ def bulk_update_products():
 
     updated_products = []
     errors = []
+    chunks = []
 
-    for update in data:
-        identifier = update.get('id') or update.get('sku') or update.get('product_name')
-        if not identifier:
-            errors.append({"error": "Missing identifier (id, sku, or product_name) for a product update"})
-            continue
+    chunk_size = app.config['BULK_UPDATE_CHUNK_SIZE']
+    for offset in range(0, len(data), chunk_size):
+        started = time.perf_counter()
+        chunk_updated, chunk_errors = bulk_update_chunk(data[offset:offset + chunk_size])
+        updated_products += chunk_updated
+        errors += chunk_errors
+        chunks.append({
+            "offset": offset,
+            "items": len(data[offset:offset + chunk_size]),
+            "updated": len(chunk_updated),
+            "seconds": round(time.perf_counter() - started, 6)
+        })
 
-        if 'id' in update:
-            product = Product.query.get(update['id'])
-        elif 'sku' in update:
-            product = Product.query.filter_by(sku=update['sku']).first()
+    app.logger.debug("API: Bulk updated products: %s succeeded, %s failed", len(updated_products), len(errors))
+    return jsonify({
+        "message": "Bulk update processed",
+        "updated": updated_products,
+        "errors": errors,
+        "chunks": chunks
+    }), 200 if not errors else 207
+
+# Batch read: many products by id, SKU (product or variant) or name in one request.
+# Identifiers are resolved with one indexed IN query per kind (plus one for variant SKUs
+# that match no product SKU) and results come back in request order, misses included.
+@app.route('/products/batch-get', methods=['POST'])
+@read_only
+def batch_get_products():
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return jsonify({"error": "Request body must be a list of identifiers or {\"items\": [...]}"}), 400
+    if len(items) > app.config['BATCH_GET_MAX_ITEMS']:
+        return jsonify({"error": f"At most {app.config['BATCH_GET_MAX_ITEMS']} items per request"}), 400
+    try:
+        fields = requested_fields()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # A bare integer is an id; objects name their identifier like /products/bulk-update items
+    lookups = []
+    for item in items:
+        if isinstance(item, int) and not isinstance(item, bool):
+            item = {"id": item}
+        if not isinstance(item, dict):
+            lookups.append((item, None, None))
+        elif 'id' in item:
+            lookups.append((item['id'], 'id', as_product_id(item['id'])))
+        elif 'sku' in item:
+            lookups.append((item['sku'], 'sku', item['sku'] if isinstance(item['sku'], str) else None))
+        elif 'product_name' in item:
+            lookups.append((item['product_name'], 'product_name', item['product_name'] if isinstance(item['product_name'], str) else None))
         else:
-            product = Product.query.filter_by(product_name=update['product_name']).first()
+            lookups.append((item, None, None))
 
-        if not product:
-            errors.append({"error": f"Product not found for identifier: {identifier}"})
+    load_fields = list(dict.fromkeys(fields + ['sku', 'product_name']))
+    states = load_product_states(
+        load_fields,
+        ids=[value for _, kind, value in lookups if kind == 'id' and value is not None],
+        skus=[value for _, kind, value in lookups if kind == 'sku' and value is not None],
+        names=[value for _, kind, value in lookups if kind == 'product_name' and value is not None]
+    )
+    # First product (lowest id) per SKU and name, as in the single-item lookups
+    by_sku, by_name = {}, {}
+    for product_id in sorted(states):
+        by_sku.setdefault(states[product_id]['sku'], product_id)
+        by_name.setdefault(states[product_id]['product_name'], product_id)
+    variant_skus = list({value for _, kind, value in lookups if kind == 'sku' and value is not None and value not in by_sku})
+    if variant_skus:
+        variant_rows = db.session.execute(
+            select(ProductVariant.sku, ProductVariant.product_id)
+            .where(ProductVariant.sku.in_(variant_skus)).order_by(ProductVariant.product_id.desc())
+        ).all()
+        variant_products = dict(variant_rows)  # Descending, so the lowest product id wins
+        states.update(load_product_states(load_fields, ids=[product_id for product_id in variant_products.values() if product_id not in states]))
+        for sku, product_id in variant_products.items():
+            by_sku[sku] = product_id
+
+    resolved = []
+    for identifier, kind, value in lookups:
+        if kind == 'sku':
+            value = by_sku.get(value)
+        elif kind == 'product_name':
+            value = by_name.get(value)
+        resolved.append((identifier, kind, value if value in states else None))
+    found_ids = list(dict.fromkeys(product_id for _, _, product_id in resolved if product_id is not None))
+    rows = [tuple(states[product_id][field] for field in fields) for product_id in found_ids]
+    products = dict(zip(found_ids, serialize_product_rows(rows, fields)))
+
+    results = []
+    for identifier, kind, product_id in resolved:
+        if kind is None:
+            results.append({"identifier": identifier, "found": False, "error": "Item must be an id or an object with id, sku or product_name"})
+        elif product_id is not None:
+            results.append({"identifier": identifier, "found": True, "product": products[product_id]})
+        else:
+            results.append({"identifier": identifier, "found": False, "error": f"Product not found for {kind}: {identifier}"})
+    return json_response({
+        "results": results,
+        "found": sum(1 for result in results if result["found"]),
+        "missing": sum(1 for result in results if not result["found"])
+    })
+
+# Facet summary: counts per category and price bucket, optionally within one category
+@app.route('/facets', methods=['GET'])
+@read_only
+@cached_response
+def get_facets():
+    category = request.args.get('category', '')
+    facet_query = select(ProductFacet).where(ProductFacet.product_count > 0)
+    if category:
+        facet_query = facet_query.where(ProductFacet.category == category)
+    bounds = app.config['FACET_PRICE_BUCKETS']
+    buckets = [
+        {"min": bounds[n - 1] if n else None, "max": bounds[n] if n < len(bounds) else None, "count": 0, "in_stock": 0}
+        for n in range(len(bounds) + 1)
+    ]
+    unpriced = {"count": 0, "in_stock": 0}
+    categories = {}
+    for facet in db.session.scalars(facet_query):
+        bucket = unpriced if facet.price_bucket < 0 else buckets[min(facet.price_bucket, len(bounds))]
+        bucket["count"] += facet.product_count
+        bucket["in_stock"] += facet.in_stock_count
+        entry = categories.setdefault(facet.category, {"category": facet.category or None, "count": 0, "in_stock": 0})
+        entry["count"] += facet.product_count
+        entry["in_stock"] += facet.in_stock_count
+    return json_response({
+        "total": sum(entry["count"] for entry in categories.values()),
+        "in_stock": sum(entry["in_stock"] for entry in categories.values()),
+        "categories": sorted(categories.values(), key=lambda entry: entry["category"] or ''),
+        "price_buckets": buckets,
+        "unpriced": unpriced
+    })
+
+# Streaming bulk import
+# The body is read line by line straight off the WSGI input (never buffered whole),
+# validated with the same field handling as add_product and inserted in batches,
+# one transaction per batch. mode=upsert updates products whose SKU already exists.
+CSV_BOOL_FIELDS = ['in_stock', 'is_rubber']
+CSV_INT_FIELDS = ['stock_number']
+
+def import_text_stream():
+    stream = get_input_stream(request.environ, max_content_length=app.config['IMPORT_MAX_CONTENT_LENGTH'])
+    return io.TextIOWrapper(io.BufferedReader(stream), encoding='utf-8', newline='')
+
+def csv_row_to_item(row):
+    item = {}
+    for field, value in row.items():
+        if field not in UPDATABLE_FIELDS or value is None or value == '':
             continue
+        if field in FLOAT_FIELDS:
+            value = float(value)
+        elif field in CSV_INT_FIELDS:
+            value = int(value)
+        elif field in CSV_BOOL_FIELDS:
+            value = value.strip().lower() in ('1', 'true', 'yes', 'on')
+        elif field in ('download_pdfs', 'product_image_urls'):
+            value = value.split(",")
+        elif field in JSON_FIELDS:
+            value = json.loads(value)
+        item[field] = value
+    return item
+
+def import_items(text_stream, data_format):
+    if data_format == 'csv':
+        reader = csv.DictReader(text_stream)
+        for row in reader:
+            try:
+                yield reader.line_num, csv_row_to_item(row)
+            except (ValueError, TypeError) as e:
+                yield reader.line_num, e
+    else:
+        for line_number, line in enumerate(text_stream, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                yield line_number, item if isinstance(item, dict) else ValueError("Row must be a JSON object")
+            except ValueError as e:
+                yield line_number, e
 
+def validated_product_values(item):
+    values = product_values(item)
+    for field, value in values.items():
+        if not isinstance(value, SCALAR_TYPES):
+            raise ValueError(f"invalid value for {field}")
+    return values
+
+# Returns (inserted, updated, errors) for one batch of (line, item) pairs
+def import_batch(batch, upsert):
+    errors = []
+    inserts = {}  # Keyed by SKU (or line, without one) so repeated SKUs merge
+    updates = {}
+    existing = {}
+    if upsert:
+        skus = {item['sku'] for _, item in batch if isinstance(item.get('sku'), str)}
+        if skus:
+            for product_id, sku in db.session.execute(select(Product.id, Product.sku).where(Product.sku.in_(skus)).order_by(Product.id.desc())):
+                existing[sku] = product_id  # Descending, so the lowest id wins
+    for line, item in batch:
         try:
-            product.category = update.get('category', product.category)
-            product.product_name = update.get('product_name', product.product_name)
-            product.short_description = update.get('short_description', product.short_description)
-            product.long_description = update.get('long_description', product.long_description)
-            product.mrp = update.get('mrp', product.mrp)
-            product.offer_price = update.get('offer_price', product.offer_price)
-            product.sku = update.get('sku', product.sku)
-            product.in_stock = update.get('in_stock', product.in_stock)
-            product.stock_number = update.get('stock_number', product.stock_number)
-            product.download_pdfs = ",".join(update.get('download_pdfs', product.download_pdfs.split(",") if product.download_pdfs else []))
-            product.product_image_urls = ",".join(update.get('product_image_urls', product.product_image_urls.split(",") if product.product_image_urls else []))
-            product.youtube_links = update.get('youtube_links', product.youtube_links)
-            product.technical_information = update.get('technical_information', product.technical_information)
-            product.manufacturer = update.get('manufacturer', product.manufacturer)
-            product.special_note = update.get('special_note', product.special_note)
-            product.whatsapp_number = update.get('whatsapp_number', product.whatsapp_number)
-            product.is_rubber = update.get('is_rubber', product.is_rubber)
-            product.rubber_density = update.get('rubber_density', product.rubber_density)
-            product.rubber_height = update.get('rubber_height', product.rubber_height)
-            product.rubber_length = update.get('rubber_length', product.rubber_length)
-            product.rubber_thickness = update.get('rubber_thickness', product.rubber_thickness)
-            product.rubber_description = update.get('rubber_description', product.rubber_description)
-            product.variants = json.dumps(update.get('variants', json.loads(product.variants) if product.variants else []))
-            updated_products.append({"identifier": identifier, "status": "updated"})
+            sku = item.get('sku')
+            if upsert and sku in existing:
+                updates.setdefault(existing[sku], {"id": existing[sku]}).update(product_update_values(item))
+            elif upsert and isinstance(sku, str) and sku in inserts:
+                inserts[sku][1].update(product_update_values(item))
+            else:
+                inserts[sku if upsert and isinstance(sku, str) else ('line', line)] = (line, validated_product_values(item))
         except Exception as e:
-            errors.append({"error": f"Failed to update product {identifier}: {str(e)}"})
+            errors.append({"line": line, "error": str(e)})
+    try:
+        changed_ids = []
+        if inserts:
+            changed_ids += db.session.scalars(insert(Product).returning(Product.id), [values for _, values in inserts.values()]).all()
+        if updates:
+            db.session.execute(update(Product), list(updates.values()))
+            changed_ids += list(updates)
+        products_changed(changed_ids)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        rejected = {error["line"] for error in errors}
+        failed_lines = [line for line, _ in batch if line not in rejected]
+        return 0, 0, errors + [{"line": line, "error": f"Batch failed: {str(e)}"} for line in failed_lines]
+    return len(inserts), len(updates), errors
 
-    db.session.commit()
-    app.logger.debug(f"API: Bulk updated products: {len(updated_products)} succeeded, {len(errors)} failed")
+@app.route('/products/import', methods=['POST'])
+def import_products():
+    data_format = request.args.get('format') or ('csv' if request.mimetype == 'text/csv' else 'ndjson')
+    if data_format not in ('ndjson', 'csv'):
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+    upsert = request.args.get('mode', 'insert') == 'upsert'
+    batch_size = max(1, min(request.args.get('batch_size', app.config['IMPORT_BATCH_SIZE'], type=int), app.config['IMPORT_MAX_BATCH_SIZE']))
+
+    started = time.perf_counter()
+    rows = inserted = updated = failed = 0
+    errors = []
+    batch = []
+
+    def flush():
+        nonlocal inserted, updated, failed
+        batch_inserted, batch_updated, batch_errors = import_batch(batch, upsert)
+        inserted += batch_inserted
+        updated += batch_updated
+        failed += len(batch_errors)
+        errors.extend(batch_errors[:app.config['IMPORT_MAX_REPORTED_ERRORS'] - len(errors)])
+        batch.clear()
+
+    try:
+        for line, item in import_items(import_text_stream(), data_format):
+            rows += 1
+            if isinstance(item, Exception):
+                failed += 1
+                if len(errors) < app.config['IMPORT_MAX_REPORTED_ERRORS']:
+                    errors.append({"line": line, "error": str(item)})
+                continue
+            batch.append((line, item))
+            if len(batch) >= batch_size:
+                flush()
+    except (UnicodeDecodeError, csv.Error) as e:
+        errors.append({"line": rows + 1, "error": f"Unreadable input: {str(e)}"})
+        failed += 1
+    if batch:
+        flush()
+
+    seconds = time.perf_counter() - started
+    app.logger.debug("API: Imported products: %s inserted, %s updated, %s failed in %.3fs", inserted, updated, failed, seconds)
     return jsonify({
-        "message": "Bulk update processed",
-        "updated": updated_products,
-        "errors": errors
-    }), 200 if not errors else 207
+        "message": "Import processed",
+        "rows": rows,
+        "inserted": inserted,
+        "updated": updated,
+        "failed": failed,
+        "errors": errors,
+        "seconds": round(seconds, 6),
+        "rows_per_second": round(rows / seconds, 1) if seconds else None
+    }), 200 if not failed else 207
+
+# Streaming catalog export
+# Rows come off the cursor in yield_per partitions and are encoded and sent one
+# partition at a time, so memory use does not depend on catalog size.
+def export_json_line(product):
+    if orjson is not None:
+        try:
+            return orjson.dumps(product, option=orjson.OPT_SORT_KEYS) + b"\n"
+        except TypeError:  # orjson.JSONEncodeError: integers beyond 64 bits
+            pass
+    return json.dumps(product, sort_keys=True, separators=(',', ':')).encode() + b"\n"
+
+def export_chunks(statement, fields, data_format):
+    result = db.session.execute(statement.execution_options(yield_per=app.config['EXPORT_BATCH_SIZE']))
+    if data_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        for rows in result.partitions():
+            # Lists stay comma-joined and variants stay JSON text, as /products/import reads them
+            writer.writerows(rows)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+    else:
+        for rows in result.partitions():
+            yield b"".join(export_json_line(product) for product in serialize_product_rows(rows, fields))
+
+# ?gzip=1 exports are a .gz file rather than a Content-Encoding, but share the streaming compressor
+def gzip_chunks(chunks):
+    compress_chunk, finish = stream_compressor('gzip')
+    for chunk in chunks:
+        yield compress_chunk(chunk)
+    yield finish()
+
+@app.route('/products/export', methods=['GET'])
+@read_only
+def export_products():
+    data_format = request.args.get('format', 'ndjson')
+    if data_format not in ('ndjson', 'csv'):
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+    try:
+        fields = requested_fields()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    use_gzip = request.args.get('gzip', '') in ('1', 'true')
+
+    try:
+        listing = ListingQuery.from_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    # Same rows and order as /search for q, /products otherwise
+    query = request.args.get('q', '').lower()
+    statement = listing.filter(select(*product_columns(fields)))
+    if query:
+        statement = apply_search(statement, query)
+    if not (query and search_is_ranked(query) and listing.default_order):
+        statement = listing.order(statement.order_by(None))
+    chunks = export_chunks(statement, fields, data_format)
+    filename = f"products.{data_format}"
+    mimetype = 'text/csv' if data_format == 'csv' else 'application/x-ndjson'
+    if use_gzip:
+        chunks = gzip_chunks(chunks)
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    response = app.response_class(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+# Change feed
+# GET /changes?since=<token> returns the products written after the token, collapsed to
+# the latest change per product: upserts carry the current row (honouring ?fields=),
+# deletes only the id. since=latest returns no changes and the current head token, so
+# a mirror can take a token, run a full /products/export, then follow deltas. wait=<s>
+# long-polls until something changes; stream=1 streams NDJSON batches until caught up.
+def decode_change_token(token):
+    if token == 'latest':
+        # The last id handed out, which outlives the rows themselves once the log is emptied
+        return db.session.scalar(text("SELECT seq FROM sqlite_sequence WHERE name = :table"), {"table": ProductChange.__tablename__}) or 0
+    key = decode_cursor(token) or [0]
+    if not isinstance(key, list) or len(key) != 1 or not isinstance(key[0], int):
+        raise ValueError(f"Invalid change token: {token}")
+    return key[0]
+
+def change_batch(since, limit, fields):
+    rows = db.session.execute(
+        select(ProductChange.id, ProductChange.product_id, ProductChange.op,
+               func.strftime('%Y-%m-%dT%H:%M:%fZ', ProductChange.changed_at).label('changed_at'))
+        .where(ProductChange.id > since).order_by(ProductChange.id).limit(limit)
+    ).all()
+    latest = {}
+    for row in rows:
+        latest.pop(row.product_id, None)  # Re-inserted, so products stay ordered by their last change
+        latest[row.product_id] = row
+    upsert_ids = [product_id for product_id, row in latest.items() if row.op == 'upsert']
+    products = {}
+    if upsert_ids:
+        product_rows = db.session.execute(select(*product_columns(fields)).where(Product.id.in_(upsert_ids))).all()
+        products = {product['id']: product for product in serialize_product_rows(product_rows, fields)}
+    changes = []
+    for product_id, row in latest.items():
+        change = {"id": product_id, "change": row.id, "changed_at": row.changed_at}
+        if product_id in products:
+            change.update(op='upsert', product=products[product_id])
+        else:
+            change["op"] = 'delete'  # Deleted, or deleted again after this upsert
+        changes.append(change)
+    return changes, (rows[-1].id if rows else since), len(rows) == limit
+
+@app.route('/changes', methods=['GET'])
+@read_only
+def get_changes():
+    try:
+        fields = requested_fields()
+        since = decode_change_token(request.args.get('since', ''))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    limit = max(1, min(request.args.get('limit', app.config['CHANGES_BATCH_SIZE'], type=int), app.config['CHANGES_MAX_BATCH_SIZE']))
+    wait = max(0.0, min(request.args.get('wait', 0, type=float), app.config['CHANGES_MAX_WAIT']))
+
+    oldest = db.session.scalar(select(func.min(ProductChange.id)))
+    if oldest and since < oldest - 1:
+        return jsonify({"error": "Change token has expired; resync with /products/export"}), 410
+
+    changes, head, has_more = change_batch(since, limit, fields)
+    deadline = time.monotonic() + wait
+    while not changes and head == since and time.monotonic() < deadline:
+        db.session.close()  # Don't hold a pooled connection while waiting
+        with change_condition:
+            # Commits in other worker processes are picked up on the next poll
+            change_condition.wait(min(deadline - time.monotonic(), app.config['CHANGES_POLL_INTERVAL']))
+        changes, head, has_more = change_batch(since, limit, fields)
+
+    if request.args.get('stream', '') not in ('1', 'true'):
+        return json_response({"changes": changes, "next": encode_cursor([head]), "has_more": has_more})
+
+    def generate(changes, head, has_more):
+        while True:
+            yield b"".join(export_json_line(change) for change in changes)
+            if not has_more:
+                break
+            changes, head, has_more = change_batch(head, limit, fields)
+        yield export_json_line({"next": encode_cursor([head])})
+
+    return app.response_class(stream_with_context(generate(changes, head, has_more)), mimetype='application/x-ndjson')
 
 if __name__ == '__main__':
     app.run(debug=True, port=5001, host='0.0.0.0')
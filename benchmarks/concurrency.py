@@ -0,0 +1,139 @@
+"""Load test: concurrent readers and writers against a file-backed SQLite catalog.
+
+Forks reader and writer processes (like gunicorn workers) for each DB_PROFILE, runs
+GET /products pages against PUT /product/<id> and PUT /products/bulk-update bursts for a
+fixed time, and reports throughput, read latency and failed ("database is locked")
+requests per profile.
+
+    python benchmarks/concurrency.py --readers 4 --writers 2 --seconds 10
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_app(database, profile):
+    # Each worker imports the app itself so DATABASE_URL and DB_PROFILE apply to it
+    os.environ['DATABASE_URL'] = f'sqlite:///{database}'
+    os.environ['DB_PROFILE'] = profile
+    sys.path.insert(0, ROOT)
+    logging.disable(logging.INFO)
+    import app as catalog
+    catalog.app.config['RESPONSE_CACHE_ENABLED'] = False  # Measure the database, not the cache
+    return catalog
+
+
+def seed(database, profile, rows):
+    catalog = load_app(database, profile)
+    with catalog.app.app_context():
+        catalog.db.session.execute(catalog.insert(catalog.Product), [{
+            'category': f'Category {i % 20}',
+            'product_name': f'Product {i}',
+            'sku': f'SKU-{i:07d}',
+            'offer_price': round(random.uniform(50, 5000), 2),
+            'in_stock': i % 5 != 0,
+            'long_description': 'rubber sheet ' * 40,
+        } for i in range(rows)])
+        catalog.db.session.commit()
+
+
+# Workers import the app (and run its startup work) first, then start the clock together
+def start_together(ready, seconds):
+    ready.wait(timeout=300)
+    started = time.time()
+    return started, started + seconds
+
+
+def reader(database, profile, rows, seconds, ready, results):
+    client = load_app(database, profile).app.test_client()
+    pages = max(rows // 50, 1)
+    done = failed = 0
+    latencies = []
+    started, deadline = start_together(ready, seconds)
+    while time.time() < deadline:
+        start = time.perf_counter()
+        response = client.get(f'/products?per_page=50&page={random.randint(1, pages)}')
+        latencies.append(time.perf_counter() - start)
+        if response.status_code == 200:
+            done += 1
+        else:
+            failed += 1
+    results.put(('read', done, failed, latencies, started, time.time()))
+
+
+def writer(database, profile, rows, seconds, ready, results):
+    client = load_app(database, profile).app.test_client()
+    done = failed = 0
+    started, deadline = start_together(ready, seconds)
+    while time.time() < deadline:
+        if random.random() < 0.8:
+            response = client.put(f'/product/{random.randint(1, rows)}', json={'offer_price': random.randint(50, 5000)})
+        else:
+            items = [{'id': random.randint(1, rows), 'in_stock': random.random() > 0.5} for _ in range(200)]
+            response = client.put('/products/bulk-update', json=items)
+        if response.status_code == 200:
+            done += 1
+        else:
+            failed += 1
+    results.put(('write', done, failed, [], started, time.time()))
+
+
+def run(profile, args):
+    context = multiprocessing.get_context('fork')
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'products.db')
+        process = context.Process(target=seed, args=(database, profile, args.rows))
+        process.start()
+        process.join()
+        results = context.Queue()
+        ready = context.Barrier(args.readers + args.writers)
+        workers = [context.Process(target=reader, args=(database, profile, args.rows, args.seconds, ready, results))
+                   for _ in range(args.readers)]
+        workers += [context.Process(target=writer, args=(database, profile, args.rows, args.seconds, ready, results))
+                    for _ in range(args.writers)]
+        for process in workers:
+            process.start()
+        totals = {'read': [0, 0], 'write': [0, 0]}
+        latencies, starts, ends = [], [], []
+        for _ in workers:
+            kind, done, failed, kind_latencies, started, ended = results.get()
+            totals[kind][0] += done
+            totals[kind][1] += failed
+            latencies += kind_latencies
+            starts.append(started)
+            ends.append(ended)
+        for process in workers:
+            process.join()
+    # Rates are over the window the workers actually ran, not the requested duration
+    measured = max(ends) - min(starts)
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0
+    print(f'{profile:<12} {totals["read"][0] / measured:>10,.0f} {totals["read"][1]:>8} '
+          f'{p99 * 1000:>10.1f} {totals["write"][0] / measured:>10,.0f} {totals["write"][1]:>8} {measured:>9.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--profiles', default='development,production')
+    args = parser.parse_args()
+
+    random.seed(42)
+    print(f'{args.rows} products, {args.readers} readers, {args.writers} writers, {args.seconds:g}s per profile')
+    print(f'{"profile":<12} {"reads/s":>10} {"failed":>8} {"p99 ms":>10} {"writes/s":>10} {"failed":>8} {"seconds":>9}')
+    for profile in args.profiles.split(','):
+        run(profile, args)
+
+
+if __name__ == '__main__':
+    main()
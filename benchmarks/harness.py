@@ -0,0 +1,337 @@
+"""Benchmark harness: request throughput and latency against synthetic catalogs.
+
+Seeds a file-backed catalog per size (realistic names, variants, media and rubber
+fields), then replays each scenario against the app, either in-process through the
+Flask test client or over HTTP against local gunicorn workers. Results are written
+as JSON so runs from different commits can be compared.
+
+    python benchmarks/harness.py --sizes 1000,100000 --requests 200 --output before.json
+    python benchmarks/harness.py --sizes 1000,100000 --requests 200 --output after.json --compare before.json
+    python benchmarks/harness.py --sizes 1000000 --server gunicorn --workers 4 --concurrency 8
+
+The response cache is disabled (RESPONSE_CACHE_ENABLED=0) so reads measure the database
+path; pass --cache to keep it on.
+"""
+import argparse
+import base64
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.cookies import SimpleCookie
+from urllib.parse import quote, urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORDS = ['rubber', 'sheet', 'gasket', 'neoprene', 'nitrile', 'silicone', 'epdm', 'viton', 'seal', 'mat',
+         'strip', 'industrial', 'grade', 'insertion', 'cloth', 'food', 'fire', 'resistant', 'anti', 'skid']
+CATEGORIES = ['Rubber Sheets', 'Gaskets', 'Mats', 'Seals', 'Hoses', 'Profiles', 'O-Rings', 'Flooring']
+MANUFACTURERS = ['Acme Rubber', 'Ismat', 'Polyseal', 'Elastomer Works', 'Gripwell']
+SIZES_MM = [1, 2, 3, 5, 6, 8, 10, 12, 15, 20, 25]
+
+
+def product_row(rng, i):
+    name = ' '.join(rng.sample(WORDS, 3)).title()
+    is_rubber = rng.random() < 0.7
+    price = round(rng.uniform(50, 20000), 2)
+    return {
+        'category': rng.choice(CATEGORIES),
+        'product_name': f'{name} {i}',
+        'short_description': ' '.join(rng.choices(WORDS, k=12)),
+        'long_description': ' '.join(rng.choices(WORDS, k=150)),
+        'mrp': round(price * rng.uniform(1.0, 1.4), 2),
+        'offer_price': price,
+        'sku': f'SKU-{i:08d}',
+        'in_stock': rng.random() > 0.15,
+        'stock_number': rng.randint(0, 1000),
+        'download_pdfs': f'static/uploads/spec-{i % 500}.pdf' if rng.random() < 0.3 else '',
+        'product_image_urls': ','.join(f'static/uploads/{i}-{n}.jpg' for n in range(rng.randint(1, 4))),
+        'youtube_links': '',
+        'technical_information': '<p>' + ' '.join(rng.choices(WORDS, k=60)) + '</p>',
+        'manufacturer': rng.choice(MANUFACTURERS),
+        'special_note': '',
+        'whatsapp_number': '+910000000000',
+        'is_rubber': is_rubber,
+        'rubber_density': round(rng.uniform(0.9, 2.0), 2) if is_rubber else None,
+        'rubber_height': round(rng.uniform(500, 2000), 0) if is_rubber else None,
+        'rubber_length': round(rng.uniform(1000, 10000), 0) if is_rubber else None,
+        'rubber_thickness': rng.choice(SIZES_MM) if is_rubber else None,
+        'rubber_description': ' '.join(rng.choices(WORDS, k=20)) if is_rubber else None,
+        'variants': json.dumps([
+            {'name': f'{size}mm', 'price': round(price * size / 5, 2), 'sku': f'SKU-{i:08d}-{size}'}
+            for size in sorted(rng.sample(SIZES_MM, rng.randint(0, 4)))
+        ]),
+    }
+
+
+def seed(catalog, size, rng, batch_size=10000):
+    with catalog.app.app_context():
+        for start in range(0, size, batch_size):
+            rows = [product_row(rng, i) for i in range(start, min(start + batch_size, size))]
+            ids = catalog.db.session.scalars(catalog.insert(catalog.Product).returning(catalog.Product.id), rows).all()
+            catalog.products_changed(ids)
+            catalog.db.session.commit()
+
+
+# Scenarios: name -> function(rng, size) returning (method, path, params, json body or None)
+def deep_page(rng, size):
+    return 'GET', '/products', {'page': max(size // 50 - rng.randint(0, 9), 1), 'per_page': 50}, None
+
+
+def deep_cursor(rng, size):
+    # A keyset cursor is base64 JSON of the last id served (see encode_cursor in app.py)
+    token = base64.urlsafe_b64encode(json.dumps(max(size - rng.randint(50, 600), 0)).encode()).decode()
+    return 'GET', '/products', {'cursor': token, 'per_page': 50}, None
+
+
+SCENARIOS = {
+    'products_first_page': lambda rng, size: ('GET', '/products', {'page': 1, 'per_page': 50}, None),
+    'products_deep_page': deep_page,
+    'products_deep_cursor': deep_cursor,
+    'product_by_id': lambda rng, size: ('GET', f'/product/{rng.randint(1, size)}', {}, None),
+    'search': lambda rng, size: ('GET', '/search', {'q': ' '.join(rng.sample(WORDS, 2)), 'per_page': 20}, None),
+    'search_prefix': lambda rng, size: ('GET', '/search', {'q': rng.choice(WORDS)[:3], 'per_page': 20}, None),
+    'bulk_update_100': lambda rng, size: ('PUT', '/products/bulk-update', {}, [
+        {'id': rng.randint(1, size), 'offer_price': round(rng.uniform(50, 20000), 2), 'in_stock': rng.random() > 0.5}
+        for _ in range(100)
+    ]),
+    'update_by_sku': lambda rng, size: ('PUT', f'/product/sku/SKU-{rng.randrange(size):08d}', {}, {'stock_number': rng.randint(0, 1000)}),
+    'update_by_name': lambda rng, size: ('PUT', '/product/name/' + 'x', {}, None),  # Replaced in run_size (needs stored names)
+    'ui_listing': lambda rng, size: ('GET', '/', {'page': rng.randint(1, 20), 'category': rng.choice(CATEGORIES), 'in_stock': 'true'}, None),
+}
+
+
+class TestClientTarget:
+    def __init__(self, catalog):
+        self.client = catalog.app.test_client()
+        self.client.post('/register', data={'username': 'bench', 'password': 'bench'})
+        self.client.post('/login', data={'username': 'bench', 'password': 'bench'})
+
+    def request(self, method, path, params, body):
+        return self.client.open(path, method=method, query_string=params, json=body).status_code
+
+
+class HTTPTarget:
+    def __init__(self, port):
+        self.port = port
+        self.local = threading.local()
+        self.cookie = ''
+        self.request('POST', '/register', {}, None, form={'username': 'bench', 'password': 'bench'})
+        headers = self.raw('POST', '/login', urlencode({'username': 'bench', 'password': 'bench'}),
+                           {'Content-Type': 'application/x-www-form-urlencoded'})[1]
+        cookie = SimpleCookie(headers.get('Set-Cookie', ''))
+        self.cookie = '; '.join(f'{key}={morsel.value}' for key, morsel in cookie.items())
+
+    def raw(self, method, path, body, headers):
+        if not hasattr(self.local, 'connection'):
+            self.local.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=120)
+        headers = dict(headers, Cookie=self.cookie)
+        self.local.connection.request(method, path, body=body, headers=headers)
+        response = self.local.connection.getresponse()
+        response.read()
+        return response.status, response.headers
+
+    def request(self, method, path, params, body, form=None):
+        path = quote(path)  # Product names in /product/name/<name> contain spaces
+        if params:
+            path += '?' + urlencode(params)
+        if form is not None:
+            return self.raw(method, path, urlencode(form), {'Content-Type': 'application/x-www-form-urlencoded'})[0]
+        if body is not None:
+            return self.raw(method, path, json.dumps(body), {'Content-Type': 'application/json'})[0]
+        return self.raw(method, path, None, {})[0]
+
+
+def start_gunicorn(database, workers, env):
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:app'],
+        cwd=ROOT, env=dict({'LOG_LEVEL': 'WARNING'}, **os.environ, DATABASE_URL=f'sqlite:///{database}', **env)
+    )
+    for _ in range(300):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            return process, port
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError('gunicorn did not start')
+
+
+def measure(target, scenario, requests, concurrency, rng_seed):
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def worker(worker_number):
+        nonlocal errors
+        rng = random.Random(rng_seed * 1000 + worker_number)
+        for _ in range(requests // concurrency + (worker_number < requests % concurrency)):
+            method, path, params, body = scenario(rng)
+            started = time.perf_counter()
+            try:
+                status = target.request(method, path, params, body)
+            except (OSError, http.client.HTTPException):
+                status = 599  # Dropped connection: count it, keep the run going
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                errors += status >= 400
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / wall, 2),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 3),
+        'p99_ms': round(latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000, 3),
+    }
+
+
+def run_size(size, args, env):
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'products.db')
+        os.environ.update(env, DATABASE_URL=f'sqlite:///{database}')
+        sys.path.insert(0, ROOT)
+        logging.disable(logging.INFO)
+        import app as catalog  # main() runs each size in its own interpreter, so this binds to `database`
+        started = time.perf_counter()
+        seed(catalog, size, random.Random(args.seed))
+        seed_seconds = time.perf_counter() - started
+        print(f'{size:>9,} products seeded in {seed_seconds:.1f}s', file=sys.stderr)
+
+        with catalog.app.app_context():
+            names = catalog.db.session.scalars(
+                catalog.select(catalog.Product.product_name).order_by(catalog.func.random()).limit(1000)
+            ).all()
+        scenarios = dict(SCENARIOS)
+        scenarios['update_by_name'] = lambda rng, size: ('PUT', f'/product/name/{rng.choice(names)}', {}, {'stock_number': rng.randint(0, 1000)})
+
+        process = None
+        if args.server == 'gunicorn':
+            process, port = start_gunicorn(database, args.workers, env)
+            target = HTTPTarget(port)
+        else:
+            target = TestClientTarget(catalog)
+        try:
+            for name in args.scenarios.split(','):
+                scenario = scenarios[name]
+                measure(target, lambda rng: scenario(rng, size), min(args.warmup, args.requests), args.concurrency, args.seed + 1)
+                result = measure(target, lambda rng: scenario(rng, size), args.requests, args.concurrency, args.seed)
+                results.append({'size': size, 'scenario': name, **result})
+                print(f'{size:>9,} {name:<22} {result["throughput_rps"]:>9,.1f} req/s  p50 {result["p50_ms"]:>9.2f} ms  '
+                      f'p99 {result["p99_ms"]:>9.2f} ms  errors {result["errors"]}', file=sys.stderr)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+    return results, seed_seconds
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(report, baseline_path, threshold):
+    with open(baseline_path) as baseline_file:
+        baseline = {(entry['size'], entry['scenario']): entry for entry in json.load(baseline_file)['results']}
+    regressions = []
+    print(f'\n{"size":>9} {"scenario":<22} {"p50 change":>11} {"p99 change":>11} {"req/s change":>13}', file=sys.stderr)
+    for entry in report['results']:
+        before = baseline.get((entry['size'], entry['scenario']))
+        if not before:
+            continue
+        p50 = entry['p50_ms'] / before['p50_ms'] - 1
+        p99 = entry['p99_ms'] / before['p99_ms'] - 1
+        throughput = entry['throughput_rps'] / before['throughput_rps'] - 1
+        flag = '  REGRESSION' if p50 > threshold or throughput < -threshold else ''
+        if flag:
+            regressions.append(entry)
+        print(f'{entry["size"]:>9,} {entry["scenario"]:<22} {p50:>+10.1%} {p99:>+10.1%} {throughput:>+12.1%}{flag}', file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000', help='Comma-separated catalog sizes, e.g. 1000,100000,1000000')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=200, help='Measured requests per scenario')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--server', choices=['testclient', 'gunicorn'], default='testclient')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers')
+    parser.add_argument('--cache', action='store_true', help='Keep the response cache enabled')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write the JSON report here (default: stdout)')
+    parser.add_argument('--compare', help='Baseline JSON report to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Relative slowdown reported as a regression')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    if len(sizes) > 1:
+        # The app binds its database at import time, so each size runs in a fresh interpreter
+        results, seeding = [], {}
+        for size in sizes:
+            command = [sys.executable, __file__, '--sizes', str(size), '--scenarios', args.scenarios,
+                       '--requests', str(args.requests), '--warmup', str(args.warmup), '--concurrency', str(args.concurrency),
+                       '--server', args.server, '--workers', str(args.workers), '--seed', str(args.seed)]
+            output = subprocess.run(command + ['--cache'] * args.cache, stdout=subprocess.PIPE, check=True).stdout
+            report = json.loads(output)
+            results += report['results']
+            seeding.update(report['seed_seconds'])
+    else:
+        env = {'RESPONSE_CACHE_ENABLED': '1' if args.cache else '0'}
+        results, seeding = [], {}
+        for size in sizes:
+            size_results, seed_seconds = run_size(size, args, env)
+            results += size_results
+            seeding[str(size)] = round(seed_seconds, 2)
+
+    report = {
+        'commit': git_commit(),
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'server': args.server,
+        'concurrency': args.concurrency,
+        'requests_per_scenario': args.requests,
+        'response_cache': args.cache,
+        'seed': args.seed,
+        'seed_seconds': seeding,
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(text + '\n')
+    else:
+        print(text)
+    if args.compare and compare(report, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
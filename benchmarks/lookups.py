@@ -0,0 +1,99 @@
+"""Benchmark: SKU, variant SKU, name and filter lookups with and without the schema indexes.
+
+Seeds an in-memory catalog with variants, then times each lookup as a full scan
+(NOT INDEXED, or a LIKE over the variants JSON) and through the index.
+
+    python benchmarks/lookups.py --rows 100000 --lookups 200
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, text  # noqa: E402
+
+from app import app, db, Product, sync_product_children  # noqa: E402
+
+
+def seed(rows):
+    categories = [f'Category {n}' for n in range(40)]
+    payload = []
+    for i in range(rows):
+        payload.append({
+            'category': random.choice(categories),
+            'product_name': f'Product {i}',
+            'sku': f'SKU-{i:07d}',
+            'offer_price': round(random.uniform(50, 5000), 2),
+            'in_stock': random.random() > 0.2,
+            'product_image_urls': f'static/uploads/{i}.jpg',
+            'variants': json.dumps([
+                {'name': f'{size}mm', 'price': round(random.uniform(50, 5000), 2), 'sku': f'SKU-{i:07d}-{size}'}
+                for size in (2, 5, 10)
+            ]),
+        })
+    ids = db.session.scalars(insert(Product).returning(Product.id), payload).all()
+    sync_product_children(ids)
+    db.session.commit()
+
+
+def timed(label, sql, params):
+    start = time.perf_counter()
+    for values in params:
+        db.session.execute(text(sql), values).all()
+    elapsed = (time.perf_counter() - start) / len(params)
+    print(f'  {label:<10} {elapsed * 1e6:>12,.1f} us/lookup')
+    return elapsed
+
+
+def compare(title, scan_sql, index_sql, params):
+    print(title)
+    scan = timed('scan', scan_sql, params)
+    indexed = timed('indexed', index_sql, params)
+    print(f'  speedup    {scan / indexed:>12,.1f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--lookups', type=int, default=100)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    random.seed(42)
+    with app.app_context():
+        seed(args.rows)
+        picks = [random.randrange(args.rows) for _ in range(args.lookups)]
+        print(f'{args.rows} products, {args.lookups} lookups each')
+
+        skus = [{'sku': f'SKU-{i:07d}'} for i in picks]
+        compare('product SKU',
+                'SELECT id FROM product NOT INDEXED WHERE sku = :sku',
+                'SELECT id FROM product WHERE sku = :sku', skus)
+
+        variant_skus = [{'sku': f'SKU-{i:07d}-5', 'pattern': f'%"sku": "SKU-{i:07d}-5"%'} for i in picks]
+        compare('variant SKU',
+                'SELECT id FROM product WHERE variants LIKE :pattern',
+                'SELECT product_id FROM product_variant WHERE sku = :sku', variant_skus)
+
+        names = [{'name': f'Product {i}'} for i in picks]
+        compare('product name',
+                'SELECT id FROM product NOT INDEXED WHERE product_name = :name',
+                'SELECT id FROM product WHERE product_name = :name', names)
+
+        filters = [{'category': f'Category {i % 40}', 'min': 100.0, 'max': 120.0} for i in picks]
+        compare('category filter',
+                'SELECT id FROM product NOT INDEXED WHERE category = :category',
+                'SELECT id FROM product WHERE category = :category', filters)
+        compare('price range',
+                'SELECT id FROM product NOT INDEXED WHERE offer_price BETWEEN :min AND :max',
+                'SELECT id FROM product WHERE offer_price BETWEEN :min AND :max', filters)
+
+
+if __name__ == '__main__':
+    main()
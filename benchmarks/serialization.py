@@ -0,0 +1,97 @@
+"""Micro-benchmark: Product.to_dict() + jsonify versus the column-tuple serializer.
+
+Seeds an in-memory catalog, then encodes it page by page both ways and reports
+rows per second. Also checks that both paths produce byte-identical JSON.
+
+    python benchmarks/serialization.py --rows 20000 --per-page 100
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, db, Product, product_columns, serialize_product_rows, json_response, orjson  # noqa: E402
+
+
+def seed(rows):
+    words = ['rubber', 'sheet', 'gasket', 'neoprene', 'nitrile', 'seal', 'mat', 'strip', 'industrial', 'grade']
+    payload = []
+    for i in range(rows):
+        name = ' '.join(random.sample(words, 3)).title()
+        payload.append({
+            'category': random.choice(['Rubber Sheets', 'Gaskets', 'Mats', 'Seals']),
+            'product_name': f'{name} {i}',
+            'short_description': ' '.join(random.choices(words, k=12)),
+            'long_description': ' '.join(random.choices(words, k=120)),
+            'mrp': round(random.uniform(100, 5000), 2),
+            'offer_price': round(random.uniform(50, 4000), 2),
+            'sku': f'SKU-{i:07d}',
+            'in_stock': random.random() > 0.2,
+            'stock_number': random.randint(0, 500),
+            'download_pdfs': 'static/uploads/spec.pdf',
+            'product_image_urls': ','.join(f'static/uploads/{i}-{n}.jpg' for n in range(random.randint(1, 5))),
+            'youtube_links': '',
+            'technical_information': '<p>' + ' '.join(random.choices(words, k=60)) + '</p>',
+            'manufacturer': 'Acme Rubber',
+            'is_rubber': True,
+            'rubber_density': round(random.uniform(1, 2), 2),
+            'rubber_thickness': round(random.uniform(1, 20), 1),
+            'rubber_description': ' '.join(random.choices(words, k=20)),
+            'variants': json.dumps([
+                {'name': f'{size}mm', 'price': round(random.uniform(50, 4000), 2), 'sku': f'SKU-{i:07d}-{size}'}
+                for size in random.sample([2, 3, 5, 8, 10], random.randint(0, 3))
+            ]),
+        })
+    db.session.execute(db.insert(Product), payload)
+    db.session.commit()
+
+
+def run(label, encode_page, rows, per_page):
+    start = time.perf_counter()
+    size = 0
+    for offset in range(0, rows, per_page):
+        size += len(encode_page(offset, per_page).get_data())
+    elapsed = time.perf_counter() - start
+    print(f'{label:<28} {rows / elapsed:>12,.0f} rows/s  {elapsed:8.3f}s  {size / 1024 / 1024:8.1f} MiB')
+    return rows / elapsed
+
+
+def to_dict_page(offset, per_page):
+    products = Product.query.order_by(Product.id).offset(offset).limit(per_page).all()
+    return app.json.response({'products': [p.to_dict() for p in products]})
+
+
+def column_tuple_page(offset, per_page):
+    rows = Product.query.with_entities(*product_columns()).order_by(Product.id).offset(offset).limit(per_page).all()
+    return json_response({'products': serialize_product_rows(rows)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--per-page', type=int, default=100)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    random.seed(42)
+    with app.app_context():
+        seed(args.rows)
+        for offset in range(0, args.rows, args.per_page):
+            db.session.expunge_all()
+            if to_dict_page(offset, args.per_page).get_data() != column_tuple_page(offset, args.per_page).get_data():
+                sys.exit(f'Output mismatch in page at offset {offset}')
+        print(f'{args.rows} rows, {args.per_page} per page, orjson {"enabled" if orjson else "not installed"}')
+        db.session.expunge_all()
+        before = run('to_dict + jsonify', to_dict_page, args.rows, args.per_page)
+        after = run('column tuples + encoder', column_tuple_page, args.rows, args.per_page)
+        print(f'speedup: {after / before:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
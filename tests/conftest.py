@@ -0,0 +1,50 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# app.py reads its configuration and creates the schema at import time, so the test
+# database has to be chosen before the first import
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='products-tests-'), 'products.db')}")
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as catalog  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    return catalog.app.test_client()
+
+
+# Every test starts from an empty catalog and the default configuration
+@pytest.fixture(autouse=True)
+def empty_catalog():
+    config = dict(catalog.app.config)
+    yield
+    catalog.app.config.update(config)
+    with catalog.app.app_context():
+        catalog.delete_products(catalog.db.session.scalars(catalog.select(catalog.Product.id)).all())
+        catalog.db.session.execute(catalog.delete(catalog.ProductChange))
+        catalog.db.session.commit()
+
+
+# Insert products straight into the database; returns their ids in insertion order
+@pytest.fixture
+def add_products():
+    def add(rows):
+        with catalog.app.app_context():
+            ids = catalog.db.session.scalars(catalog.insert(catalog.Product).returning(catalog.Product.id), rows).all()
+            catalog.products_changed(ids)
+            catalog.db.session.commit()
+        return ids
+    return add
+
+
+# A client whose session is logged in to the admin UI
+@pytest.fixture
+def admin_client(client):
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+    return client
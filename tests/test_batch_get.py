@@ -0,0 +1,51 @@
+import app as catalog
+
+
+def batch_get(client, body, **params):
+    return client.post('/products/batch-get', json=body, query_string=params)
+
+
+def test_resolves_ids_skus_and_names_in_request_order(client, add_products):
+    first, second, renamed = add_products([
+        {'product_name': 'Mat A', 'sku': 'A-1', 'variants': '[{"sku": "A-1-2MM"}]'},
+        {'product_name': 'Mat B', 'sku': 'B-1'},
+        {'product_name': 'Mat A', 'sku': 'A-2'},
+    ])
+    response = batch_get(client, {'items': [{'sku': 'B-1'}, first, {'product_name': 'Mat A'}, {'sku': 'A-1-2MM'}, {'id': str(second)}]})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [result['product']['id'] for result in body['results']] == [second, first, first, first, second]
+    assert [result['identifier'] for result in body['results']] == ['B-1', first, 'Mat A', 'A-1-2MM', str(second)]
+    assert (body['found'], body['missing']) == (5, 0)
+    assert body['results'][0]['product'] == client.get(f'/product/{second}').get_json()
+    assert renamed not in [result['product']['id'] for result in body['results']]
+
+
+def test_reports_misses_and_invalid_items_in_place(client, add_products):
+    [product_id] = add_products([{'product_name': 'Mat A', 'sku': 'A-1'}])
+    body = batch_get(client, [product_id + 1000, {'sku': 'NOPE'}, 'A-1', {'colour': 'red'}, True, {'sku': 'A-1'}]).get_json()
+    assert [result['found'] for result in body['results']] == [False, False, False, False, False, True]
+    assert body['results'][0]['error'] == f"Product not found for id: {product_id + 1000}"
+    assert body['results'][1]['error'] == "Product not found for sku: NOPE"
+    assert body['results'][2]['error'] == body['results'][3]['error'] == body['results'][4]['error'] \
+        == "Item must be an id or an object with id, sku or product_name"
+    assert (body['found'], body['missing']) == (1, 5)
+
+
+def test_projects_fields(client, add_products):
+    [product_id] = add_products([{'product_name': 'Mat A', 'sku': 'A-1', 'offer_price': 12.5}])
+    body = batch_get(client, [{'sku': 'A-1'}], fields='offer_price').get_json()
+    assert body['results'][0]['product'] == {'id': product_id, 'offer_price': 12.5}
+    response = batch_get(client, [product_id], fields='colour')
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Unknown field(s): colour"}
+
+
+def test_rejects_malformed_and_oversized_requests(client):
+    assert batch_get(client, {'ids': [1]}).status_code == 400
+    assert client.post('/products/batch-get', data='not json', content_type='application/json').status_code == 400
+    catalog.app.config['BATCH_GET_MAX_ITEMS'] = 2
+    response = batch_get(client, [1, 2, 3])
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "At most 2 items per request"}
+    assert batch_get(client, [1, 2]).get_json()['missing'] == 2
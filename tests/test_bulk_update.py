@@ -0,0 +1,54 @@
+import app as catalog
+
+
+def product(client, product_id):
+    return client.get(f'/product/{product_id}').get_json()
+
+
+def test_all_items_applied(client, add_products):
+    first, second = add_products([{'product_name': 'Mat A', 'sku': 'A-1'}, {'product_name': 'Mat B', 'sku': 'B-1'}])
+    response = client.put('/products/bulk-update', json=[
+        {'id': first, 'offer_price': 99.5},
+        {'sku': 'B-1', 'category': 'Gaskets'},
+    ])
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['errors'] == []
+    assert [entry['identifier'] for entry in body['updated']] == [first, 'B-1']
+    assert product(client, first)['offer_price'] == 99.5
+    assert product(client, second)['category'] == 'Gaskets'
+
+
+def test_partial_failure_is_207_and_keeps_the_good_items(client, add_products):
+    [product_id] = add_products([{'product_name': 'Mat A', 'sku': 'A-1', 'offer_price': 10}])
+    response = client.put('/products/bulk-update', json=[
+        'not an object',
+        {'id': product_id, 'offer_price': 12},
+        {'sku': 'missing'},
+        {'offer_price': 1},
+    ])
+    assert response.status_code == 207
+    body = response.get_json()
+    assert [entry['identifier'] for entry in body['updated']] == [product_id]
+    assert [entry['error'] for entry in body['errors']] == [
+        'Product update must be an object',
+        'Product not found for identifier: missing',
+        'Missing identifier (id, sku, or product_name) for a product update',
+    ]
+    assert product(client, product_id)['offer_price'] == 12
+
+
+def test_items_are_split_into_chunks(client, add_products):
+    catalog.app.config['BULK_UPDATE_CHUNK_SIZE'] = 2
+    ids = add_products([{'product_name': f'Mat {i}'} for i in range(5)])
+    response = client.put('/products/bulk-update', json=[{'id': product_id, 'mrp': 100 + product_id} for product_id in ids] + [{'id': 0}])
+    assert response.status_code == 207
+    body = response.get_json()
+    assert [chunk['items'] for chunk in body['chunks']] == [2, 2, 2]
+    assert [chunk['updated'] for chunk in body['chunks']] == [2, 2, 1]
+    assert [product(client, product_id)['mrp'] for product_id in ids] == [100 + product_id for product_id in ids]
+
+
+def test_body_must_be_a_list(client):
+    response = client.put('/products/bulk-update', json={'id': 1})
+    assert response.status_code == 400
@@ -0,0 +1,78 @@
+import json
+
+import app as catalog
+
+
+def changes(client, **params):
+    response = client.get('/changes', query_string=params)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def test_since_token_returns_latest_change_per_product(client, add_products):
+    head = changes(client, since='latest')
+    assert head['changes'] == [] and not head['has_more']
+    first, second = add_products([{'product_name': 'Mat A', 'offer_price': 10}, {'product_name': 'Mat B'}])
+    assert client.put(f'/product/{first}', json={'offer_price': 12}).status_code == 200
+    assert client.delete(f'/product/{second}').status_code == 200
+
+    body = changes(client, since=head['next'])
+    assert [(change['id'], change['op']) for change in body['changes']] == [(first, 'upsert'), (second, 'delete')]
+    assert body['changes'][0]['product'] == client.get(f'/product/{first}').get_json()
+    assert body['changes'][0]['product']['offer_price'] == 12
+    assert set(body['changes'][1]) == {'id', 'op', 'change', 'changed_at'}
+
+    # Following the returned token picks up only later writes
+    assert changes(client, since=body['next'])['changes'] == []
+    client.put(f'/product/{first}', json={'offer_price': 14})
+    assert [change['product']['offer_price'] for change in changes(client, since=body['next'], fields='offer_price')['changes']] == [14]
+
+
+def test_limit_pages_through_the_log(client, add_products):
+    head = changes(client, since='latest')['next']
+    ids = add_products([{'product_name': f'Mat {i}'} for i in range(5)])
+    seen, token = [], head
+    while True:
+        body = changes(client, since=token, limit=2)
+        assert len(body['changes']) <= 2
+        seen += [change['id'] for change in body['changes']]
+        token = body['next']
+        if not body['has_more']:
+            break
+    assert seen == ids
+    assert changes(client, since=token)['changes'] == []
+
+
+def test_stream_emits_ndjson_batches_and_a_final_token(client, add_products):
+    head = changes(client, since='latest')['next']
+    ids = add_products([{'product_name': f'Mat {i}'} for i in range(5)])
+    response = client.get('/changes', query_string={'since': head, 'stream': 1, 'limit': 2})
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['id'] for line in lines[:-1]] == ids
+    assert set(lines[-1]) == {'next'}
+    assert lines[-1]['next'] == changes(client, since=head)['next']
+
+
+def test_rejects_invalid_and_expired_tokens(client, add_products):
+    assert client.get('/changes', query_string={'since': 'garbage'}).status_code == 400
+    head = changes(client, since='latest')['next']
+    add_products([{'product_name': f'Mat {i}'} for i in range(3)])
+    with catalog.app.app_context():
+        newest = catalog.db.session.scalar(catalog.select(catalog.func.max(catalog.ProductChange.id)))
+        catalog.db.session.execute(catalog.delete(catalog.ProductChange).where(catalog.ProductChange.id < newest))
+        catalog.db.session.commit()
+    response = client.get('/changes', query_string={'since': head})
+    assert response.status_code == 410
+    assert 'resync' in response.get_json()['error']
+    assert changes(client, since='latest')['changes'] == []
+
+
+def test_latest_token_survives_an_emptied_log(client, add_products):
+    add_products([{'product_name': 'Mat A'}])
+    with catalog.app.app_context():
+        catalog.db.session.execute(catalog.delete(catalog.ProductChange))
+        catalog.db.session.commit()
+    head = changes(client, since='latest')['next']
+    [product_id] = add_products([{'product_name': 'Mat B'}])
+    assert [change['id'] for change in changes(client, since=head)['changes']] == [product_id]
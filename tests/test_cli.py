@@ -0,0 +1,35 @@
+import hashlib
+import os
+
+import app as catalog
+
+
+def run(*args):
+    result = catalog.app.test_cli_runner().invoke(args=list(args))
+    return result.exit_code, result.output
+
+
+def test_check_query_plans_reports_through_click():
+    code, output = run('check-query-plans')
+    assert code == 0
+    assert output == f"All {len(catalog.LISTING_PLAN_CASES)} listing query plans use indexes\n"
+    code, output = run('check-query-plans', '--verbose')
+    assert output.startswith('ok   category=Gaskets\n       SEARCH product USING INDEX')
+
+
+def test_gc_uploads_reports_removed_files():
+    catalog.app.config['UPLOAD_GC_GRACE_SECONDS'] = -60
+    content = os.urandom(16)
+    path = os.path.join(catalog.app.config['UPLOAD_FOLDER'], f"{hashlib.sha256(content).hexdigest()}.jpg")
+    with open(path, 'wb') as f:
+        f.write(content)
+    code, output = run('gc-uploads')
+    assert (code, output) == (0, "Removed 1 orphaned uploads\n")
+    assert not os.path.exists(path)
+
+
+def test_maintenance_commands_report_through_click(add_products):
+    add_products([{'product_name': 'Mat'}])
+    assert run('rebuild-facets') == (0, "Facets rebuilt\n")
+    assert run('rebuild-search-index') == (0, "Search index rebuilt\n")
+    assert run('prune-changes', '--days', '0') == (0, "Pruned 0 changes\n")
@@ -0,0 +1,30 @@
+import gzip
+import json
+
+import pytest
+
+
+@pytest.fixture
+def catalog_rows(add_products):
+    return add_products([{'product_name': f'Neoprene mat {i}', 'long_description': 'Oil resistant sheet. ' * 10} for i in range(20)])
+
+
+@pytest.mark.parametrize('encoding', ['gzip', 'identity'])
+def test_not_modified_responses_vary_on_accept_encoding(client, catalog_rows, encoding):
+    headers = {'Accept-Encoding': encoding}
+    first = client.get('/products', headers=headers)
+    assert first.status_code == 200 and 'Accept-Encoding' in first.vary
+    second = client.get('/products', headers={**headers, 'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 304
+    assert 'Accept-Encoding' in second.vary
+    assert 'Content-Encoding' not in second.headers
+
+
+def test_each_encoding_has_its_own_etag(client, catalog_rows):
+    plain = client.get('/products', headers={'Accept-Encoding': 'identity'})
+    packed = client.get('/products', headers={'Accept-Encoding': 'gzip'})
+    assert packed.headers['Content-Encoding'] == 'gzip'
+    assert plain.headers['ETag'] != packed.headers['ETag']
+    assert json.loads(gzip.decompress(packed.data)) == plain.get_json()
+    # An ETag for one encoding does not validate the other
+    assert client.get('/products', headers={'Accept-Encoding': 'gzip', 'If-None-Match': plain.headers['ETag']}).status_code == 200
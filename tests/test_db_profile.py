@@ -0,0 +1,81 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Profiles are applied when app.py is imported, so each one is inspected in a fresh process
+PROBE = '''
+import json
+import app as catalog
+from sqlalchemy.exc import OperationalError
+
+report = {}
+with catalog.app.app_context():
+    for key, engine in catalog.db.engines.items():
+        with engine.connect() as conn:
+            report[key or 'default'] = {
+                pragma: conn.exec_driver_sql(f'PRAGMA {pragma}').scalar()
+                for pragma in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'query_only')
+            }
+    report['pool_size'] = catalog.db.engine.pool.size() if hasattr(catalog.db.engine.pool, 'size') else None
+    report['read_only_route'] = catalog.app.config['DB_READ_ONLY_ROUTE']
+    if 'readonly' in catalog.db.engines:
+        try:
+            with catalog.db.engines['readonly'].begin() as conn:
+                conn.exec_driver_sql("INSERT INTO product (product_name) VALUES ('x')")
+            report['readonly_write'] = 'allowed'
+        except OperationalError as e:
+            report['readonly_write'] = str(e.orig)
+
+client = catalog.app.test_client()
+client.post('/add-product', json={'product_name': 'Mat'})
+report['read'] = [product['product_name'] for product in client.get('/products').get_json()['products']]
+with catalog.app.test_request_context('/products'):
+    catalog.g.read_only = True
+    try:
+        catalog.db.session.execute(catalog.text("INSERT INTO product (product_name) VALUES ('y')"))
+        report['read_only_view_write'] = 'allowed'
+    except OperationalError as e:
+        report['read_only_view_write'] = str(e.orig)
+    catalog.db.session.rollback()
+print(json.dumps(report))
+'''
+
+
+def probe(tmp_path, profile, **env):
+    env = {**os.environ, 'DATABASE_URL': f"sqlite:///{tmp_path / 'products.db'}", 'DB_PROFILE': profile, 'LOG_LEVEL': 'WARNING', **env}
+    result = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_production_profile(tmp_path):
+    report = probe(tmp_path, 'production')
+    assert report['default'] == {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000, 'cache_size': -64000, 'query_only': 0}
+    assert report['readonly']['query_only'] == 1 and report['readonly']['journal_mode'] == 'wal'
+    assert report['pool_size'] == 8
+    assert report['read_only_route'] is True
+    assert 'readonly' in report['readonly_write']
+    assert report['read'] == ['Mat']
+    assert 'readonly' in report['read_only_view_write']
+
+
+def test_development_profile(tmp_path):
+    report = probe(tmp_path, 'development')
+    assert report['default']['journal_mode'] == 'delete' and report['default']['busy_timeout'] == 5000
+    assert 'readonly' not in report and report['read_only_route'] is False
+    assert report['read'] == ['Mat']
+    assert report['read_only_view_write'] == 'allowed'
+
+
+def test_read_only_route_can_be_turned_off(tmp_path):
+    report = probe(tmp_path, 'production', DB_READ_ONLY_ROUTE='0')
+    assert 'readonly' not in report and report['default']['journal_mode'] == 'wal'
+
+
+def test_unknown_profile_fails_at_startup(tmp_path):
+    env = {**os.environ, 'DATABASE_URL': f"sqlite:///{tmp_path / 'products.db'}", 'DB_PROFILE': 'staging'}
+    result = subprocess.run([sys.executable, '-c', 'import app'], cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode != 0 and 'staging' in result.stderr
@@ -0,0 +1,60 @@
+import pytest
+
+import app as catalog
+
+
+def changes():
+    with catalog.app.app_context():
+        return catalog.db.session.execute(
+            catalog.select(catalog.ProductChange.product_id, catalog.ProductChange.op).order_by(catalog.ProductChange.id)
+        ).all()
+
+
+def remaining():
+    with catalog.app.app_context():
+        return catalog.db.session.scalars(catalog.select(catalog.Product.id).order_by(catalog.Product.id)).all()
+
+
+@pytest.mark.parametrize('queued', [False, True])
+def test_ui_delete_goes_through_the_write_path(admin_client, add_products, queued):
+    catalog.app.config['WRITE_QUEUE_ENABLED'] = queued
+    keep, drop = add_products([{'product_name': 'Keep'}, {'product_name': 'Drop', 'variants': '[{"sku": "D-2"}]'}])
+    queued_before = catalog.write_queue.stats()['mutations']
+    response = admin_client.post(f'/delete/{drop}')
+    assert response.status_code == 302
+    assert catalog.write_queue.stats()['mutations'] == queued_before + queued
+    assert remaining() == [keep]
+    assert changes()[-1] == (drop, 'delete')
+    assert admin_client.post(f'/delete/{drop}').status_code == 404
+
+
+def test_ui_delete_requires_login(client, add_products):
+    [product_id] = add_products([{'product_name': 'Mat'}])
+    assert client.post(f'/delete/{product_id}').status_code == 302
+    assert remaining() == [product_id]
+
+
+def test_bulk_delete_reports_missing_ids(client, add_products):
+    first, second, third = add_products([{'product_name': f'Mat {i}'} for i in range(3)])
+    response = client.post('/products/bulk-delete', json=[first, third, 999999, first])
+    assert response.status_code == 207
+    assert response.get_json()['deleted'] == [first, third]
+    assert response.get_json()['not_found'] == [999999]
+    assert remaining() == [second]
+    assert {(first, 'delete'), (third, 'delete')} <= set(changes())
+
+
+def test_bulk_delete_rejects_invalid_ids(client, add_products):
+    [product_id] = add_products([{'product_name': 'Mat'}])
+    assert client.post('/products/bulk-delete', json={'ids': [product_id, 'x']}).status_code == 400
+    assert client.post('/products/bulk-delete', json={'id': product_id}).status_code == 400
+    assert remaining() == [product_id]
+
+
+def test_selected_delete_removes_child_rows(admin_client, add_products):
+    ids = add_products([{'product_name': f'Mat {i}', 'variants': f'[{{"sku": "V-{i}"}}]', 'youtube_links': 'https://youtu.be/x'} for i in range(3)])
+    admin_client.post('/delete-selected', data={'product_ids[]': [str(product_id) for product_id in ids[:2]]})
+    assert remaining() == ids[2:]
+    with catalog.app.app_context():
+        assert catalog.db.session.scalars(catalog.select(catalog.ProductVariant.product_id).distinct()).all() == ids[2:]
+        assert catalog.db.session.scalars(catalog.select(catalog.ProductMedia.product_id).distinct()).all() == ids[2:]
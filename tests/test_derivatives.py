@@ -0,0 +1,81 @@
+import hashlib
+import io
+import os
+
+import pytest
+from PIL import Image
+
+import app as catalog
+
+
+@pytest.fixture
+def image_upload():
+    folder = catalog.app.config['UPLOAD_FOLDER']
+    had_derived = os.path.isdir(os.path.join(folder, 'derived'))
+    names = []
+
+    def make(size, image_format='JPEG', extension='jpg'):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, (200, 40, 40)).save(buffer, image_format)
+        data = buffer.getvalue() + os.urandom(8)  # Unique name per test; trailing bytes are ignored by decoders
+        name = f"{hashlib.sha256(data).hexdigest()}.{extension}"
+        with open(os.path.join(folder, name), 'wb') as f:
+            f.write(data)
+        names.append(name)
+        return name
+    yield make
+    with catalog.app.app_context():
+        for name in names:
+            catalog.remove_derivatives(name)
+            os.remove(os.path.join(folder, name))
+    if not had_derived and os.path.isdir(os.path.join(folder, 'derived')) and not os.listdir(os.path.join(folder, 'derived')):
+        os.rmdir(os.path.join(folder, 'derived'))
+
+
+def rendered(name, size, webp=False):
+    path = os.path.join(catalog.app.config['UPLOAD_FOLDER'], catalog.derivative_name(name, size, webp))
+    with Image.open(path) as image:
+        return image.format, image.size
+
+
+def test_derivatives_are_rendered_to_their_longest_edge(image_upload):
+    name = image_upload((2000, 1000))
+    with catalog.app.app_context():
+        futures = catalog.schedule_derivatives([f'/static/uploads/{name}', 'https://cdn.example/x.jpg'])
+        assert len(futures) == 1
+        assert futures[0].result() == len(catalog.derivative_outputs(name))
+        assert rendered(name, 'thumb') == ('JPEG', (320, 160))
+        assert rendered(name, 'medium') == ('JPEG', (1024, 512))
+        if catalog.webp_derivatives_enabled():
+            assert rendered(name, 'thumb', webp=True) == ('WEBP', (320, 160))
+        # Already rendered: nothing to do unless forced
+        assert catalog.schedule_derivatives([f'static/uploads/{name}'])[0].result() == 0
+
+
+def test_small_png_keeps_its_size_and_format(image_upload):
+    name = image_upload((200, 100), 'PNG', 'png')
+    with catalog.app.app_context():
+        catalog.schedule_derivatives([f'static/uploads/{name}'])[0].result()
+        assert rendered(name, 'medium') == ('PNG', (200, 100))
+
+
+def test_derivative_urls_in_responses(client, add_products, image_upload):
+    name = image_upload((50, 50))
+    [product_id] = add_products([{'product_name': 'Mat', 'product_image_urls': f'static/uploads/{name},https://cdn.example/x.jpg'}])
+    local, remote = client.get(f'/product/{product_id}?include=image_derivatives').get_json()['image_derivatives']
+    assert local['thumb'] == f'static/uploads/derived/{name}.thumb.jpg'
+    assert remote == {'original': 'https://cdn.example/x.jpg'}
+
+
+def test_without_pillow_the_original_is_served(client, image_upload, monkeypatch):
+    monkeypatch.setattr(catalog, 'Image', None)
+    name = image_upload((600, 300))
+    with catalog.app.app_context():
+        assert catalog.schedule_derivatives([f'static/uploads/{name}']) == []
+        assert not catalog.webp_derivatives_enabled()
+    response = client.get(f'/static/uploads/derived/{name}.thumb.jpg')
+    assert response.status_code == 200
+    with open(os.path.join(catalog.app.config['UPLOAD_FOLDER'], name), 'rb') as f:
+        assert response.data == f.read()
+    assert response.cache_control.no_cache
+    response.close()
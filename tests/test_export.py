@@ -0,0 +1,51 @@
+import csv
+import gzip
+import io
+import json
+
+import app as catalog
+
+
+def ndjson(response):
+    return [json.loads(line) for line in response.data.splitlines()]
+
+
+def test_ndjson_export_streams_every_product(client, add_products):
+    catalog.app.config['EXPORT_BATCH_SIZE'] = 2
+    ids = add_products([{'product_name': f'Mat {i}', 'offer_price': i} for i in range(5)])
+    response = client.get('/products/export?fields=product_name')
+    assert response.is_streamed
+    assert response.headers['Content-Disposition'] == 'attachment; filename="products.ndjson"'
+    assert ndjson(response) == [{'id': product_id, 'product_name': f'Mat {i}'} for i, product_id in enumerate(ids)]
+
+
+def test_csv_export_reads_back_as_import_input(client, add_products):
+    add_products([{'product_name': 'Mat', 'sku': 'M-1', 'product_image_urls': 'a.jpg,b.jpg'}])
+    response = client.get('/products/export?format=csv&fields=sku,product_name,product_image_urls')
+    rows = list(csv.DictReader(io.StringIO(response.data.decode())))
+    assert [row['product_image_urls'] for row in rows] == ['a.jpg,b.jpg']
+
+
+def test_gzip_export_decompresses_to_the_plain_export(client, add_products):
+    catalog.app.config['EXPORT_BATCH_SIZE'] = 3
+    add_products([{'product_name': f'Mat {i}'} for i in range(10)])
+    plain = client.get('/products/export', headers={'Accept-Encoding': 'identity'})
+    packed = client.get('/products/export?gzip=1', headers={'Accept-Encoding': 'gzip'})
+    assert packed.mimetype == 'application/gzip' and 'Content-Encoding' not in packed.headers
+    assert packed.headers['Content-Disposition'] == 'attachment; filename="products.ndjson.gz"'
+    assert gzip.decompress(packed.data) == plain.data
+
+
+def test_export_honours_listing_filters_and_search(client, add_products):
+    neoprene, _, ranked = add_products([
+        {'product_name': 'Floor mat', 'long_description': 'Neoprene', 'category': 'Mats'},
+        {'product_name': 'Nitrile sheet', 'category': 'Sheets'},
+        {'product_name': 'Neoprene sheet', 'category': 'Sheets'},
+    ])
+    assert [row['id'] for row in ndjson(client.get('/products/export?fields=id&q=neoprene'))] == [ranked, neoprene]
+    assert [row['id'] for row in ndjson(client.get('/products/export?fields=id&q=neoprene&category=Mats'))] == [neoprene]
+    assert [row['id'] for row in ndjson(client.get('/products/export?fields=id&q=neoprene&sort=product_name'))] == [neoprene, ranked]
+
+
+def test_unknown_format_is_rejected(client):
+    assert client.get('/products/export?format=xml').status_code == 400
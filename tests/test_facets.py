@@ -0,0 +1,69 @@
+import app as catalog
+
+
+def expected_facets(products):
+    bounds = catalog.app.config['FACET_PRICE_BUCKETS']
+    buckets = [[0, 0] for _ in range(len(bounds) + 1)]
+    unpriced, categories = [0, 0], {}
+    for product in products:
+        price = product['offer_price']
+        bucket = unpriced if price is None else buckets[sum(1 for bound in bounds if price >= bound)]
+        entry = categories.setdefault(product['category'], [0, 0])
+        for counts in (bucket, entry):
+            counts[0] += 1
+            counts[1] += bool(product['in_stock'])
+    return {
+        'categories': sorted(([category, *counts] for category, counts in categories.items()), key=lambda entry: entry[0] or ''),
+        'price_buckets': [counts for counts in buckets],
+        'unpriced': unpriced,
+    }
+
+
+def actual_facets(client, **params):
+    body = client.get('/facets', query_string=params).get_json()
+    assert body['total'] == sum(entry['count'] for entry in body['categories'])
+    return {
+        'categories': [[entry['category'], entry['count'], entry['in_stock']] for entry in body['categories']],
+        'price_buckets': [[bucket['count'], bucket['in_stock']] for bucket in body['price_buckets']],
+        'unpriced': [body['unpriced']['count'], body['unpriced']['in_stock']],
+    }
+
+
+def listed(client):
+    return client.get('/products?per_page=100&fields=category,offer_price,in_stock').get_json()['products']
+
+
+def test_facets_follow_inserts_updates_and_deletes(client, add_products):
+    ids = add_products([
+        {'product_name': f'Mat {i}', 'sku': f'M-{i}', 'category': ['Mats', 'Sheets', None][i % 3],
+         'offer_price': [None, 50, 100, 750, 20000][i % 5], 'in_stock': i % 4 != 0}
+        for i in range(30)
+    ])
+    assert actual_facets(client) == expected_facets(listed(client))
+
+    client.put('/products/bulk-update', json=[
+        {'sku': 'M-1', 'category': 'Gaskets', 'offer_price': 5000},
+        {'sku': 'M-2', 'in_stock': False},
+        {'sku': 'M-3', 'offer_price': None},
+    ])
+    assert client.post('/products/bulk-delete', json={'ids': ids[20:]}).status_code == 200
+    with catalog.app.app_context():  # Triggers keep facets right for writes that bypass the API too
+        catalog.db.session.execute(catalog.text("UPDATE product SET category = 'Sheets' WHERE sku = 'M-4'"))
+        catalog.db.session.commit()
+    products = listed(client)
+    assert len(products) == 20
+    assert actual_facets(client) == expected_facets(products)
+
+
+def test_facets_within_a_category(client, add_products):
+    add_products([{'product_name': 'Mat', 'category': 'Mats', 'offer_price': 150},
+                  {'product_name': 'Sheet', 'category': 'Sheets', 'offer_price': 150}])
+    body = client.get('/facets?category=Mats').get_json()
+    assert [entry['category'] for entry in body['categories']] == ['Mats']
+    assert body['total'] == 1 and body['price_buckets'][1]['count'] == 1
+
+
+def test_index_page_lists_facet_categories(add_products):
+    add_products([{'product_name': 'Mat', 'category': 'Mats'}, {'product_name': 'Loose', 'category': None}])
+    with catalog.app.app_context():
+        assert catalog.facet_categories() == ['Mats']
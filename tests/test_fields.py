@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+import app as catalog
+
+
+@pytest.fixture
+def product_id(add_products):
+    [product_id] = add_products([{
+        'product_name': 'Neoprene sheet', 'sku': 'N-1', 'long_description': 'Long text', 'offer_price': 10,
+        'product_image_urls': 'https://cdn.example/a.jpg,https://cdn.example/b.jpg',
+        'variants': json.dumps([{'name': '2mm'}]),
+    }])
+    return product_id
+
+
+def test_full_shape_by_default(client, product_id):
+    assert list(client.get(f'/product/{product_id}').get_json()) == sorted(catalog.PRODUCT_FIELDS)
+
+
+def test_fields_select_only_those_keys_plus_id(client, product_id):
+    body = client.get(f'/product/{product_id}?fields=sku,offer_price').get_json()
+    assert body == {'id': product_id, 'sku': 'N-1', 'offer_price': 10}
+    products = client.get('/products?fields=product_name').get_json()['products']
+    assert products == [{'id': product_id, 'product_name': 'Neoprene sheet'}]
+
+
+def test_include_adds_expensive_and_virtual_fields(client, product_id):
+    body = client.get(f'/product/{product_id}?include=primary_image_url').get_json()
+    assert set(body) == set(catalog.PRODUCT_FIELDS) - set(catalog.EXPENSIVE_FIELDS) | {'primary_image_url'}
+    body = client.get(f'/product/{product_id}?include=variants,primary_image_url,updated_at').get_json()
+    assert body['variants'] == [{'name': '2mm'}]
+    assert body['primary_image_url'] == 'https://cdn.example/a.jpg'
+    assert body['updated_at'].endswith('Z')
+    assert 'long_description' not in body
+
+
+def test_fields_and_include_combine(client, product_id):
+    body = client.get(f'/product/{product_id}?fields=sku&include=long_description').get_json()
+    assert body == {'id': product_id, 'sku': 'N-1', 'long_description': 'Long text'}
+
+
+@pytest.mark.parametrize('path', ['/product/{}', '/products', '/search?q=neoprene', '/products/export'])
+@pytest.mark.parametrize('params', ['fields=sku,nope', 'include=password'])
+def test_unknown_fields_are_rejected(client, product_id, path, params):
+    path = path.format(product_id)
+    response = client.get(f"{path}{'&' if '?' in path else '?'}{params}")
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Unknown field(s): ')
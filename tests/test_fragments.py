@@ -0,0 +1,34 @@
+import app as catalog
+
+
+def render(product_ids):
+    with catalog.app.test_request_context('/'):
+        rows = catalog.db.session.execute(
+            catalog.select(catalog.Product.id, catalog.Product.updated_at).where(catalog.Product.id.in_(product_ids)).order_by(catalog.Product.id)
+        ).all()
+        return catalog.render_product_cards(rows, None)
+
+
+def test_cards_are_cached_by_updated_at(add_products):
+    ids = add_products([{'product_name': 'Mat A'}, {'product_name': 'Mat B'}])
+    assert render(ids)[1] == 0
+    cards, cached = render(ids)
+    assert cached == 2 and 'Mat A' in cards[0]
+    with catalog.app.app_context():
+        catalog.db.session.execute(catalog.update(catalog.Product).where(catalog.Product.id == ids[0]).values(product_name='Mat A2'))
+        catalog.products_changed([ids[0]])
+        catalog.db.session.commit()
+    cards, cached = render(ids)
+    assert cached == 1 and 'Mat A2' in cards[0]
+
+
+def test_cards_without_updated_at_are_cached_by_catalog_version(add_products):
+    with catalog.app.app_context():
+        catalog.db.session.execute(catalog.text("INSERT INTO product (product_name) VALUES ('Legacy mat')"))
+        catalog.db.session.commit()
+        [legacy] = catalog.db.session.scalars(catalog.select(catalog.Product.id).where(catalog.Product.updated_at.is_(None))).all()
+    assert render([legacy])[1] == 0
+    assert render([legacy])[1] == 1
+    add_products([{'product_name': 'Unrelated mat'}])  # Any write moves the catalog version on
+    cards, cached = render([legacy])
+    assert cached == 0 and 'Legacy mat' in cards[0]
@@ -0,0 +1,68 @@
+import json
+
+
+def ndjson(*items):
+    return '\n'.join(json.dumps(item) for item in items) + '\n'
+
+
+def import_products(client, body, **params):
+    return client.post('/products/import', query_string=params, data=body, content_type='application/x-ndjson')
+
+
+def by_sku(client):
+    return {product['sku']: product for product in client.get('/products?per_page=50').get_json()['products']}
+
+
+def test_insert_mode_adds_every_row(client, add_products):
+    add_products([{'product_name': 'Mat A', 'sku': 'A-1'}])
+    response = import_products(client, ndjson({'product_name': 'Mat A again', 'sku': 'A-1'}, {'product_name': 'Mat B', 'sku': 'B-1'}))
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['rows'], body['inserted'], body['updated'], body['failed']) == (2, 2, 0, 0)
+    assert len(client.get('/products?per_page=50').get_json()['products']) == 3
+
+
+def test_upsert_updates_existing_skus_and_inserts_new_ones(client, add_products):
+    [existing] = add_products([{'product_name': 'Mat A', 'sku': 'A-1', 'offer_price': 10, 'category': 'Mats'}])
+    response = import_products(client, ndjson(
+        {'sku': 'A-1', 'offer_price': 12},
+        {'product_name': 'Mat B', 'sku': 'B-1', 'offer_price': 5},
+        {'sku': 'B-1', 'category': 'Gaskets'},
+    ), mode='upsert')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['inserted'], body['updated'], body['failed']) == (1, 1, 0)
+    products = by_sku(client)
+    assert products['A-1']['id'] == existing
+    assert (products['A-1']['offer_price'], products['A-1']['category']) == (12, 'Mats')
+    assert (products['B-1']['product_name'], products['B-1']['offer_price'], products['B-1']['category']) == ('Mat B', 5, 'Gaskets')
+
+
+def test_upsert_across_batches(client):
+    response = import_products(client, ndjson(
+        {'product_name': 'Mat A', 'sku': 'A-1', 'offer_price': 1},
+        {'product_name': 'Mat B', 'sku': 'B-1'},
+        {'sku': 'A-1', 'offer_price': 2},
+    ), mode='upsert', batch_size=2)
+    body = response.get_json()
+    assert (body['inserted'], body['updated']) == (2, 1)
+    assert by_sku(client)['A-1']['offer_price'] == 2
+
+
+def test_bad_rows_are_reported_with_207(client):
+    response = import_products(client, '{"product_name": "Mat A", "sku": "A-1"}\nnot json\n[1, 2]\n{"product_name": "Mat B", "offer_price": {"x": 1}}\n')
+    assert response.status_code == 207
+    body = response.get_json()
+    assert (body['rows'], body['inserted'], body['failed']) == (4, 1, 3)
+    assert [error['line'] for error in body['errors']] == [2, 3, 4]
+    assert list(by_sku(client)) == ['A-1']
+
+
+def test_csv_upsert(client, add_products):
+    [existing] = add_products([{'product_name': 'Mat A', 'sku': 'A-1', 'in_stock': False}])
+    body = 'sku,product_name,offer_price,in_stock,product_image_urls\nA-1,,7.5,yes,\nC-1,Mat C,3,no,"a.jpg,b.jpg"\n'
+    response = client.post('/products/import?mode=upsert', data=body, content_type='text/csv')
+    assert response.status_code == 200
+    products = by_sku(client)
+    assert (products['A-1']['id'], products['A-1']['offer_price'], products['A-1']['in_stock']) == (existing, 7.5, True)
+    assert products['C-1']['product_image_urls'] == ['a.jpg', 'b.jpg']
@@ -0,0 +1,23 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import app as catalog
+
+
+def test_failed_statements_clear_their_start_time():
+    with catalog.app.app_context(), catalog.db.engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(catalog.text('SELECT * FROM no_such_table'))
+        assert conn.info['query_started'] == []
+        conn.execute(catalog.text('SELECT 1'))
+        assert conn.info['query_started'] == []
+
+
+def test_failed_statements_are_counted_for_the_request():
+    with catalog.app.test_request_context('/'):
+        catalog.start_request_metrics()
+        with pytest.raises(OperationalError):
+            catalog.db.session.execute(catalog.text('SELECT * FROM no_such_table'))
+        catalog.db.session.rollback()
+        assert catalog.g.sql_queries >= 1
@@ -0,0 +1,60 @@
+import pytest
+
+import app as catalog
+
+
+def walk(client, path, **params):
+    ids, cursor = [], ''
+    while True:
+        response = client.get(path, query_string={**params, 'cursor': cursor})
+        assert response.status_code == 200
+        body = response.get_json()
+        ids += [product['id'] for product in body['products']]
+        if not body['next_cursor']:
+            return ids
+        cursor = body['next_cursor']
+
+
+def test_cursor_pages_cover_every_product_once(client, add_products):
+    ids = add_products([{'product_name': f'Mat {i}', 'category': 'Mats'} for i in range(23)])
+    assert walk(client, '/products', per_page=5) == ids
+
+
+def test_cursor_pages_follow_the_sort(client, add_products):
+    add_products([{'product_name': f'Mat {i}', 'offer_price': price} for i, price in enumerate([5, None, 3, 5, 1, None, 9])])
+    ids = walk(client, '/products', per_page=2, sort='-offer_price')
+    prices = {product['id']: product['offer_price'] for product in client.get('/products?per_page=50').get_json()['products']}
+    assert [prices[product_id] for product_id in ids] == [9, 5, 5, 3, 1, None, None]
+
+
+def test_cursor_pages_of_a_search(client, add_products):
+    ids = add_products([{'product_name': f'Neoprene sheet {i}'} for i in range(7)] + [{'product_name': 'Gasket'}])
+    assert sorted(walk(client, '/search', q='neoprene', per_page=3)) == ids[:7]
+
+
+@pytest.mark.parametrize('per_page', ['0', '-5'])
+def test_per_page_is_at_least_one(client, add_products, per_page):
+    add_products([{'product_name': f'Mat {i}'} for i in range(3)])
+    for params in ({'per_page': per_page}, {'per_page': per_page, 'cursor': ''}):
+        body = client.get('/products', query_string=params).get_json()
+        assert body['per_page'] == 1
+        assert len(body['products']) == 1
+
+
+def test_invalid_cursor_is_rejected(client):
+    assert client.get('/products?cursor=not-a-cursor').status_code == 400
+
+
+def test_cursor_pages_through_tied_sort_values(client, add_products):
+    ids = add_products([{'product_name': 'Mat', 'offer_price': 5} for _ in range(5)] + [{'product_name': 'Mat', 'offer_price': 3}])
+    assert walk(client, '/products', per_page=2, sort='offer_price,product_name') == [ids[-1]] + ids[:-1]
+    # Ties follow id in the sort's direction, as in the offset listing
+    listed = [product['id'] for product in client.get('/products?per_page=50&sort=-offer_price').get_json()['products']]
+    assert walk(client, '/products', per_page=2, sort='-offer_price') == listed == ids[-2::-1] + [ids[-1]]
+
+
+@pytest.mark.parametrize('key', [[5], [5, 'x'], ['5', 1], [True, 1], [5, 1.5]])
+def test_malformed_sorted_cursor_is_rejected(client, add_products, key):
+    add_products([{'product_name': 'Mat', 'offer_price': 5}])
+    response = client.get('/products', query_string={'sort': 'offer_price', 'cursor': catalog.encode_cursor(key)})
+    assert response.status_code == 400
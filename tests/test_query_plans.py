@@ -0,0 +1,49 @@
+from urllib.parse import urlencode
+
+import pytest
+from sqlalchemy import create_engine
+
+import app as catalog
+
+# The index each LISTING_PLAN_CASES entry should be served by, keyed by its query string
+EXPECTED_INDEXES = {
+    'category=Gaskets': 'ix_product_category',
+    'in_stock=true': 'ix_product_in_stock',
+    'is_rubber=true': 'ix_product_is_rubber',
+    'min_price=100&max_price=500': 'ix_product_offer_price',
+    'category=Gaskets&in_stock=true&min_price=100&max_price=500': 'ix_product_category_in_stock_offer_price',
+    'is_rubber=true&min_thickness=2&max_thickness=5': 'ix_product_is_rubber',
+    'min_density=1.2': 'ix_product_rubber_density',
+    'min_height=500&max_height=1000': 'ix_product_rubber_height',
+    'max_length=2000': 'ix_product_rubber_length',
+    'sort=offer_price': 'ix_product_offer_price',
+    'sort=-offer_price': 'ix_product_offer_price',
+    'sort=product_name': 'ix_product_product_name',
+    'sort=-updated_at': 'ix_product_updated_at',
+    'category=Gaskets&sort=offer_price': 'ix_product_category_offer_price',
+    'category=Gaskets&sort=-offer_price': 'ix_product_category_offer_price',
+    'category=Gaskets&sort=product_name': 'ix_product_category_product_name',
+    'category=Gaskets&in_stock=true&sort=offer_price': 'ix_product_category_in_stock_offer_price',
+    'in_stock=true&sort=-offer_price': 'ix_product_in_stock_offer_price',
+    'min_price=100&max_price=500&sort=offer_price': 'ix_product_offer_price',
+}
+
+
+@pytest.fixture(scope='module')
+def connection():
+    engine = create_engine('sqlite://')
+    catalog.db.metadata.create_all(engine)
+    with catalog.app.app_context(), engine.connect() as connection:
+        yield connection
+    engine.dispose()
+
+
+def test_every_case_has_an_expected_index():
+    assert sorted(EXPECTED_INDEXES) == sorted(urlencode(args) for args in catalog.LISTING_PLAN_CASES)
+
+
+@pytest.mark.parametrize('args', catalog.LISTING_PLAN_CASES, ids=urlencode)
+def test_listing_uses_its_index(connection, args):
+    plan, problems = catalog.listing_plan_problems(args, connection)
+    assert problems == [], plan
+    assert any(f'USING INDEX {EXPECTED_INDEXES[urlencode(args)]} ' in f'{detail} ' for detail in plan), plan
@@ -0,0 +1,67 @@
+import app as catalog
+
+
+def test_etag_answers_if_none_match_with_304(client, add_products):
+    add_products([{'product_name': 'Mat'}])
+    first = client.get('/products', headers={'Accept-Encoding': 'identity'})
+    assert first.headers['Cache-Control'] == 'no-cache'
+    second = client.get('/products', headers={'Accept-Encoding': 'identity', 'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 304 and second.data == b''
+    assert client.get('/products', headers={'Accept-Encoding': 'identity', 'If-None-Match': '"stale"'}).status_code == 200
+
+
+def test_writes_invalidate_cached_responses(client, add_products):
+    [product_id] = add_products([{'product_name': 'Mat', 'sku': 'M-1'}])
+    first = client.get(f'/product/{product_id}', headers={'Accept-Encoding': 'identity'})
+    client.put('/products/bulk-update', json=[{'sku': 'M-1', 'product_name': 'Renamed mat'}])
+    second = client.get(f'/product/{product_id}', headers={'Accept-Encoding': 'identity', 'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert second.get_json()['product_name'] == 'Renamed mat'
+
+
+def test_argument_order_shares_an_entry(client, add_products):
+    add_products([{'product_name': 'Mat'}])
+    with catalog.app.test_request_context('/products?b=2&a=1'):
+        first = catalog.response_cache_key(7)
+    with catalog.app.test_request_context('/products?a=1&b=2'):
+        assert catalog.response_cache_key(7) == first
+
+
+def test_errors_are_not_cached(client):
+    assert client.get('/product/999999').status_code == 404
+    assert client.get('/product/999999').status_code == 404
+    assert client.get('/products?sort=nope').status_code == 400
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+
+    def hgetall(self, name):
+        return dict(self.hashes.get(name, {}))
+
+    def hset(self, name, mapping):
+        self.hashes.setdefault(name, {}).update(
+            (key.encode(), value.encode() if isinstance(value, str) else value) for key, value in mapping.items())
+
+    def expire(self, name, seconds):
+        pass
+
+
+def redis_cache(client):
+    cache = object.__new__(catalog.RedisResponseCache)
+    cache.client, cache.ttl, cache.local = client, 60, catalog.LRUResponseCache(10)
+    return cache
+
+
+def test_redis_entries_round_trip_without_pickle():
+    shared = FakeRedis()
+    entry = catalog.CachedResponse(b'{"products":[]}\n', 'application/json')
+    entry.encoded = {'gzip': b'gzipped'}
+    redis_cache(shared).set('1:/products?', entry)
+    assert shared.hashes['response-cache:1:/products?'] == {
+        b'mimetype': b'application/json', b'body': entry.body, b'encoded:gzip': b'gzipped'}
+
+    loaded = redis_cache(shared).get('1:/products?')  # Another worker, empty local LRU
+    assert (loaded.body, loaded.mimetype, loaded.etag, loaded.encoded) == (entry.body, entry.mimetype, entry.etag, {'gzip': b'gzipped'})
+    assert redis_cache(shared).get('2:/products?') is None
@@ -0,0 +1,67 @@
+import os
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime
+
+import app as catalog
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_migrate_schema_backfills_updated_at(client, add_products):
+    [stamped] = add_products([{'product_name': 'Stamped mat'}])
+    with catalog.app.app_context():
+        catalog.db.session.execute(catalog.text("INSERT INTO product (product_name) VALUES ('Legacy mat')"))
+        catalog.db.session.commit()
+        before = dict(catalog.db.session.execute(catalog.select(catalog.Product.id, catalog.Product.updated_at)).all())
+        catalog.migrate_schema()
+        after = dict(catalog.db.session.execute(catalog.select(catalog.Product.id, catalog.Product.updated_at)).all())
+    [legacy] = [product_id for product_id, updated_at in before.items() if updated_at is None]
+    assert isinstance(after[legacy], datetime)
+    assert after[stamped] == before[stamped]
+
+    # Backfilled rows page by updated_at like any other
+    response = client.get('/products', query_string={'sort': 'updated_at', 'cursor': '', 'per_page': 1})
+    first = response.get_json()
+    second = client.get('/products', query_string={'sort': 'updated_at', 'cursor': first['next_cursor'], 'per_page': 1}).get_json()
+    assert [product['id'] for product in first['products'] + second['products']] == [stamped, legacy]
+    assert second['next_cursor'] is None
+
+
+def test_startup_migrates_once_per_schema_version(tmp_path):
+    path = tmp_path / 'products.db'
+    env = {**os.environ, 'DATABASE_URL': f"sqlite:///{path}", 'LOG_LEVEL': 'WARNING', 'FLASK_APP': 'app.py'}
+
+    def start(*args):
+        command = args or ['-c', 'import app']
+        result = subprocess.run([sys.executable, *command], cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+        assert result.returncode == 0, result.stderr
+        return result.stdout
+
+    def inspect_file():
+        with sqlite3.connect(path) as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'product'")}
+        return version, indexes
+
+    start()
+    version, indexes = inspect_file()
+    assert version == catalog.SCHEMA_VERSION
+    index = min(index.name for index in catalog.Product.__table__.indexes)
+    assert index in indexes
+
+    # A stamped file skips the migration on startup; the CLI still runs it
+    with sqlite3.connect(path) as conn:
+        conn.execute(f"DROP INDEX {index}")
+    start()
+    assert index not in inspect_file()[1]
+    assert 'Schema migrated' in start('-m', 'flask', 'migrate-schema')
+    assert inspect_file() == (catalog.SCHEMA_VERSION, indexes)
+
+    # An older file is migrated by the first worker that starts against it
+    with sqlite3.connect(path) as conn:
+        conn.execute(f"DROP INDEX {index}")
+        conn.execute("PRAGMA user_version = 0")
+    start()
+    assert inspect_file() == (catalog.SCHEMA_VERSION, indexes)
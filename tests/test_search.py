@@ -0,0 +1,54 @@
+import pytest
+
+import app as catalog
+from test_pagination import walk
+
+
+def search_ids(client, q, **params):
+    response = client.get('/search', query_string={'q': q, 'per_page': 50, **params})
+    assert response.status_code == 200
+    return [product['id'] for product in response.get_json()['products']]
+
+
+def test_name_matches_rank_above_description_matches(client, add_products):
+    described, named = add_products([
+        {'product_name': 'Floor mat', 'long_description': 'Made from neoprene rubber'},
+        {'product_name': 'Neoprene sheet'},
+    ])
+    assert search_ids(client, 'neoprene') == [named, described]
+
+
+def test_every_term_must_match_as_a_prefix(client, add_products):
+    sheet, _, gasket = add_products([
+        {'product_name': 'Neoprene sheet'},
+        {'product_name': 'Nitrile sheet'},
+        {'product_name': 'Neoprene gasket'},
+    ])
+    assert search_ids(client, 'neop she') == [sheet]
+    assert sorted(search_ids(client, 'NEO')) == [sheet, gasket]
+    assert search_ids(client, 'silicone') == []
+
+
+def test_index_follows_updates_and_deletes(client, add_products):
+    first, second = add_products([{'product_name': 'Neoprene sheet', 'sku': 'N-1'}, {'product_name': 'Neoprene strip', 'sku': 'N-2'}])
+    client.put('/products/bulk-update', json=[{'sku': 'N-1', 'product_name': 'Silicone sheet'}])
+    client.delete(f'/product/{second}')
+    assert search_ids(client, 'neoprene') == []
+    assert search_ids(client, 'silicone') == [first]
+
+
+def test_ranked_cursor_pages_break_rank_ties_by_id(client, add_products):
+    ids = add_products([{'product_name': 'Neoprene sheet'} for _ in range(7)])  # Identical rows share a rank
+    assert walk(client, '/search', q='neoprene', per_page=2) == ids
+
+
+@pytest.mark.parametrize('cursor', ['garbage', catalog.encode_cursor([1]), catalog.encode_cursor(['x', 1]), catalog.encode_cursor([1.5, 'x'])])
+def test_malformed_ranked_cursor_is_rejected(client, add_products, cursor):
+    add_products([{'product_name': 'Neoprene sheet'}])
+    assert client.get('/search', query_string={'q': 'neoprene', 'cursor': cursor}).status_code == 400
+
+
+def test_substring_fallback_without_fts(client, add_products):
+    catalog.app.config['SEARCH_FTS_ENABLED'] = False
+    [sheet] = add_products([{'product_name': 'Neoprene sheet'}])
+    assert search_ids(client, 'oprene') == [sheet]
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+import app as catalog
+
+ROWS = [
+    {'product_name': 'Plain mat', 'offer_price': 120.5, 'mrp': 150.0, 'in_stock': True},
+    {'product_name': 'Gummi-Matte ü', 'short_description': 'café – \U0001f600', 'offer_price': 0.00001},
+    {'product_name': 'Big', 'offer_price': 1e16, 'rubber_density': 1.25, 'is_rubber': True,
+     'product_image_urls': 'static/uploads/a.jpg,static/uploads/b.jpg', 'youtube_links': ''},
+    {'product_name': 'Variants', 'variants': json.dumps([{'name': '2mm', 'price': 10, 'sku': 'V-2'}])},
+    {'product_name': 'Huge variant', 'variants': json.dumps([{'name': 'roll', 'price': 10 ** 20}])},
+]
+
+
+def test_list_responses_match_the_stdlib_encoder(client, add_products, monkeypatch):
+    add_products(ROWS)
+    fast = client.get('/products?per_page=50').data
+    monkeypatch.setattr(catalog, 'orjson', None)
+    assert client.get('/products?per_page=50').data == fast
+
+
+def test_integers_beyond_64_bits_are_served(client, add_products):
+    [product_id] = add_products([ROWS[-1]])
+    response = client.get(f'/product/{product_id}')
+    assert response.status_code == 200
+    assert response.get_json()['variants'][0]['price'] == 10 ** 20
+
+
+@pytest.mark.parametrize('fields', ['id,product_name', 'id,offer_price,variants'])
+def test_sparse_fieldsets_match_the_stdlib_encoder(client, add_products, monkeypatch, fields):
+    add_products(ROWS)
+    fast = client.get('/products', query_string={'fields': fields}).data
+    monkeypatch.setattr(catalog, 'orjson', None)
+    assert client.get('/products', query_string={'fields': fields}).data == fast
+
+
+def test_export_encodes_integers_beyond_64_bits(client, add_products):
+    add_products(ROWS)
+    response = client.get('/products/export?fields=id,product_name,variants')
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.data.splitlines()]
+    assert len(lines) == len(ROWS)
+    assert lines[-1]['variants'][0]['price'] == 10 ** 20
+
+
+def test_hyphenated_strings_keep_the_fast_path(add_products):
+    ids = add_products([{'product_name': 'Side-seal', 'variants': json.dumps([{'name': 'Side-seal e-2', 'url': 'https://x.example/re-use'}])}])
+    with catalog.app.test_request_context('/products'):
+        rows = catalog.db.session.execute(catalog.select(*catalog.product_columns()).where(catalog.Product.id.in_(ids))).all()
+        catalog.serialize_product_rows(rows)
+        assert not catalog.g.get('stdlib_json')
+
+
+@pytest.mark.parametrize('price', [0.00001, 1e16, -2.5e-7])
+def test_inexact_variant_floats_take_the_stdlib_path(client, add_products, monkeypatch, price):
+    add_products([{'product_name': 'Mat', 'variants': json.dumps([{'name': 'Side-seal', 'price': price}])}])
+    fast = client.get('/products').data
+    monkeypatch.setattr(catalog, 'orjson', None)
+    assert client.get('/products').data == fast
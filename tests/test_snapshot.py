@@ -0,0 +1,90 @@
+import sqlite3
+
+import pytest
+
+import app as catalog
+from test_pagination import walk
+
+
+def record(product_id, sku=None, category=None, offer_price=None):
+    values = dict.fromkeys(catalog.SNAPSHOT_FIELDS)
+    values.update(id=product_id, sku=sku, category=category, offer_price=offer_price)
+    return tuple(values[field] for field in catalog.SNAPSHOT_FIELDS)
+
+
+@pytest.fixture
+def snapshot_enabled():
+    catalog.app.config['CATALOG_SNAPSHOT_ENABLED'] = True
+    catalog.snapshot_store.snapshot = None
+    yield
+    catalog.snapshot_store.snapshot = None
+
+
+def test_patched_copies_only_the_touched_shards():
+    records = {product_id: record(product_id, f'S-{product_id}', 'Mats' if product_id % 2 else 'Gaskets', float(product_id % 7))
+               for product_id in range(1, 3001)}
+    base = catalog.CatalogSnapshot(records, 1)
+    patch = base.patched({5: record(5, 'S-new', 'Sheets', 1.5), 4000: record(4000, 'S-4000', 'Mats')}, [2999], 2)
+
+    assert base.record(5) == records[5] and base.record(2999) == records[2999] and base.record(4000) is None
+    assert patch.record(5)[catalog.SKU] == 'S-new' and patch.record(2999) is None and patch.record(4000) is not None
+    assert patch.records[1] is base.records[1]  # Ids 1024-2047 were not touched
+    assert patch.records[0] is not base.records[0]
+
+    assert 5 in base.category_ids('Mats') and 5 not in patch.category_ids('Mats')
+    assert patch.category_ids('Sheets') == (5,)
+    assert patch.category_ids('Mats')[-1] == 4000
+    assert list(patch.category_ids('Gaskets')) == sorted(patch.category_ids('Gaskets'))
+    assert 2999 not in patch.category_ids('Mats')
+    assert list(patch.ids) == sorted(set(range(1, 3001)) - {2999} | {4000})
+    assert sorted(zip(patch.prices, patch.price_ids)) == list(zip(patch.prices, patch.price_ids))
+    assert 2999 not in patch.price_ids and len(patch.prices) == len(base.prices) - 1
+
+
+def test_snapshot_listings_match_sql(client, add_products, snapshot_enabled):
+    add_products([{'product_name': f'Mat {i}', 'sku': f'M-{i}', 'category': ['Mats', 'Gaskets', None][i % 3],
+                   'offer_price': [None, 10, 25.5, 40][i % 4], 'in_stock': i % 5 != 0} for i in range(40)])
+    queries = ['', 'category=Mats', 'min_price=10&max_price=30', 'sort=-offer_price', 'category=Gaskets&in_stock=true&sort=product_name']
+    client.get('/products')  # Builds the snapshot
+    client.put('/products/bulk-update', json=[{'sku': 'M-3', 'category': 'Mats', 'offer_price': 12}, {'sku': 'M-8', 'offer_price': None}])
+    add_products([{'product_name': 'Late mat', 'category': 'Mats', 'offer_price': 11}])
+    from_snapshot = [client.get(f'/products?per_page=100&{query}').data for query in queries]
+    assert catalog.snapshot_store.incremental_updates >= 1
+
+    catalog.app.config['CATALOG_SNAPSHOT_ENABLED'] = False
+    assert [client.get(f'/products?per_page=100&{query}').data for query in queries] == from_snapshot
+
+
+@pytest.mark.parametrize('per_page', [0, -5, 3])
+def test_snapshot_cursor_pages(client, add_products, snapshot_enabled, per_page):
+    ids = add_products([{'product_name': f'Mat {i}'} for i in range(7)])
+    assert walk(client, '/products', per_page=per_page) == ids
+
+
+def test_snapshot_cursor_without_id_in_fields(client, add_products, snapshot_enabled):
+    add_products([{'product_name': f'Mat {i}'} for i in range(5)])
+    names, cursor = [], ''
+    while cursor is not None:
+        body = client.get('/products', query_string={'fields': 'product_name', 'per_page': 2, 'cursor': cursor}).get_json()
+        names += [product['product_name'] for product in body['products']]
+        cursor = body['next_cursor']
+    assert names == [f'Mat {i}' for i in range(5)]
+
+
+def test_cache_miss_catches_up_with_other_workers(client, add_products, snapshot_enabled):
+    catalog.app.config['CATALOG_SNAPSHOT_MAX_LAG'] = 3600
+    [product_id] = add_products([{'product_name': 'Mat A', 'offer_price': 10}])
+    assert client.get('/products').get_json()['products'][0]['offer_price'] == 10
+
+    # Another worker's write: it commits through its own connection and never touches this
+    # process's snapshot store or response cache
+    with catalog.app.app_context():
+        path = catalog.db.engine.url.database
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE product SET offer_price = 12 WHERE id = ?", (product_id,))
+        conn.execute("INSERT INTO product_change (product_id, op, changed_at) VALUES (?, 'upsert', datetime('now'))", (product_id,))
+        conn.execute("UPDATE catalog_version SET version = version + 1 WHERE id = 1")
+    conn.close()
+
+    assert client.get('/products').get_json()['products'][0]['offer_price'] == 12
+    assert client.get(f'/product/{product_id}').get_json()['offer_price'] == 12
@@ -0,0 +1,91 @@
+import gzip
+import hashlib
+import os
+
+import pytest
+
+import app as catalog
+
+FOLDER = catalog.app.config['UPLOAD_FOLDER']
+
+
+@pytest.fixture
+def upload_file():
+    paths = []
+
+    def make(name, data):
+        path = os.path.join(FOLDER, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        paths.append(path)
+        return name
+    yield make
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+@pytest.fixture
+def pdf_with_sidecar(upload_file):
+    data = b'%PDF-1.4 ' + b'catalog page ' * 500
+    name = upload_file(f'test-{os.urandom(4).hex()}.pdf', data)
+    upload_file(f'{name}.gz', gzip.compress(data))
+    return name, data
+
+
+def test_sidecar_is_served_under_the_original_name(client, pdf_with_sidecar):
+    name, data = pdf_with_sidecar
+    response = client.get(f'/static/uploads/{name}', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.mimetype == 'application/pdf'
+    assert response.headers['Content-Disposition'] == f'inline; filename={name}'
+    assert 'Accept-Encoding' in response.vary
+    assert gzip.decompress(response.data) == data
+    response.close()
+
+
+def test_original_is_served_without_a_matching_encoding(client, pdf_with_sidecar):
+    name, data = pdf_with_sidecar
+    response = client.get(f'/static/uploads/{name}', headers={'Accept-Encoding': 'br'})
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.vary
+    assert response.data == data
+    response.close()
+
+
+def test_range_and_conditional_requests(client, pdf_with_sidecar):
+    name, data = pdf_with_sidecar
+    partial = client.get(f'/static/uploads/{name}', headers={'Range': 'bytes=0-9'})
+    assert partial.status_code == 206 and partial.data == data[:10]
+    assert partial.headers['Content-Range'] == f'bytes 0-9/{len(data)}'
+    partial.close()
+    first = client.get(f'/static/uploads/{name}')
+    assert first.cache_control.max_age == catalog.app.config['UPLOAD_MAX_AGE'] and not first.cache_control.immutable
+    first.close()
+    again = client.get(f'/static/uploads/{name}', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    again.close()
+
+
+def test_content_addressed_uploads_are_immutable(client, upload_file):
+    data = os.urandom(64)
+    name = upload_file(f'{hashlib.sha256(data).hexdigest()}.jpg', data)
+    response = client.get(f'/static/uploads/{name}')
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == catalog.app.config['UPLOAD_IMMUTABLE_MAX_AGE']
+    assert 'Accept-Encoding' not in response.vary
+    response.close()
+
+
+def test_proxy_offload(client, pdf_with_sidecar):
+    catalog.app.config['UPLOAD_X_ACCEL_REDIRECT'] = '/protected-uploads/'
+    name, _ = pdf_with_sidecar
+    response = client.get(f'/static/uploads/{name}', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['X-Accel-Redirect'] == f'/protected-uploads/{name}.gz'
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.data == b''
+    assert client.get('/static/uploads/missing.pdf').status_code == 404
+
+
+def test_paths_outside_the_folder_are_refused(client):
+    assert client.get('/static/uploads/../../app.py').status_code == 404
@@ -0,0 +1,122 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+import app as catalog
+
+
+@pytest.fixture
+def upload():
+    paths = []
+
+    # Random bytes keep names unique: a previous test's teardown may still be collecting its uploads
+    def make(content):
+        content += os.urandom(16)
+        name = f"{hashlib.sha256(content).hexdigest()}.jpg"
+        path = os.path.join(catalog.app.config['UPLOAD_FOLDER'], name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        paths.append(path)
+        return name
+    yield make
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+@pytest.mark.parametrize('stored, collected', [
+    ('/static/uploads/{}', 'static/uploads/{}'),
+    ('static/uploads/{}', '/static/uploads/{}'),
+    ('static/uploads/{}', 'static/uploads/{}'),
+])
+def test_referenced_uploads_are_kept_whatever_the_spelling(add_products, upload, stored, collected):
+    catalog.app.config['UPLOAD_GC_GRACE_SECONDS'] = -60
+    kept, orphan = upload(b'kept'), upload(b'orphan')
+    add_products([{'product_name': 'Mat', 'product_image_urls': stored.format(kept)}])
+    with catalog.app.app_context():
+        removed = catalog.collect_orphaned_uploads([collected.format(kept), collected.format(orphan)])
+    assert removed == [collected.format(orphan)]
+    assert os.path.exists(os.path.join(catalog.app.config['UPLOAD_FOLDER'], kept))
+    assert not os.path.exists(os.path.join(catalog.app.config['UPLOAD_FOLDER'], orphan))
+
+
+def test_recent_uploads_are_kept(upload):
+    name = upload(b'fresh')
+    with catalog.app.app_context():
+        assert catalog.collect_orphaned_uploads([f'static/uploads/{name}']) == []
+
+
+def test_bulk_delete_collects_released_uploads_after_commit(client, add_products, upload, monkeypatch):
+    catalog.app.config['UPLOAD_GC_GRACE_SECONDS'] = -60
+    shared, first, second = upload(b'shared'), upload(b'first'), upload(b'second')
+    keep, *drop = add_products([
+        {'product_name': 'Keep', 'product_image_urls': f'static/uploads/{shared}'},
+        {'product_name': 'Drop 1', 'product_image_urls': f'static/uploads/{shared},static/uploads/{first}'},
+        {'product_name': 'Drop 2', 'download_pdfs': f'/static/uploads/{second}', 'youtube_links': 'https://youtu.be/x'},
+    ])
+    scheduled = []
+    schedule = catalog.schedule_upload_gc
+    monkeypatch.setattr(catalog, 'schedule_upload_gc', lambda urls: scheduled.append(sorted(urls)) or schedule(urls))
+
+    # One collection for the whole request, queued once the delete has committed
+    assert client.post('/products/bulk-delete', json=drop).status_code == 200
+    assert scheduled == [sorted([f'static/uploads/{shared}', f'static/uploads/{first}', f'/static/uploads/{second}'])]
+    catalog.upload_gc_executor.submit(lambda: None).result()  # Single worker: earlier jobs have finished
+    folder = catalog.app.config['UPLOAD_FOLDER']
+    assert os.path.exists(os.path.join(folder, shared))
+    assert not os.path.exists(os.path.join(folder, first)) and not os.path.exists(os.path.join(folder, second))
+
+    # Nothing is released when the delete finds no products
+    assert client.post('/products/bulk-delete', json=[keep + 1000]).status_code == 207
+    assert len(scheduled) == 1
+
+
+# Spooled temp files and stored uploads that appeared since before; earlier tests' background
+# jobs may still be removing their own files or writing derivatives meanwhile
+def new_uploads(before):
+    names = set(os.listdir(catalog.app.config['UPLOAD_FOLDER'])) - before
+    return {name for name in names if name.startswith('.upload-') or catalog.CONTENT_ADDRESSED_NAME.match(name)}
+
+
+def product_names():
+    with catalog.app.app_context():
+        return catalog.db.session.scalars(catalog.select(catalog.Product.product_name)).all()
+
+
+@pytest.mark.parametrize('limits', [
+    {'UPLOAD_MAX_FILE_SIZES': {'jpg': 1024}},  # Fails mid-part, on the spool's size check
+    {'UPLOAD_MAX_CONTENT_LENGTH': 1024},  # Fails before any part is read
+])
+def test_oversized_form_upload_is_rejected_without_leftovers(admin_client, limits):
+    catalog.app.config.update(limits)
+    before = set(os.listdir(catalog.app.config['UPLOAD_FOLDER']))
+    response = admin_client.post('/add', content_type='multipart/form-data', data={
+        'product_name': 'Mat',
+        'images': (io.BytesIO(os.urandom(4096)), 'big.jpg'),
+    })
+    assert response.status_code == 413
+    assert new_uploads(before) == set()
+    assert product_names() == []
+
+
+def test_oversized_later_part_discards_its_spool(admin_client):
+    catalog.app.config['UPLOAD_MAX_FILE_SIZES'] = {'jpg': 1024, 'pdf': 64}
+    catalog.app.config['UPLOAD_GC_GRACE_SECONDS'] = -60
+    before = set(os.listdir(catalog.app.config['UPLOAD_FOLDER']))
+    response = admin_client.post('/add', content_type='multipart/form-data', data={
+        'product_name': 'Mat',
+        'images': (io.BytesIO(os.urandom(512)), 'small.jpg'),
+        'pdfs': (io.BytesIO(os.urandom(4096)), 'big.pdf'),
+    })
+    assert response.status_code == 413
+    assert product_names() == []
+    # The complete earlier part was already handed off for storing; the request ends once it
+    # is in place rather than with its temp file still around. Nothing references it, so
+    # gc-uploads collects it.
+    [stored] = new_uploads(before)
+    assert stored.endswith('.jpg')
+    with catalog.app.app_context():
+        assert catalog.collect_orphaned_uploads([f'static/uploads/{stored}']) == [f'static/uploads/{stored}']
+    assert new_uploads(before) == set()
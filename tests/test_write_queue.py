@@ -0,0 +1,59 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import app as catalog
+
+
+def add(name, fail=False):
+    def mutation():
+        product = catalog.Product(product_name=name)
+        catalog.db.session.add(product)
+        catalog.db.session.flush()
+        catalog.products_changed([product.id])
+        if fail:
+            raise ValueError(f'{name} rejected')
+        return product.id
+    return mutation
+
+
+def stored():
+    with catalog.app.app_context():
+        names = dict(catalog.db.session.execute(catalog.select(catalog.Product.id, catalog.Product.product_name)).all())
+        changed = set(catalog.db.session.scalars(catalog.select(catalog.ProductChange.product_id)))
+    return names, changed
+
+
+def test_a_failing_mutation_only_rolls_back_itself():
+    write_queue = catalog.WriteQueue(max_batch=8, max_wait=0.5)
+    names = [f'Mat {i}' for i in range(6)]
+    ready = threading.Barrier(len(names))
+
+    def submit(name):
+        ready.wait()
+        return write_queue.submit(add(name, fail=name == 'Mat 3'))
+
+    with ThreadPoolExecutor(len(names)) as pool:
+        futures = {name: pool.submit(submit, name) for name in names}
+    with pytest.raises(ValueError, match='Mat 3 rejected'):
+        futures['Mat 3'].result()
+    ids = {name: future.result() for name, future in futures.items() if name != 'Mat 3'}
+
+    stats = write_queue.stats()
+    assert (stats['mutations'], stats['failed']) == (6, 1)
+    assert stats['batches'] < 6
+    products, changed = stored()
+    assert products == {product_id: name for name, product_id in ids.items()}
+    assert changed == set(ids.values())
+
+
+def test_api_writes_go_through_the_queue(client):
+    catalog.app.config['WRITE_QUEUE_ENABLED'] = True
+    before = client.get('/write-queue').get_json()['mutations']
+    response = client.post('/add-product', json={'product_name': 'Queued mat', 'sku': 'Q-1'})
+    assert response.status_code == 201
+    product_id = response.get_json()['product_id']
+    assert client.get(f'/product/{product_id}').get_json()['sku'] == 'Q-1'
+    stats = client.get('/write-queue').get_json()
+    assert stats['enabled'] and stats['mutations'] == before + 1